@@ -77,10 +77,11 @@ setup(
     packages=find_packages('src'),
     python_requires='>=3.6',
     install_requires=about['__requires__'],
+    extras_require=about['__extras__'],
     entry_points={
         'console_scripts': [
-            'osdk-manager=osdk_manager.cli:cli',
-            'operator-sdk-manager=osdk_manager.cli:cli',
+            'osdk-manager=osdk_manager.daemon:main',
+            'operator-sdk-manager=osdk_manager.daemon:main',
         ],
     },
 )
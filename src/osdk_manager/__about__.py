@@ -26,3 +26,6 @@ __requires__ = [
     'python-gnupg',
     'PyYAML'
 ]
+__extras__ = {
+    'zstd': ['zstandard'],
+}
@@ -5,7 +5,9 @@ Manage osdk and opm binary installation, and help to scaffold, release, and
 version Operator SDK-based Kubernetes operators.
 """
 
-import platform
+import sys
 
-if platform.system() != "Linux":  # pragma: no cover
+# sys.platform rather than platform.system(), which is slow to import and
+# would be paid on every invocation of the version shims.
+if not sys.platform.startswith("linux"):  # pragma: no cover
     raise EnvironmentError("osdk_manager is designed only for Linux.")
@@ -0,0 +1,15 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager asyncio API.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This subpackage includes coroutine counterparts of the update functions and
+the Operator, built on asyncio subprocesses and the loop's executor, for
+services that install binaries and build operators from an event loop.
+"""
+
+from .operator import AsyncOperator, BuildResult  # noqa: F401
+from .update import (UpdateResult, opm_update, opm_version,  # noqa: F401
+                     osdk_update, osdk_version)
+from .util import run_blocking, shell  # noqa: F401
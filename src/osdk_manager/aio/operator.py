@@ -0,0 +1,173 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager asyncio Operator.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This module includes an Operator whose login, build and push are coroutines,
+so that many operators can be built in one process at once.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, List, NamedTuple
+
+from osdk_manager.aio.util import shell
+from osdk_manager.metrics import BUILD_SECONDS, PUSH_SECONDS
+from osdk_manager.operator.build_cache import BuildCache
+from osdk_manager.operator.fingerprint import (FINGERPRINT_LABEL,
+                                               source_fingerprint)
+from osdk_manager.operator.operator import Operator
+
+
+class BuildResult(NamedTuple):
+    """What an operator build or push produced, and how long it took.
+
+    platforms holds how long each platform took, for multi-platform images,
+    and output the lines the runtime printed.
+    """
+
+    image: str
+    seconds: float
+    platforms: Dict[str, float]
+    output: List[str]
+
+
+class AsyncOperator(Operator):
+    """An Operator whose runtime commands don't block the event loop.
+
+    Unlike Operator, it never changes the working directory or environment
+    of the process, which every operator in it would share. Commands run in
+    the operator's directory with the variables for the SDK set for them
+    alone.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Initialize the Operator, leaving the working directory alone."""
+        cwd = os.getcwd()
+        try:
+            super().__init__(*args, **kwargs)
+        finally:
+            os.chdir(cwd)
+
+    @property
+    def img(self) -> str:
+        """Return the image name and current tag."""
+        return ':'.join([self.image, self.tag])
+
+    def environment(self) -> Dict[str, str]:
+        """Return the environment to run the SDK's commands with."""
+        env = dict(os.environ, IMG=self.img,
+                   BUNDLE_IMG=':'.join([self.image + "-operator", self.tag]))
+        if len(self.channels) > 0:
+            env["BUNDLE_CHANNELS"] = ','.join(self.channels)
+            env["BUNDLE_DEFAULT_CHANNEL"] = self.channels[0]
+        return env
+
+    async def _shell(self, cmd: str = None) -> List[str]:
+        """Run a command in the operator's directory."""
+        return await shell(cmd, cwd=self.directory, env=self.environment())
+
+    async def login(self, username: str = None,
+                    password: str = None) -> None:
+        """Log in to the repository for the current image.
+
+        Will raise an exception if unable to log in.
+        """
+        await self._shell("{} login -u {} -p {} {}".format(
+            self.runtime, username, password, self.image.split('/', 2)[0]
+        ))
+        self.credentials = (username, password)
+        self._registry = None
+
+    async def _build_image(self, image: str = None, args: str = None,
+                           cache: bool = False,
+                           build_cache: BuildCache = None) -> List[str]:
+        """Build one image, reading and updating build_cache with cache."""
+        if not cache:
+            return await self._shell("{} build {} -t {} .".format(
+                self.runtime, args, image
+            ))
+        output = await self._shell(build_cache.build_command(
+            self.runtime, image, args=args
+        ))
+        os.makedirs(build_cache.path, exist_ok=True)
+        command = build_cache.save_command(self.runtime, image)
+        if command is not None:
+            output += await self._shell(command)
+        build_cache.keep(self.runtime)
+        return output
+
+    async def _build_platform(self, platform: str = None, label: str = None,
+                              cache: bool = False,
+                              builders: Dict[str, str] = {}) -> List[str]:
+        """Build the image for one platform, timing it in build_times."""
+        start = time.monotonic()
+        args = "--platform {} {}".format(platform, label)
+        if platform in builders:
+            args = "--builder {} {}".format(builders[platform], args)
+        output = await self._build_image(
+            self.platform_image(platform), args, cache,
+            BuildCache(image=self.image,
+                       directory=self.build_cache.directory,
+                       platform=platform)
+        )
+        self.build_times[platform] = time.monotonic() - start
+        self.logger.info("Built {} for {} in {:.1f}s".format(
+            self.img, platform, self.build_times[platform]
+        ))
+        return output
+
+    async def build(self, cache: bool = False,
+                    builders: Dict[str, str] = {}) -> BuildResult:
+        """Build an operator image using the saved values.
+
+        Builds behave as Operator.build's do, with every platform built at
+        once, except that they aren't skipped when already published.
+        """
+        start = time.monotonic()
+        label = ""
+        if cache:
+            label = "--label {}={}".format(FINGERPRINT_LABEL,
+                                           source_fingerprint(self.directory))
+        if self.platforms:
+            if builders and self.runtime != "docker":
+                raise RuntimeError("Builders are only supported with docker.")
+            self.build_times = {}
+            outputs = await asyncio.gather(*(
+                self._build_platform(platform, label, cache, builders)
+                for platform in self.platforms
+            ))
+            output = [line for lines in outputs for line in lines]
+        else:
+            output = await self._build_image(self.img, label, cache,
+                                             self.build_cache)
+        seconds = time.monotonic() - start
+        BUILD_SECONDS.observe(seconds, runtime=self.runtime)
+        return BuildResult(image=self.img, seconds=seconds,
+                           platforms=dict(self.build_times), output=output)
+
+    async def push(self) -> BuildResult:
+        """Push the operator image to its registry.
+
+        Each platform's image is pushed at once, and then the manifest list
+        of them is assembled in the registry, which is the only part that
+        blocks.
+        """
+        start = time.monotonic()
+        if self.platforms:
+            outputs = await asyncio.gather(*(
+                self._shell("{} push {}".format(self.runtime,
+                                                self.platform_image(p)))
+                for p in self.platforms
+            ))
+            output = [line for lines in outputs for line in lines]
+            self._push_manifest_list(self.img)
+        else:
+            output = await self._shell("{} push {}".format(self.runtime,
+                                                           self.img))
+        seconds = time.monotonic() - start
+        PUSH_SECONDS.observe(seconds, runtime=self.runtime)
+        return BuildResult(image=self.img, seconds=seconds, platforms={},
+                           output=output)
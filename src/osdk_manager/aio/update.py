@@ -0,0 +1,210 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager asyncio updates.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This module includes the asyncio counterparts of updating the operator-sdk
+and opm binaries, which report what they did as an UpdateResult. Downloads
+and catalog refreshes run the blocking code in the loop's executor, so they
+get the same proxies, CA bundles, compressed and delta transfers, segments
+and scheduling as every other download.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, NamedTuple
+
+from osdk_manager.aio.util import run_blocking
+from osdk_manager.cache import ArtifactCache
+from osdk_manager.catalog import (REPOSITORIES, ReleaseCatalog, is_constraint,
+                                  resolve_version)
+from osdk_manager.download import Bandwidth
+from osdk_manager.install import install_binaries, is_installed
+from osdk_manager.metrics import CACHE_LOOKUPS, UPDATE_SECONDS
+from osdk_manager.opm.update import OpmPaths
+from osdk_manager.opm.update import opm_version as _opm_version
+from osdk_manager.osdk.update import OsdkFileData, osdk_use, verify_checksums
+from osdk_manager.osdk.update import osdk_version as _osdk_version
+from osdk_manager.util import get_logger
+
+
+class UpdateResult(NamedTuple):
+    """What an update installed, and what it took to install it.
+
+    paths maps each binary installed into $PATH to the cached binary it was
+    installed from. transferred is the size of the binaries that had to be
+    downloaded, and cache_hits the number of binaries that were already
+    cached.
+    """
+
+    version: str
+    paths: Dict[str, str]
+    transferred: int
+    cache_hits: int
+    seconds: float
+
+
+def _resolve(name: str = None, version: str = 'latest',
+             directory: str = os.path.expanduser('~/.operator-sdk'),
+             api: str = 'https://api.github.com') -> str:
+    """Resolve the version of a managed binary to install.
+
+    The latest version is the newest release in the catalog, which is
+    refreshed first. Constraints are resolved offline, unless there's no
+    catalog yet. Versions are returned as they are.
+    """
+    if is_constraint(version):
+        return resolve_version(name, version, directory, api)
+    if version != 'latest':
+        return str(version)
+    catalog = ReleaseCatalog(REPOSITORIES[name], directory, api)
+    catalog.refresh()
+    versions = catalog.versions()
+    if not versions:
+        raise RuntimeError((f'Unable to determine the latest release of '
+                            f'{catalog.repository}. Consider specifying a '
+                            f'version.'))
+    return versions[0]
+
+
+async def osdk_update(directory: str = os.path.expanduser('~/.operator-sdk'),
+                      path: str = os.path.expanduser('~/.local/bin'),
+                      version: str = 'latest', verify: bool = True,
+                      mirror: str = 'https://github.com',
+                      strategy: str = 'symlink', arch: str = 'linux_amd64',
+                      api: str = 'https://api.github.com',
+                      bandwidth: Bandwidth = None) -> UpdateResult:
+    """Update the operator-sdk binaries.
+
+    The latest version is looked up in the release catalog. Binaries are
+    downloaded within bandwidth, if it's given, at the same time as their
+    checksums are verified, and only moved into the cache and installed
+    with strategy once both succeed.
+    """
+    logger = get_logger()
+    for arg in [directory, path, version, verify, mirror, strategy, arch,
+                api, bandwidth]:
+        logger.debug(type(arg))
+        logger.debug(arg)
+    started = time.monotonic()
+
+    logger.debug(f'Creating {directory}')
+    os.makedirs(directory, exist_ok=True)
+
+    version = await run_blocking(_resolve, 'osdk', version, directory, api)
+    logger.info(f'Identified desired installation version as {version}')
+    file_data = await run_blocking(OsdkFileData, version=version, arch=arch,
+                                   directory=directory, path=path,
+                                   verify=verify, mirror=mirror)
+    for data in file_data.downloads.values():
+        if 'hash' not in data:
+            raise RuntimeError((f'No checksum for {data["filename"]} in '
+                                f'{version}.'))
+
+    if not verify:
+        logger.warning('Not validating signatures as requested.')
+
+    cache = ArtifactCache(directory)
+    downloads = [file_data.downloads[download] for download in
+                 await run_blocking(file_data.files_not_matching, cache)]
+    CACHE_LOOKUPS.inc(len(file_data.downloads) - len(downloads),
+                      result='hit')
+    results = await asyncio.gather(
+        *(run_blocking(cache.stage, filename=os.path.basename(data['src']),
+                       url=data['url'], sha256=data['hash'],
+                       version=version, bandwidth=bandwidth)
+          for data in downloads),
+        *([run_blocking(verify_checksums, file_data)] if verify else []),
+        return_exceptions=True
+    )
+    staged = list(zip(downloads, results))
+    failed = [result for result in results if isinstance(result,
+                                                         BaseException)]
+    if failed:
+        for _, tmp in staged:
+            if isinstance(tmp, str):
+                os.remove(tmp)
+        raise failed[0]
+
+    transferred = 0
+    for data, tmp in staged:
+        if tmp is not None:
+            transferred += os.path.getsize(tmp)
+            await run_blocking(cache.install,
+                               filename=os.path.basename(data['src']),
+                               tmp=tmp, sha256=data['hash'])
+    await run_blocking(osdk_use, version=version, directory=directory,
+                       path=path, arch=arch, strategy=strategy)
+
+    seconds = time.monotonic() - started
+    UPDATE_SECONDS.observe(seconds, binary='osdk')
+    return UpdateResult(
+        version=str(version),
+        paths={data['dst']: data['src']
+               for data in file_data.downloads.values()},
+        transferred=transferred,
+        cache_hits=len(file_data.downloads) - len(downloads),
+        seconds=seconds
+    )
+
+
+async def opm_update(directory: str = os.path.expanduser('~/.operator-sdk'),
+                     path: str = os.path.expanduser('~/.local/bin'),
+                     version: str = 'latest',
+                     mirror: str = 'https://github.com',
+                     strategy: str = 'symlink', arch: str = 'linux-amd64',
+                     api: str = 'https://api.github.com',
+                     bandwidth: Bandwidth = None) -> UpdateResult:
+    """Update the opm binary.
+
+    The latest version is looked up in the release catalog, and the binary is
+    downloaded within bandwidth, if it's given, and installed with strategy.
+    """
+    logger = get_logger()
+    for arg in [directory, path, version, mirror, strategy, arch, api,
+                bandwidth]:
+        logger.debug(type(arg))
+        logger.debug(arg)
+    started = time.monotonic()
+
+    logger.debug(f'Creating {directory}')
+    os.makedirs(directory, exist_ok=True)
+
+    version = await run_blocking(_resolve, 'opm', version, directory, api)
+    logger.info(f'Identified desired installation version as {version}')
+    paths = OpmPaths(version=version, arch=arch, directory=directory,
+                     path=path, mirror=mirror)
+    cache = ArtifactCache(directory)
+    downloaded = await run_blocking(cache.ensure,
+                                    filename=os.path.basename(paths.src),
+                                    url=paths.download_url,
+                                    bandwidth=bandwidth)
+
+    logger.debug(f'Creating {path}')
+    os.makedirs(path, exist_ok=True)
+    if not is_installed(paths.src, paths.dst, directory, strategy):
+        await run_blocking(install_binaries, {paths.dst: paths.src},
+                           strategy)
+
+    seconds = time.monotonic() - started
+    UPDATE_SECONDS.observe(seconds, binary='opm')
+    return UpdateResult(
+        version=str(version), paths={paths.dst: paths.src},
+        transferred=os.path.getsize(paths.src) if downloaded else 0,
+        cache_hits=int(not downloaded), seconds=seconds
+    )
+
+
+async def osdk_version(directory: str = os.path.expanduser('~/.operator-sdk'),
+                       path: str = os.path.expanduser('~/.local/bin'),
+                       arch: str = 'linux_amd64') -> str:
+    """Return the version of the installed operator-sdk binaries."""
+    return _osdk_version(directory=directory, path=path, arch=arch)
+
+
+async def opm_version(directory: str = os.path.expanduser('~/.operator-sdk'),
+                      path: str = os.path.expanduser('~/.local/bin')) -> str:
+    """Return the version of the installed opm binary."""
+    return _opm_version(directory=directory, path=path)
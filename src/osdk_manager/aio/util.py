@@ -0,0 +1,68 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager asyncio utilities.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This module includes the asyncio counterpart of the subprocess utility, which
+waits without blocking the event loop, and a way to run blocking code in the
+loop's executor.
+"""
+
+import asyncio
+import os
+import shlex
+from functools import partial
+from typing import Any, Callable, Dict, List
+
+from osdk_manager.exceptions import ShellRuntimeException
+from osdk_manager.metrics import SHELL_COMMANDS
+from osdk_manager.util import _utf8ify, get_logger
+
+
+async def shell(cmd: str = None, fail: bool = True, cwd: str = None,
+                env: Dict[str, str] = None) -> List[str]:
+    """Run a command in a subprocess, returning its lines of output.
+
+    By default will cause a failure using the return code of the command. To
+    change this behavior, pass fail=False. The command runs in cwd, with env,
+    if they're given. The subprocess is killed if the caller is cancelled.
+    """
+    logger = get_logger()
+    logger.debug("Running: {}".format(cmd))
+    proc = await asyncio.create_subprocess_exec(
+        *shlex.split(cmd), stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT, cwd=cwd, env=env
+    )
+    lines = []
+    try:
+        async for line in proc.stdout:
+            line = _utf8ify(line)
+            logger.debug("Line:    {}".format(line))
+            lines.append(line)
+        ret = await proc.wait()
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+
+    SHELL_COMMANDS.inc(command=os.path.basename(shlex.split(cmd)[0]),
+                       result='success' if ret == 0 else 'failure')
+    if fail and ret != 0:
+        logger.error("Command errored: {}".format(cmd))
+        raise ShellRuntimeException(ret)
+    elif ret != 0:
+        logger.warning("Command returned {}: {}".format(ret, cmd))
+    return lines
+
+
+async def run_blocking(func: Callable = None, *args, **kwargs) -> Any:
+    """Run a blocking function in the loop's executor, returning its result.
+
+    The blocking code for downloads, the cache and the catalog already takes
+    its locks and schedules its transfers, so the coroutines reuse it this
+    way rather than reimplementing it.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(func, *args, **kwargs))
@@ -0,0 +1,172 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager artifact cache.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the manifest tracking which versioned binaries have been
+downloaded into the cache directory, and the locking that lets several
+processes share that directory safely.
+"""
+
+import json
+import os
+import requests
+from typing import Tuple
+
+from osdk_manager.delta import stage
+from osdk_manager.download import Bandwidth, commit, fetch, file_sha256
+from osdk_manager.metrics import CACHE_LOOKUPS
+from osdk_manager.util import get_logger, locked, version_key
+
+
+class ArtifactCache(object):
+    """Tracks the versioned binaries kept in a cache directory.
+
+    The manifest records the SHA-256 of every binary written into the
+    directory, so that what's installed can be compared against what's wanted
+    without hashing every binary again. Binaries are only ever renamed into
+    the directory once complete, so a reader never sees a partial one.
+    """
+
+    def __init__(self, directory: str = os.path.expanduser('~/.operator-sdk')
+                 ) -> None:
+        """Initialize the cache and load its manifest."""
+        self.logger = get_logger()
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.load()
+
+    def load(self) -> None:
+        """Load the manifest from disk, if there is one."""
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+        except ValueError:
+            self.logger.warning(f'Ignoring corrupt {self.manifest_path}')
+            self.manifest = {}
+
+    def save(self) -> None:
+        """Write the manifest to disk atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f'{self.manifest_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def path(self, filename: str = None) -> str:
+        """Return the full path to a cached binary."""
+        return os.path.join(self.directory, filename)
+
+    def has(self, filename: str = None, sha256: str = None) -> bool:
+        """Return whether the cache holds filename with the given digest.
+
+        Binaries that predate the manifest are hashed once and recorded.
+        """
+        if not os.path.isfile(self.path(filename)):
+            return False
+        if self.manifest.get(filename) == sha256:
+            return True
+        if filename not in self.manifest and \
+                file_sha256(self.path(filename)) == sha256:
+            self.record(filename, sha256)
+            return True
+        return False
+
+    def record(self, filename: str = None, sha256: str = None) -> None:
+        """Record the digest of a binary written into the cache.
+
+        The manifest is reloaded and saved under its lock, so that records
+        made by other processes in the meantime are kept.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with locked(self.manifest_path):
+            self.load()
+            self.manifest[filename] = sha256
+            self.save()
+
+    def ensure(self, filename: str = None, url: str = None,
+               sha256: str = None, session: requests.Session = None,
+               bandwidth: Bandwidth = None) -> bool:
+        """Download url into the cache as filename unless it's there already.
+
+        Concurrent callers for the same binary wait on its lock, then find the
+        first caller's download in place and reuse it. Without a sha256 any
+        existing file is trusted. Returns whether a download happened.
+        """
+        dst = self.path(filename)
+        os.makedirs(self.directory, exist_ok=True)
+        with locked(dst):
+            self.load()
+            if sha256 is None and os.path.isfile(dst) or \
+                    sha256 is not None and self.has(filename, sha256):
+                self.logger.debug(f'Already downloaded: {filename}')
+                CACHE_LOOKUPS.inc(result='hit')
+                return False
+            CACHE_LOOKUPS.inc(result='miss')
+            self.logger.info(f'Writing {dst}.')
+            digest = fetch(url=url, dst=dst, sha256=sha256, session=session,
+                           bandwidth=bandwidth)
+            self.record(filename, digest)
+        return True
+
+    def previous(self, filename: str = None,
+                 version: str = None) -> Tuple[str, str]:
+        """Return the newest cached release before filename's version.
+
+        Cached binaries are named for their version, like name-1.3.1. Returns
+        the earlier version and its path, or Nones if there isn't one.
+        """
+        if not filename.endswith(f'-{version}'):
+            return None, None
+        name = filename[:-len(version) - 1]
+        wanted = version_key(version)
+        releases = []
+        for filename in os.listdir(self.directory):
+            if not filename.startswith(f'{name}-'):
+                continue
+            release = filename[len(name) + 1:]
+            key = version_key(release)
+            if key is not None and wanted is not None and key < wanted:
+                releases.append((key, release))
+        if not releases:
+            return None, None
+        release = max(releases)[1]
+        return release, self.path(f'{name}-{release}')
+
+    def stage(self, filename: str = None, url: str = None,
+              sha256: str = None, session: requests.Session = None,
+              version: str = None, bandwidth: Bandwidth = None) -> str:
+        """Download url next to filename in the cache, without installing it.
+
+        If version is provided and an earlier release of the binary is
+        cached, only a patch from it is downloaded where the server has one.
+        The result is checked against sha256. Returns the staged path, for
+        install, or None if the cache holds the binary already.
+        """
+        dst = self.path(filename)
+        os.makedirs(self.directory, exist_ok=True)
+        base_version, base = self.previous(filename, version) \
+            if version is not None else (None, None)
+        with locked(dst):
+            self.load()
+            if self.has(filename, sha256):
+                self.logger.debug(f'Already downloaded: {filename}')
+                CACHE_LOOKUPS.inc(result='hit')
+                return None
+            CACHE_LOOKUPS.inc(result='miss')
+            tmp, _ = stage(url=url, dst=dst, sha256=sha256, base=base,
+                           base_version=base_version, session=session,
+                           bandwidth=bandwidth)
+        return tmp
+
+    def install(self, filename: str = None, tmp: str = None,
+                sha256: str = None) -> None:
+        """Move a staged binary into the cache as filename and record it."""
+        dst = self.path(filename)
+        with locked(dst):
+            self.logger.info(f'Writing {dst}.')
+            commit(tmp=tmp, dst=dst)
+            self.record(filename, sha256)
@@ -0,0 +1,303 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager release catalog.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains a local catalog of the operator-sdk and opm releases and
+their assets, kept up to date from the GitHub API, and the resolution of
+version constraints against it without going back to the network.
+"""
+
+import json
+import os
+import re
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from osdk_manager.download import get_session
+from osdk_manager.util import VERSION, get_logger, locked, version_key
+
+# The GitHub repositories that each managed binary is released from
+REPOSITORIES = {
+    'osdk': 'operator-framework/operator-sdk',
+    'opm': 'operator-framework/operator-registry',
+}
+
+# The most releases the API returns in a page
+PER_PAGE = 100
+
+CONSTRAINT = re.compile(r'^\s*(~|\^|>=|<=|>|<|==|=|!=)?\s*v?'
+                        r'(\d+|[xX*])(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?'
+                        r'(?:-([0-9A-Za-z.-]+))?\s*$')
+
+
+def _bounds(comparison: str = None) -> Tuple[List[Tuple[str, Tuple]], Tuple]:
+    """Parse one comparison of a version constraint into bounds.
+
+    Returns a list of operators and the version keys they compare against,
+    and the version a prerelease was named for, if one was.
+    """
+    match = CONSTRAINT.match(comparison)
+    if match is None:
+        raise RuntimeError(f'Unable to parse version constraint {comparison}.')
+    operator, major, minor, patch, prerelease = match.groups()
+    numbers = []
+    for part in (major, minor, patch):
+        if part is None or not part.isdigit():
+            break
+        numbers.append(int(part))
+    given = len(numbers)
+    floor = tuple(numbers + [0] * (3 - given))
+    if given == 3:
+        exact = version_key('{}.{}.{}'.format(*floor) +
+                            (f'-{prerelease}' if prerelease else ''))
+    else:
+        # Lower than any prerelease of the floor
+        exact = floor + ((0,),)
+    named = floor if prerelease and given == 3 else None
+
+    def after(index: int = 0) -> Tuple:
+        """Return the lowest version after every one sharing parts to index."""
+        bumped = list(floor[:index]) + [floor[index] + 1] + [0] * (2 - index)
+        return tuple(bumped) + ((0,),)
+
+    if given == 0:
+        return [], named
+    if operator in (None, '=', '==') and given < 3:
+        return [('>=', exact), ('<', after(given - 1))], named
+    if operator in (None, '=', '=='):
+        return [('==', exact)], named
+    if operator == '~':
+        return [('>=', exact), ('<', after(0 if given == 1 else 1))], named
+    if operator == '^':
+        nonzero = [i for i, n in enumerate(floor[:given]) if n != 0]
+        return [('>=', exact),
+                ('<', after(nonzero[0] if nonzero else given - 1))], named
+    if operator == '>' and given < 3:
+        return [('>=', after(given - 1))], named
+    if operator == '<=' and given < 3:
+        return [('<', after(given - 1))], named
+    if operator == '!=' and given < 3:
+        return [('not in', (exact, after(given - 1)))], named
+    return [(operator, exact)], named
+
+
+def satisfies(version: str = None, constraint: str = None) -> bool:
+    """Return whether a version satisfies a constraint.
+
+    Constraints are comma-separated comparisons, like >=1.3,<1.5, or the
+    shorthands ~1.3 (any 1.3.x), ^1.3 (any 1.x from 1.3) and 1.3.x, and
+    may offer alternatives, like ~1.3 || ~1.5. Prereleases only satisfy
+    comparisons that name a prerelease of the same version.
+    """
+    key = version_key(version)
+    if key is None:
+        return False
+    checks = {
+        '>=': lambda bound: key >= bound,
+        '>': lambda bound: key > bound,
+        '<=': lambda bound: key <= bound,
+        '<': lambda bound: key < bound,
+        '!=': lambda bound: key != bound,
+        '==': lambda bound: key == bound,
+        'not in': lambda bound: not bound[0] <= key < bound[1],
+    }
+    for alternative in constraint.split('||'):
+        bounds, named = [], []
+        for comparison in alternative.split(','):
+            if comparison.strip():
+                parsed, prerelease = _bounds(comparison)
+                bounds.extend(parsed)
+                named.append(prerelease)
+        if key[3] != (1,) and key[:3] not in named:
+            continue
+        if all(checks[op](bound) for op, bound in bounds):
+            return True
+    return False
+
+
+def is_constraint(version: str = None) -> bool:
+    """Return whether a version is a constraint to resolve, not a version."""
+    return version != 'latest' and VERSION.match(str(version)) is None
+
+
+class ReleaseCatalog(object):
+    """A local catalog of a GitHub repository's releases and their assets.
+
+    The catalog is kept in the cache directory, so that versions can be
+    listed and constraints resolved offline. Refreshing it only asks the API
+    for releases newer than the ones it already has.
+    """
+
+    logger = get_logger()
+
+    def __init__(self, repository: str = None,
+                 directory: str = os.path.expanduser('~/.operator-sdk'),
+                 api: str = 'https://api.github.com',
+                 session: requests.Session = None) -> None:
+        """Initialize the catalog and load what's been fetched before."""
+        self.repository = repository
+        self.directory = directory
+        self.api = api.rstrip('/')
+        self.session = session or get_session()
+        self.path = os.path.join(directory, 'catalog', '{}.json'.format(
+            repository.replace('/', '_')
+        ))
+        self.load()
+
+    def __repr__(self) -> str:
+        """Represent the state of this object as a string."""
+        return "ReleaseCatalog(repository={}, releases={})".format(
+            self.repository, len(self.releases)
+        )
+
+    def load(self) -> None:
+        """Load the catalog from disk, if there is one."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except ValueError:
+            self.logger.warning(f'Ignoring corrupt {self.path}')
+            data = {}
+        self.releases = data.get('releases', {})
+        self.etag = data.get('etag')
+
+    def save(self) -> None:
+        """Write the catalog to disk atomically."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'releases': self.releases, 'etag': self.etag}, f,
+                      indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def _get(self, page: int = 1,
+             headers: Dict[str, str] = {}) -> requests.Response:
+        """Request a page of releases from the API."""
+        headers = dict(headers, Accept='application/vnd.github+json')
+        if os.getenv('GITHUB_TOKEN'):
+            headers['Authorization'] = f'Bearer {os.getenv("GITHUB_TOKEN")}'
+        url = f'{self.api}/repos/{self.repository}/releases'
+        self.logger.debug(f'Requesting page {page} of {url}')
+        response = self.session.get(url, headers=headers, params={
+            'per_page': PER_PAGE, 'page': page
+        })
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _release(release: dict = None) -> dict:
+        """Return what the catalog keeps of a release from the API."""
+        assets = {
+            asset['name']: {'size': asset['size'],
+                            'url': asset['browser_download_url']}
+            for asset in release.get('assets') or []
+        }
+        checksums = assets.get('checksums.txt')
+        return {
+            'tag': release['tag_name'],
+            'published': release.get('published_at'),
+            'prerelease': bool(release.get('prerelease')),
+            'assets': assets,
+            'checksums': checksums['url'] if checksums else None,
+        }
+
+    def _add(self, releases: List[dict] = []) -> bool:
+        """Add releases from the API, returning whether any were known."""
+        known = False
+        for release in releases:
+            if release.get('draft'):
+                continue
+            version = release['tag_name'].lstrip('v')
+            if version_key(version) is None:
+                continue
+            known = known or version in self.releases
+            self.releases[version] = self._release(release)
+        return known
+
+    def refresh(self, full: bool = False, jobs: int = 4) -> int:
+        """Bring the catalog up to date with the API.
+
+        Pages of releases, newest first, are only fetched until one holds a
+        release that's already known, and nothing is fetched if the first
+        page hasn't changed. A first or full refresh fetches every page, all
+        at once. Returns the number of releases added.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with locked(self.path):
+            self.load()
+            before = set(self.releases)
+            if full:
+                self.releases, self.etag = {}, None
+            response = self._get(1, {'If-None-Match': self.etag}
+                                 if self.etag and self.releases else {})
+            if response.status_code == 304:
+                self.logger.debug(f'{self.repository} releases are current')
+                return 0
+            self.etag = response.headers.get('ETag')
+            incremental = bool(self.releases)
+            known = self._add(response.json())
+            last = 1
+            match = re.search(r'[?&]page=(\d+)>; rel="last"',
+                              response.headers.get('Link', ''))
+            if match:
+                last = int(match.group(1))
+            if incremental:
+                page = 2
+                while not known and page <= last:
+                    known = self._add(self._get(page).json())
+                    page += 1
+            elif last > 1:
+                with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+                    pages = list(pool.map(lambda page: self._get(page).json(),
+                                          range(2, last + 1)))
+                for releases in pages:
+                    self._add(releases)
+            self.save()
+        added = len(set(self.releases) - before)
+        self.logger.info(f'Added {added} releases of {self.repository}')
+        return added
+
+    def versions(self, constraint: str = None,
+                 prereleases: bool = False) -> List[str]:
+        """Return the versions in the catalog, newest first.
+
+        Prereleases are left out unless prereleases is True or the
+        constraint names them.
+        """
+        return sorted((
+            version for version, release in self.releases.items()
+            if (constraint is None or satisfies(version, constraint)) and
+            (prereleases or constraint is not None or
+             not release['prerelease'])
+        ), key=version_key, reverse=True)
+
+    def resolve(self, constraint: str = None) -> str:
+        """Return the newest version in the catalog satisfying a constraint.
+
+        Raises RuntimeError if none does.
+        """
+        versions = self.versions(constraint)
+        if not versions:
+            raise RuntimeError((f'No release of {self.repository} in the '
+                                f'catalog satisfies {constraint}. Consider '
+                                f'refreshing the catalog.'))
+        return versions[0]
+
+
+def resolve_version(name: str = None, constraint: str = None,
+                    directory: str = os.path.expanduser('~/.operator-sdk'),
+                    api: str = 'https://api.github.com') -> str:
+    """Resolve a constraint on a managed binary's version offline.
+
+    The catalog is only fetched, from api, if there isn't one yet.
+    """
+    catalog = ReleaseCatalog(REPOSITORIES[name], directory, api)
+    if not catalog.releases:
+        catalog.refresh()
+    return catalog.resolve(constraint)
@@ -16,18 +16,36 @@ from .util import verbose_opt
 logger = get_logger()
 
 
+def _flush_metrics():
+    """Write the command's metrics to a textfile, if one is configured."""
+    from osdk_manager.metrics import flush
+    try:
+        flush()
+    except OSError as e:
+        get_logger().warning(f'Unable to write metrics: {e}')
+
+
 @click.group()
 @verbose_opt
 @click.version_option()
 def cli(verbose):
     """Operator SDK Manager.
 
-    Manage the operator-sdk binary and associated dependencies.
+    Manage the operator-sdk binary and associated dependencies. Set
+    OSDK_MANAGER_METRICS_TEXTFILE to add each command's metrics to a
+    node-exporter textfile.
     """
     logger = get_logger(verbose)
     logger.debug(sys.argv)
     logger.debug(f'verbose: {verbose}')
+    click.get_current_context().call_on_close(_flush_metrics)
 
 
 import osdk_manager.cli.osdk  # noqa E402
 import osdk_manager.cli.opm  # noqa E402
+import osdk_manager.cli.shim  # noqa E402
+import osdk_manager.cli.sync  # noqa E402
+import osdk_manager.cli.daemon  # noqa E402
+import osdk_manager.cli.operator  # noqa E402
+import osdk_manager.cli.mirror  # noqa E402
+import osdk_manager.cli.prefetch  # noqa E402
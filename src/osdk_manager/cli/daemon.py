@@ -0,0 +1,112 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager command line daemon commands.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the CLI subcommands that run and control the optional
+local daemon.
+"""
+
+import click
+
+from osdk_manager.cli import cli
+from osdk_manager.cli.util import verbose_opt
+from osdk_manager.util import get_logger
+
+
+def socket_opt(func):
+    """Wrap the function in a click.option for the daemon socket."""
+    from osdk_manager.daemon import socket_path
+    return click.option(
+        '-s', '--socket', default=socket_path(),
+        help='The Unix socket the daemon listens on'
+    )(func)
+
+
+@cli.group()
+@verbose_opt
+def daemon(verbose):
+    """Manage the optional osdk-manager daemon."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+
+
+@daemon.command()
+@verbose_opt
+@socket_opt
+@click.option('-m', '--metrics-address', default=None,
+              help=('Serve Prometheus metrics over HTTP at /metrics on this '
+                    '[host:]port, on every interface if no host is given'))
+def start(verbose, socket, metrics_address):
+    """Run the daemon in the foreground.
+
+    While it runs, osdk-manager commands are forwarded to it instead of
+    starting up from scratch. Set OSDK_MANAGER_NO_DAEMON to bypass it.
+    """
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'socket: {socket}')
+    logger.debug(f'metrics_address: {metrics_address}')
+
+    from osdk_manager.daemon import serve
+    try:
+        serve(path=socket, metrics_address=metrics_address)
+    except (RuntimeError, OSError) as e:
+        raise click.ClickException(str(e))
+
+
+@daemon.command()
+@verbose_opt
+@socket_opt
+def stop(verbose, socket):
+    """Stop a running daemon."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'socket: {socket}')
+
+    from osdk_manager.daemon import stop
+    try:
+        stopped = stop(path=socket)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    if stopped:
+        click.echo('osdk-manager daemon stopped')
+    else:
+        click.echo('osdk-manager daemon is not running')
+
+
+@daemon.command()
+@verbose_opt
+@socket_opt
+def status(verbose, socket):
+    """Report whether the daemon is running."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'socket: {socket}')
+
+    from osdk_manager.daemon import status
+    try:
+        pid = status(path=socket)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    if pid is None:
+        click.echo('osdk-manager daemon is not running')
+    else:
+        click.echo(f'osdk-manager daemon is running as PID {pid} on {socket}')
+
+
+@daemon.command()
+@verbose_opt
+@socket_opt
+def metrics(verbose, socket):
+    """Print the metrics of the commands a running daemon has run."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'socket: {socket}')
+
+    from osdk_manager.daemon import metrics
+    text = metrics(path=socket)
+    if text is None:
+        raise click.ClickException('osdk-manager daemon is not running')
+    click.echo(text, nl=False)
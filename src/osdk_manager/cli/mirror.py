@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager command line mirror commands.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the CLI commands that maintain a release mirror.
+"""
+
+import click
+
+from osdk_manager.cli import cli
+from osdk_manager.cli.util import verbose_opt
+from osdk_manager.util import get_logger
+
+
+@cli.group()
+@verbose_opt
+def mirror(verbose):
+    """Maintain a mirror of the operator-sdk and opm releases."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+
+
+@mirror.command()
+@verbose_opt
+@click.option('-c', '--codec', multiple=True,
+              type=click.Choice(['zstd', 'gzip']),
+              help=('A codec to write variants with (specify multiple times '
+                    'for more). Defaults to every available codec.'))
+@click.option('--remove', is_flag=True,
+              help='Remove the uncompressed artifacts once compressed')
+@click.argument('directory')
+def compress(verbose, codec, remove, directory):
+    """Write pre-compressed variants of the artifacts in a mirror.
+
+    Servers that support pre-compressed files, like nginx with gzip_static,
+    can then serve them to osdk-manager, which asks for them. Write any
+    patches first if removing the uncompressed artifacts.
+    """
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'codec: {codec}')
+    logger.debug(f'remove: {remove}')
+    logger.debug(f'directory: {directory}')
+
+    from osdk_manager.compression import compress_tree
+    try:
+        written = compress_tree(directory=directory, codecs=list(codec),
+                                remove=remove)
+    except (OSError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Wrote {len(written)} compressed variants in {directory}')
+
+
+@mirror.command()
+@verbose_opt
+@click.argument('directory')
+def delta(verbose, directory):
+    """Write patches between consecutive releases in a mirror.
+
+    Clients that have the previous release cached download only the patch to
+    the next one. Needs the zstandard package.
+    """
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'directory: {directory}')
+
+    from osdk_manager.delta import make_patches
+    try:
+        written = make_patches(directory=directory)
+    except (OSError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f'Wrote {len(written)} patches in {directory}')
@@ -0,0 +1,79 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager command line operator commands.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the CLI commands that work on an operator project.
+"""
+
+import click
+
+from osdk_manager.cli import cli
+from osdk_manager.cli.util import verbose_opt
+from osdk_manager.util import get_logger
+
+
+@cli.group()
+@verbose_opt
+def operator(verbose):
+    """Work with an operator project."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+
+
+@operator.command()
+@verbose_opt
+@click.option('-d', '--directory', default='.',
+              help='The directory of the operator project')
+@click.option('-f', '--filename', default='operate.yml',
+              help='The operator settings file in the project directory')
+@click.option('--debounce', default=0.5, type=float,
+              help='How many seconds without changes to wait before building')
+@click.option('--cache/--no-cache', default=True,
+              help='Whether to build with the operator build cache')
+@click.option('--poll', is_flag=True,
+              help='Poll for changes instead of using inotify')
+@click.option('--load-into', default=None,
+              help='A local cluster profile to load each new image into')
+@click.option('--provider', default='minikube',
+              type=click.Choice(['minikube', 'kind']),
+              help='The provider of the local cluster to load images into')
+def watch(verbose, directory, filename, debounce, cache, poll, load_into,
+          provider):
+    """Rebuild the operator image whenever the project changes."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'directory: {directory}')
+    logger.debug(f'filename: {filename}')
+    logger.debug(f'debounce: {debounce}')
+    logger.debug(f'cache: {cache}')
+    logger.debug(f'poll: {poll}')
+    logger.debug(f'load_into: {load_into}')
+    logger.debug(f'provider: {provider}')
+
+    from osdk_manager.operator import Operator
+    from osdk_manager.operator.watch import watch
+    try:
+        op = Operator.load(directory=directory, filename=filename)
+    except (OSError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+
+    def on_build(success: bool) -> None:
+        if not success:
+            click.echo('Build failed, waiting for changes.')
+            return
+        click.echo(f'Built {op.image}:{op.tag}')
+        if load_into is not None:
+            try:
+                op.load_into_cluster(profile=load_into, provider=provider)
+                click.echo(f'Loaded {op.image}:{op.tag} into {load_into}')
+            except RuntimeError as e:
+                click.echo(f'Unable to load the image: {e}')
+
+    click.echo(f'Watching {op.directory} for changes, press Ctrl+C to stop.')
+    try:
+        watch(op, debounce=debounce, cache=cache, poll=poll,
+              on_build=on_build)
+    except KeyboardInterrupt:
+        pass
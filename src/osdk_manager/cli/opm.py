@@ -12,7 +12,8 @@ import click
 import os
 
 from osdk_manager.cli import cli
-from osdk_manager.cli.util import verbose_opt
+from osdk_manager.cli.util import (api_opt, background_opt, limit_opt,
+                                   mirror_opt, strategy_opt, verbose_opt)
 from osdk_manager.util import get_logger
 
 
@@ -32,17 +33,39 @@ def opm(verbose):
 @click.option('-p', '--path', default=os.path.expanduser('~/.local/bin'),
               help='The directory in your $PATH to symlink opm into')
 @click.option('-V', '--version', default='latest',
-              help='The version of the Operator Package Manager to install')
-def update(verbose, directory, path, version):
+              help=('The version of the Operator Package Manager to '
+                    'install, or a constraint like ~1.14 to resolve from '
+                    'the release catalog'))
+@strategy_opt
+@limit_opt
+@background_opt
+@mirror_opt
+@api_opt
+def update(verbose, directory, path, version, strategy, limit, background,
+           mirror, api):
     """Update the opm binary, validating sums."""
     logger = get_logger(verbose)
     logger.debug(f'verbose: {verbose}')
     logger.debug(f'directory: {directory}')
     logger.debug(f'path: {path}')
     logger.debug(f'version: {version}')
+    logger.debug(f'strategy: {strategy}')
+    logger.debug(f'limit: {limit}')
+    logger.debug(f'background: {background}')
+    logger.debug(f'mirror: {mirror}')
+    logger.debug(f'api: {api}')
 
+    import requests
+    from osdk_manager.download import BACKGROUND, INTERACTIVE, Bandwidth
     from osdk_manager.opm.update import opm_update
-    version = opm_update(directory=directory, path=path, version=version)
+    bandwidth = Bandwidth(limit, priority=BACKGROUND if background
+                          else INTERACTIVE)
+    try:
+        version = opm_update(directory=directory, path=path,
+                             version=version, mirror=mirror,
+                             strategy=strategy, bandwidth=bandwidth, api=api)
+    except (requests.RequestException, RuntimeError) as e:
+        raise click.ClickException(str(e))
 
     if path in os.getenv('PATH').split(':'):
         click.echo(f'opm version {version} is in your path as opm')
@@ -65,3 +88,46 @@ def version(verbose, directory, path):
     logger.debug(f'path: {path}')
     from osdk_manager.opm.update import opm_version
     click.echo(opm_version(directory=directory, path=path))
+
+
+@opm.command()
+@verbose_opt
+@click.option('-d', '--directory',
+              default=os.path.expanduser('~/.operator-sdk'),
+              help='The directory the release catalog is kept in')
+@click.option('-c', '--constraint', default=None,
+              help='Only list versions satisfying a constraint, like ~1.3')
+@click.option('--prereleases', is_flag=True, help='Include prereleases')
+@click.option('--assets', is_flag=True,
+              help='List the assets of each release and their sizes')
+@click.option('-r', '--refresh', is_flag=True,
+              help='Fetch any new releases before listing')
+@api_opt
+def versions(verbose, directory, constraint, prereleases, assets, refresh,
+             api):
+    """List the opm releases in the release catalog."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'directory: {directory}')
+    logger.debug(f'constraint: {constraint}')
+    logger.debug(f'prereleases: {prereleases}')
+    logger.debug(f'assets: {assets}')
+    logger.debug(f'refresh: {refresh}')
+    logger.debug(f'api: {api}')
+
+    import requests
+    from osdk_manager.catalog import REPOSITORIES, ReleaseCatalog
+    catalog = ReleaseCatalog(REPOSITORIES['opm'], directory, api)
+    try:
+        if refresh or not catalog.releases:
+            catalog.refresh()
+        versions = catalog.versions(constraint, prereleases)
+    except (requests.RequestException, RuntimeError) as e:
+        raise click.ClickException(str(e))
+
+    for version in versions:
+        click.echo(version)
+        if assets:
+            for name, asset in sorted(catalog.releases[version]['assets']
+                                      .items()):
+                click.echo(f'  {name} ({asset["size"]} bytes)')
@@ -12,7 +12,8 @@ import click
 import os
 
 from osdk_manager.cli import cli
-from osdk_manager.cli.util import verbose_opt
+from osdk_manager.cli.util import (api_opt, background_opt, limit_opt,
+                                   mirror_opt, strategy_opt, verbose_opt)
 from osdk_manager.util import get_logger
 
 
@@ -26,22 +27,49 @@ def osdk(verbose):
 
 @osdk.command()
 @verbose_opt
+@click.option('-d', '--directory',
+              default=os.path.expanduser('~/.operator-sdk'),
+              help='The directory into which to download the binaries')
 @click.option('-p', '--path', default=os.path.expanduser('~/.local/bin'),
-              help='The directory in your $PATH to install operator-sdk into')
+              help='The directory in your $PATH to symlink operator-sdk into')
 @click.option('-V', '--version', default='latest',
-              help='The version of the Operator SDK to install')
+              help=('The version of the Operator SDK to install, or a '
+                    'constraint like ~1.3 to resolve from the release '
+                    'catalog'))
 @click.option('-n', '--no-verify', is_flag=True,
               help="Don't verify GPG signatures")
-def update(verbose, path, version, no_verify):
+@strategy_opt
+@limit_opt
+@background_opt
+@mirror_opt
+@api_opt
+def update(verbose, directory, path, version, no_verify, strategy, limit,
+           background, mirror, api):
     """Update the operator-sdk binary, validating sums."""
     logger = get_logger(verbose)
     logger.debug(f'verbose: {verbose}')
+    logger.debug(f'directory: {directory}')
     logger.debug(f'path: {path}')
     logger.debug(f'version: {version}')
     logger.debug(f'no_verify: {no_verify}')
+    logger.debug(f'strategy: {strategy}')
+    logger.debug(f'limit: {limit}')
+    logger.debug(f'background: {background}')
+    logger.debug(f'mirror: {mirror}')
+    logger.debug(f'api: {api}')
 
+    import requests
+    from osdk_manager.download import BACKGROUND, INTERACTIVE, Bandwidth
     from osdk_manager.osdk.update import osdk_update
-    version = osdk_update(path=path, version=version, verify=not no_verify)
+    bandwidth = Bandwidth(limit, priority=BACKGROUND if background
+                          else INTERACTIVE)
+    try:
+        version = osdk_update(directory=directory, path=path,
+                              version=version, verify=not no_verify,
+                              mirror=mirror, strategy=strategy,
+                              bandwidth=bandwidth, api=api)
+    except (requests.RequestException, RuntimeError) as e:
+        raise click.ClickException(str(e))
 
     if path in os.getenv('PATH').split(':'):
         click.echo((f'operator-sdk version {version} is in your path as '
@@ -49,3 +77,91 @@ def update(verbose, path, version, no_verify):
     else:
         click.echo((f'operator-sdk version {version} is available at '
                     f'{path}/operator-sdk'))
+
+
+@osdk.command()
+@verbose_opt
+@click.option('-d', '--directory',
+              default=os.path.expanduser('~/.operator-sdk'),
+              help='The directory in which to look for the binaries')
+@click.option('-p', '--path', default=os.path.expanduser('~/.local/bin'),
+              help='The directory in your $PATH to symlink operator-sdk into')
+@strategy_opt
+@click.argument('version')
+def use(verbose, directory, path, strategy, version):
+    """Switch to an already installed operator-sdk version."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'directory: {directory}')
+    logger.debug(f'path: {path}')
+    logger.debug(f'strategy: {strategy}')
+    logger.debug(f'version: {version}')
+
+    from osdk_manager.osdk.update import osdk_use
+    try:
+        version = osdk_use(version=version, directory=directory, path=path,
+                           strategy=strategy)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f'operator-sdk version {version} is now linked into {path}')
+
+
+@osdk.command()
+@verbose_opt
+@click.option('-d', '--directory',
+              default=os.path.expanduser('~/.operator-sdk'),
+              help='The directory in which to look for the binaries')
+@click.option('-p', '--path', default=os.path.expanduser('~/.local/bin'),
+              help='The directory in which to look for the symlinks')
+def version(verbose, directory, path):
+    """Print the version of the installed operator-sdk binaries."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'directory: {directory}')
+    logger.debug(f'path: {path}')
+    from osdk_manager.osdk.update import osdk_version
+    click.echo(osdk_version(directory=directory, path=path))
+
+
+@osdk.command()
+@verbose_opt
+@click.option('-d', '--directory',
+              default=os.path.expanduser('~/.operator-sdk'),
+              help='The directory the release catalog is kept in')
+@click.option('-c', '--constraint', default=None,
+              help='Only list versions satisfying a constraint, like ~1.3')
+@click.option('--prereleases', is_flag=True, help='Include prereleases')
+@click.option('--assets', is_flag=True,
+              help='List the assets of each release and their sizes')
+@click.option('-r', '--refresh', is_flag=True,
+              help='Fetch any new releases before listing')
+@api_opt
+def versions(verbose, directory, constraint, prereleases, assets, refresh,
+             api):
+    """List the operator-sdk releases in the release catalog."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'directory: {directory}')
+    logger.debug(f'constraint: {constraint}')
+    logger.debug(f'prereleases: {prereleases}')
+    logger.debug(f'assets: {assets}')
+    logger.debug(f'refresh: {refresh}')
+    logger.debug(f'api: {api}')
+
+    import requests
+    from osdk_manager.catalog import REPOSITORIES, ReleaseCatalog
+    catalog = ReleaseCatalog(REPOSITORIES['osdk'], directory, api)
+    try:
+        if refresh or not catalog.releases:
+            catalog.refresh()
+        versions = catalog.versions(constraint, prereleases)
+    except (requests.RequestException, RuntimeError) as e:
+        raise click.ClickException(str(e))
+
+    for version in versions:
+        click.echo(version)
+        if assets:
+            for name, asset in sorted(catalog.releases[version]['assets']
+                                      .items()):
+                click.echo(f'  {name} ({asset["size"]} bytes)')
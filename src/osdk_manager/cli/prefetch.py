@@ -0,0 +1,67 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager command line prefetch command.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the CLI command that downloads new releases into the cache
+in the background, for running from a timer.
+"""
+
+import click
+import os
+
+from osdk_manager.cli import cli
+from osdk_manager.cli.util import api_opt, limit_opt, mirror_opt, verbose_opt
+from osdk_manager.util import get_logger
+
+
+@cli.command()
+@verbose_opt
+@click.option('-d', '--directory',
+              default=os.path.expanduser('~/.operator-sdk'),
+              help='The directory into which to download the binaries')
+@click.option('-n', '--versions', default=1, type=int,
+              help='The number of newest releases of each binary to cache')
+@click.option('-a', '--arch', 'arches', multiple=True,
+              default=['linux_amd64'],
+              help='An arch to cache binaries for, like linux_arm64 '
+                   '(specify multiple times for more)')
+@click.option('-b', '--binary', 'names', multiple=True,
+              default=['osdk', 'opm'], type=click.Choice(['osdk', 'opm']),
+              help='A binary to cache releases of (specify multiple times '
+                   'for more)')
+@limit_opt
+@click.option('--nice', default=10, type=int,
+              help='How much to lower the priority of the download by')
+@mirror_opt
+@api_opt
+def prefetch(verbose, directory, versions, arches, names, limit, nice, mirror,
+             api):
+    """Download the newest releases into the cache, without installing."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'directory: {directory}')
+    logger.debug(f'versions: {versions}')
+    logger.debug(f'arches: {arches}')
+    logger.debug(f'names: {names}')
+    logger.debug(f'limit: {limit}')
+    logger.debug(f'nice: {nice}')
+    logger.debug(f'mirror: {mirror}')
+    logger.debug(f'api: {api}')
+
+    import requests
+    from osdk_manager.download import BACKGROUND, Bandwidth
+    from osdk_manager.prefetch import prefetch
+    try:
+        if nice:
+            os.nice(nice)
+        fetched = prefetch(directory=directory, versions=versions,
+                           arches=list(arches), names=list(names),
+                           mirror=mirror.rstrip('/'), api=api,
+                           bandwidth=Bandwidth(limit, priority=BACKGROUND))
+    except (OSError, RuntimeError, requests.RequestException) as e:
+        raise click.ClickException(str(e))
+
+    for filename in fetched:
+        click.echo(f'{filename} is cached in {directory}')
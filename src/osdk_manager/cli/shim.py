@@ -0,0 +1,79 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager command line shim commands.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the CLI subcommands that manage the version-pinning shims
+for the operator-sdk and opm binaries.
+"""
+
+import click
+import os
+
+from osdk_manager.cli import cli
+from osdk_manager.cli.util import verbose_opt
+from osdk_manager.util import get_logger
+
+
+@cli.group()
+@verbose_opt
+def shim(verbose):
+    """Manage the version-pinning shims."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+
+
+@shim.command()
+@verbose_opt
+@click.option('-d', '--directory',
+              default=os.path.expanduser('~/.operator-sdk'),
+              help='The directory in which the versioned binaries are kept')
+@click.option('-p', '--path', default=os.path.expanduser('~/.local/bin'),
+              help='The directory the unpinned binaries are linked into')
+@click.option('-s', '--shim-dir',
+              default=os.path.expanduser('~/.operator-sdk/shims'),
+              help='The directory to write the shims into')
+def install(verbose, directory, path, shim_dir):
+    """Install shims that honor the versions pinned in operate.yml."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'directory: {directory}')
+    logger.debug(f'path: {path}')
+    logger.debug(f'shim_dir: {shim_dir}')
+
+    from osdk_manager.shim import write_shims
+    try:
+        write_shims(shim_dir=shim_dir, directory=directory, path=path)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    if shim_dir in os.getenv('PATH').split(':'):
+        click.echo(f'Shims are installed in your path at {shim_dir}')
+    else:
+        click.echo((f'Shims are installed at {shim_dir}, add it to your PATH '
+                    f'ahead of {path} to use them'))
+
+
+@shim.command()
+@verbose_opt
+@click.option('-d', '--directory',
+              default=os.path.expanduser('~/.operator-sdk'),
+              help='The directory in which the versioned binaries are kept')
+@click.option('-p', '--path', default=os.path.expanduser('~/.local/bin'),
+              help='The directory the unpinned binaries are linked into')
+@click.argument('name', type=click.Choice(['operator-sdk', 'ansible-operator',
+                                           'helm-operator', 'opm']))
+def which(verbose, directory, path, name):
+    """Print the binary a shim would run from the current directory."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'directory: {directory}')
+    logger.debug(f'path: {path}')
+    logger.debug(f'name: {name}')
+
+    from osdk_manager.shim import resolve
+    try:
+        click.echo(resolve(name, directory=directory, path=path))
+    except FileNotFoundError as e:
+        raise click.ClickException(str(e))
@@ -0,0 +1,60 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager command line sync command.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the CLI command that provisions every binary at once from a
+lockfile.
+"""
+
+import click
+import os
+
+from osdk_manager.cli import cli
+from osdk_manager.cli.util import (background_opt, limit_opt, strategy_opt,
+                                   verbose_opt)
+from osdk_manager.util import get_logger
+
+
+@cli.command()
+@verbose_opt
+@click.option('-l', '--lockfile', default='tools.lock',
+              help='The lockfile pinning the versions and digests to install')
+@click.option('-d', '--directory',
+              default=os.path.expanduser('~/.operator-sdk'),
+              help='The directory into which to download the binaries')
+@click.option('-p', '--path', default=os.path.expanduser('~/.local/bin'),
+              help='The directory in your $PATH to symlink the binaries into')
+@click.option('-j', '--jobs', default=4, type=int,
+              help='The number of binaries to download at once')
+@strategy_opt
+@limit_opt
+@background_opt
+def sync(verbose, lockfile, directory, path, jobs, strategy, limit,
+         background):
+    """Install the binaries pinned in a lockfile, validating sums."""
+    logger = get_logger(verbose)
+    logger.debug(f'verbose: {verbose}')
+    logger.debug(f'lockfile: {lockfile}')
+    logger.debug(f'directory: {directory}')
+    logger.debug(f'path: {path}')
+    logger.debug(f'jobs: {jobs}')
+    logger.debug(f'strategy: {strategy}')
+    logger.debug(f'limit: {limit}')
+    logger.debug(f'background: {background}')
+
+    from osdk_manager.download import BACKGROUND, INTERACTIVE, Bandwidth
+    from osdk_manager.sync import sync
+    bandwidth = Bandwidth(limit, priority=BACKGROUND if background
+                          else INTERACTIVE)
+    try:
+        artifacts = sync(lockfile=lockfile, directory=directory, path=path,
+                         jobs=jobs, strategy=strategy, bandwidth=bandwidth)
+    except (OSError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+
+    for artifact in artifacts:
+        state = 'downloaded' if artifact.fetched else 'already cached'
+        click.echo(f'{artifact.name} version {artifact.version} ({state}) is '
+                   f'available at {path}/{artifact.name}')
@@ -17,3 +17,61 @@ def verbose_opt(func):
         "-v", "--verbose", count=True,
         help="Increase verbosity (specify multiple times for more)."
     )(func)
+
+
+def strategy_opt(func):
+    """Wrap the function in a click.option for the install strategy."""
+    return click.option(
+        "-s", "--strategy", default="symlink",
+        type=click.Choice(["symlink", "file", "hardlink", "reflink",
+                           "copy_file_range", "copy"]),
+        help=("How to install binaries into the path. file uses the cheapest "
+              "of the others that makes a file of its own, which still works "
+              "when only the path is mounted into a container.")
+    )(func)
+
+
+def _parse_limit(ctx, param, value):
+    """Parse a bandwidth limit option into bytes per second."""
+    if value is None:
+        return None
+    from osdk_manager.download import parse_rate
+    try:
+        return parse_rate(value)
+    except RuntimeError as e:
+        raise click.BadParameter(str(e))
+
+
+def limit_opt(func):
+    """Wrap the function in a click.option for a bandwidth limit."""
+    return click.option(
+        "--limit", default=None, callback=_parse_limit,
+        help=("The most bandwidth to download with, like 500K or 2M a "
+              "second. $OSDK_MANAGER_RATE_LIMIT limits every download on "
+              "the host together.")
+    )(func)
+
+
+def background_opt(func):
+    """Wrap the function in a click.option for background downloads."""
+    return click.option(
+        "--background", is_flag=True,
+        help=("Download with only the bandwidth and connections that "
+              "interactive downloads leave spare")
+    )(func)
+
+
+def mirror_opt(func):
+    """Wrap the function in a click.option for the release mirror."""
+    return click.option(
+        "--mirror", default="https://github.com",
+        help="The server to download the releases from"
+    )(func)
+
+
+def api_opt(func):
+    """Wrap the function in a click.option for the GitHub API."""
+    return click.option(
+        "--api", default="https://api.github.com",
+        help="The GitHub API to fetch releases from"
+    )(func)
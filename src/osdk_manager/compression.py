@@ -0,0 +1,140 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager artifact compression.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the codecs that release artifacts may be stored and
+transferred with, for mirrors that keep pre-compressed variants of them.
+zstd support needs the optional zstandard package.
+"""
+
+import gzip
+import os
+import zlib
+from typing import Iterable, List
+
+from osdk_manager.util import get_logger
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# The file suffix of each codec's pre-compressed variants, by the name used in
+# Content-Encoding
+SUFFIXES = {'zstd': '.zst', 'gzip': '.gz'}
+
+# The file suffix of patches between releases, which are zstd frames already
+PATCH_SUFFIX = '.zstpatch'
+
+
+def available_codecs() -> List[str]:
+    """Return the codecs that can be used, most effective first."""
+    return [codec for codec in SUFFIXES
+            if codec != 'zstd' or zstandard is not None]
+
+
+def accept_encoding() -> str:
+    """Return an Accept-Encoding header preferring the available codecs."""
+    return ', '.join(available_codecs() + ['identity;q=0.5'])
+
+
+class _Identity(object):
+    """A decompressor for content that isn't compressed."""
+
+    def decompress(self, data: bytes = b'') -> bytes:
+        """Return data as it is."""
+        return data
+
+    def flush(self) -> bytes:
+        """Return nothing, having kept nothing back."""
+        return b''
+
+
+def decompressor(codec: str = 'identity') -> object:
+    """Return a streaming decompressor for a codec.
+
+    Raises RuntimeError for codecs that aren't available.
+    """
+    if codec in (None, '', 'identity'):
+        return _Identity()
+    if codec == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if codec == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise RuntimeError(f'Unable to decompress {codec} content.')
+
+
+def decompress_stream(chunks: Iterable[bytes] = [],
+                      codec: str = 'identity') -> Iterable[bytes]:
+    """Decompress an iterable of compressed chunks as they arrive."""
+    decoder = decompressor(codec)
+    for chunk in chunks:
+        data = decoder.decompress(chunk)
+        if data:
+            yield data
+    data = decoder.flush()
+    if data:
+        yield data
+
+
+def compress_file(src: str = None, codec: str = 'zstd') -> str:
+    """Write a pre-compressed variant beside src, returning its path.
+
+    The variant is written under a temporary name and renamed into place, and
+    keeps the modification time of src so servers can tell it's current.
+    """
+    dst = src + SUFFIXES[codec]
+    tmp = f'{dst}.{os.getpid()}.tmp'
+    try:
+        with open(src, 'rb') as s:
+            if codec == 'gzip':
+                with gzip.GzipFile(tmp, 'wb', mtime=0) as d:
+                    for chunk in iter(lambda: s.read(1 << 20), b''):
+                        d.write(chunk)
+            elif codec == 'zstd' and zstandard is not None:
+                with open(tmp, 'wb') as d:
+                    zstandard.ZstdCompressor(level=19).copy_stream(s, d)
+            else:
+                raise RuntimeError(f'Unable to compress with {codec}.')
+        stat = os.stat(src)
+        os.utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return dst
+
+
+def compress_tree(directory: str = None, codecs: List[str] = None,
+                  remove: bool = False) -> List[str]:
+    """Write pre-compressed variants of every artifact in a mirror directory.
+
+    Variants that are already newer than their artifact are kept. Signatures,
+    checksums and patches are left alone, since they're small or compressed
+    already. With remove, the uncompressed artifacts are removed afterwards,
+    for mirrors that serve only the variants. Returns the variants written.
+    """
+    logger = get_logger()
+    codecs = codecs or available_codecs()
+    suffixes = tuple(SUFFIXES.values()) + (PATCH_SUFFIX, '.tmp', '.asc',
+                                           '.txt')
+    written = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(suffixes):
+                continue
+            src = os.path.join(root, name)
+            for codec in codecs:
+                variant = src + SUFFIXES[codec]
+                if os.path.exists(variant) and \
+                        os.stat(variant).st_mtime_ns >= \
+                        os.stat(src).st_mtime_ns:
+                    continue
+                logger.info(f'Compressing {src} with {codec}')
+                written.append(compress_file(src, codec))
+            if remove:
+                os.remove(src)
+    return written
@@ -0,0 +1,291 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager daemon.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains an optional local daemon that runs CLI commands in a warm
+process, and the entry point that forwards commands to it when it's running.
+The forwarding side runs on every CLI invocation, so it only imports the
+standard library modules it needs and leaves Click to the fallback path.
+"""
+
+import json
+import os
+import socket
+import sys
+
+# Commands that must run in the calling process rather than in the daemon,
+# including the long-running ones, which would hold up every other command
+# while the daemon runs them and only show their output once they're done
+LOCAL_COMMANDS = {'daemon', 'prefetch', 'sync'}
+
+# Subcommands that run in the calling process, for the same reasons. Lookups
+# like osdk version and shim which stay in the daemon
+LOCAL_SUBCOMMANDS = {('mirror', 'compress'), ('mirror', 'delta'),
+                     ('operator', 'watch'), ('osdk', 'update'),
+                     ('opm', 'update'), ('shim', 'install')}
+
+# Environment variables passed along with a forwarded command
+FORWARDED_ENV = ['PATH', 'OSDK_MANAGER_METRICS_TEXTFILE']
+
+
+def socket_path() -> str:
+    """Return the path of the daemon's Unix socket."""
+    if os.getenv('OSDK_MANAGER_SOCKET'):
+        return os.getenv('OSDK_MANAGER_SOCKET')
+    if os.getenv('XDG_RUNTIME_DIR'):
+        return os.path.join(os.getenv('XDG_RUNTIME_DIR'),
+                            'osdk-manager.sock')
+    return os.path.expanduser('~/.operator-sdk/daemon.sock')
+
+
+def _request(message: dict = None, path: str = None) -> dict:
+    """Send one message to the daemon and return its reply.
+
+    Returns None if the daemon on path can't be connected to, whether it
+    isn't running or the socket isn't ours to use. Raises RuntimeError if
+    the daemon doesn't reply, since the message may have been acted on
+    already.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path or socket_path())
+    except OSError:
+        client.close()
+        return None
+    try:
+        with client, client.makefile('rwb') as stream:
+            stream.write(json.dumps(message).encode() + b'\n')
+            stream.flush()
+            reply = stream.readline()
+    except OSError as e:
+        raise RuntimeError(f'Lost the connection to the daemon: {e}')
+    if not reply:
+        raise RuntimeError('The daemon closed the connection without '
+                           'replying.')
+    return json.loads(reply)
+
+
+def forward(argv: list = None, path: str = None) -> dict:
+    """Run a CLI command in the daemon.
+
+    Returns the reply, with the command's output and exit code, or None if
+    the command wasn't forwarded.
+    """
+    commands = tuple(arg for arg in argv if not arg.startswith('-'))[:2]
+    if commands[:1] and commands[0] in LOCAL_COMMANDS or \
+            commands in LOCAL_SUBCOMMANDS:
+        return None
+    return _request({
+        'argv': argv,
+        'cwd': os.getcwd(),
+        'env': {key: os.getenv(key) for key in FORWARDED_ENV
+                if os.getenv(key) is not None},
+    }, path)
+
+
+def main() -> None:
+    """Run the CLI, through the daemon if one is running."""
+    if not os.getenv('OSDK_MANAGER_NO_DAEMON'):
+        try:
+            reply = forward(sys.argv[1:])
+        except RuntimeError as e:
+            # The daemon may have run some of the command, so it isn't run
+            # again here
+            sys.stderr.write(f'Error: {e}\n')
+            sys.exit(1)
+        if reply is not None:
+            sys.stdout.write(reply['output'])
+            sys.stdout.flush()
+            sys.exit(reply['exit_code'])
+
+    from osdk_manager.cli import cli
+    cli()
+
+
+def run(argv: list = None, cwd: str = None, env: dict = {}) -> dict:
+    """Run a CLI command in this process, capturing its output.
+
+    Exceptions the command doesn't handle are reported in the output with
+    exit code 1, rather than taking the daemon's reply with them.
+    """
+    import io
+    import logging
+    import traceback
+    from contextlib import redirect_stderr, redirect_stdout
+    from osdk_manager.cli import cli
+    from osdk_manager.util import get_logger
+
+    # The logger's stderr handler kept the daemon's own stderr, so log to the
+    # captured output in its place. Verbosity flags change the level of the
+    # first handler, which is the one swapped out here
+    logger = get_logger()
+    stderr = logger.handlers[0]
+    original_cwd = os.getcwd()
+    original_env = {key: os.getenv(key) for key in env}
+    output = io.StringIO()
+    capture = logging.StreamHandler(output)
+    capture.setFormatter(stderr.formatter)
+    capture.setLevel(logging.ERROR)
+    exit_code = 0
+    try:
+        logger.handlers[0] = capture
+        os.chdir(cwd or original_cwd)
+        os.environ.update(env)
+        with redirect_stdout(output), redirect_stderr(output):
+            try:
+                cli.main(args=argv, prog_name='osdk-manager')
+            except SystemExit as e:
+                if isinstance(e.code, int):
+                    exit_code = e.code
+                elif e.code is not None:
+                    output.write(f'{e.code}\n')
+                    exit_code = 1
+            except Exception:
+                output.write(traceback.format_exc())
+                exit_code = 1
+    finally:
+        os.chdir(original_cwd)
+        logger.handlers[0] = stderr
+        for key, value in original_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    return {'output': output.getvalue(), 'exit_code': exit_code}
+
+
+def warm_up() -> None:
+    """Load everything that commands would otherwise pay for on each run."""
+    from osdk_manager.download import get_session
+    from osdk_manager.exceptions import ContainerRuntimeException
+    from osdk_manager.util import determine_runtime, get_gpg_trust
+    import osdk_manager.cli  # noqa: F401
+
+    get_session()
+    get_gpg_trust()
+    try:
+        determine_runtime()
+    except ContainerRuntimeException:
+        pass
+
+
+def parse_address(address: str = None) -> tuple:
+    """Parse a [host:]port address, where no host means every interface."""
+    host, _, port = str(address).rpartition(':')
+    try:
+        return host.strip('[]'), int(port)
+    except ValueError:
+        raise RuntimeError(f'{address} is not a valid [host:]port address.')
+
+
+def serve_metrics(address: str = None) -> object:
+    """Serve the daemon's metrics over HTTP at /metrics, in a thread.
+
+    Returns the server, to shut down when the daemon stops.
+    """
+    import http.server
+    import threading
+    from osdk_manager.metrics import render
+    from osdk_manager.util import get_logger
+
+    logger = get_logger()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type',
+                             'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = http.server.ThreadingHTTPServer(parse_address(address), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info('Serving metrics on port {}'.format(server.server_port))
+    return server
+
+
+def serve(path: str = None, metrics_address: str = None) -> None:
+    """Serve CLI commands on a Unix socket until asked to stop.
+
+    Commands are run one at a time, since each one may change directory and
+    environment for its duration. The metrics of every command run are also
+    served over HTTP on metrics_address, if it's given.
+    """
+    import socketserver
+    from osdk_manager.metrics import render
+    from osdk_manager.util import get_logger
+
+    logger = get_logger()
+    path = path or socket_path()
+    warm_up()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            message = json.loads(self.rfile.readline() or b'{}')
+            if message.get('command') == 'stop':
+                reply = {'stopping': True}
+                self.server.stopping = True
+            elif message.get('command') == 'ping':
+                reply = {'pid': os.getpid()}
+            elif message.get('command') == 'metrics':
+                reply = {'metrics': render()}
+            else:
+                logger.info(f'Running {message.get("argv")}')
+                reply = run(argv=message.get('argv', []),
+                            cwd=message.get('cwd'),
+                            env=message.get('env', {}))
+            self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+    if os.path.exists(path):
+        if _request({'command': 'ping'}, path) is not None:
+            raise RuntimeError(f'A daemon is already listening on {path}.')
+        os.remove(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    old_umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(path, Handler)
+    finally:
+        os.umask(old_umask)
+    server.stopping = False
+    logger.info(f'Listening on {path}')
+    metrics_server = None
+    try:
+        if metrics_address is not None:
+            metrics_server = serve_metrics(metrics_address)
+        with server:
+            while not server.stopping:
+                server.handle_request()
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        os.remove(path)
+
+
+def stop(path: str = None) -> bool:
+    """Ask a running daemon to stop, returning whether one was running."""
+    return _request({'command': 'stop'}, path) is not None
+
+
+def status(path: str = None) -> int:
+    """Return the PID of the running daemon, or None."""
+    reply = _request({'command': 'ping'}, path)
+    return None if reply is None else reply['pid']
+
+
+def metrics(path: str = None) -> str:
+    """Return the running daemon's metrics in the text format, or None."""
+    reply = _request({'command': 'metrics'}, path)
+    return None if reply is None else reply['metrics']
@@ -0,0 +1,182 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager delta updates.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the patches that let a new release of a binary be built
+from the previous release already in the cache, so that only the bytes that
+changed between them are transferred. Patches are zstd frames compressed
+with the previous release as their dictionary, which needs the optional
+zstandard package.
+"""
+
+import hashlib
+import os
+import requests
+import time
+from tempfile import mkstemp
+from typing import List, Tuple
+
+from osdk_manager.compression import PATCH_SUFFIX, SUFFIXES, zstandard
+from osdk_manager.download import (Bandwidth, get_scheduler, get_session,
+                                   priority_of, read_chunks,
+                                   stage as stage_download)
+from osdk_manager.metrics import DOWNLOAD_SECONDS
+from osdk_manager.util import get_logger, version_key
+
+# The largest window zstd supports, which patches need to reach back through
+# the whole previous release
+MAX_WINDOW_LOG = 31
+
+
+def patch_suffix(version: str = None) -> str:
+    """Return the suffix of a patch from a previous version."""
+    return f'.from-v{version}{PATCH_SUFFIX}'
+
+
+def _dictionary(base: str = None) -> object:
+    """Load a previous release as a zstd dictionary."""
+    with open(base, 'rb') as f:
+        return zstandard.ZstdCompressionDict(
+            f.read(), dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+
+
+def make_patch(base: str = None, target: str = None, dst: str = None,
+               level: int = 19) -> str:
+    """Write a patch that builds target from base to dst, returning dst.
+
+    Raises RuntimeError without zstandard.
+    """
+    if zstandard is None:
+        raise RuntimeError('Writing patches needs the zstandard package.')
+    with open(target, 'rb') as f:
+        content = f.read()
+    window_log = min(MAX_WINDOW_LOG, max(
+        10, (os.path.getsize(base) + len(content)).bit_length()
+    ))
+    params = zstandard.ZstdCompressionParameters.from_level(
+        level, window_log=window_log, enable_ldm=True,
+        source_size=len(content)
+    )
+    compressor = zstandard.ZstdCompressor(dict_data=_dictionary(base),
+                                          compression_params=params)
+    tmp = f'{dst}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(compressor.compress(content))
+        os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return dst
+
+
+def make_patches(directory: str = None) -> List[str]:
+    """Write patches between consecutive releases in a mirror directory.
+
+    Every directory of releases named like v1.3.1 gets a patch from each
+    release's previous release to it, for every artifact they share. Patches
+    newer than both of their releases are kept. Returns the patches written.
+    """
+    logger = get_logger()
+    skip = tuple(SUFFIXES.values()) + (PATCH_SUFFIX, '.tmp', '.asc', '.txt')
+    written = []
+    for root, dirs, _ in os.walk(directory):
+        releases = sorted((name for name in dirs
+                           if version_key(name) is not None and
+                           name.startswith('v')), key=version_key)
+        for previous, release in zip(releases, releases[1:]):
+            for name in sorted(os.listdir(os.path.join(root, release))):
+                base = os.path.join(root, previous, name)
+                target = os.path.join(root, release, name)
+                if name.endswith(skip) or not os.path.isfile(base) or \
+                        not os.path.isfile(target):
+                    continue
+                dst = target + patch_suffix(previous[1:])
+                if os.path.exists(dst) and os.stat(dst).st_mtime_ns >= max(
+                    os.stat(base).st_mtime_ns, os.stat(target).st_mtime_ns
+                ):
+                    continue
+                logger.info(f'Writing a patch from {base} to {target}')
+                written.append(make_patch(base, target, dst))
+    return written
+
+
+def stage_patched(url: str = None, dst: str = None, sha256: str = None,
+                  base: str = None, base_version: str = None,
+                  session: requests.Session = None,
+                  bandwidth: Bandwidth = None) -> Tuple[str, str]:
+    """Build url next to dst from a patch to base, without replacing dst.
+
+    The patch is applied as it arrives, and the result is checked against
+    sha256, raising RuntimeError if it doesn't match. Returns the temporary
+    path and the SHA-256, or None if there's no patch from base_version.
+    """
+    if zstandard is None:
+        return None
+    logger = get_logger()
+    session = session or get_session()
+    patch_url = url + patch_suffix(base_version)
+    logger.debug(f'Requesting {patch_url}')
+    with get_scheduler().connection(patch_url, priority_of(bandwidth)):
+        response = session.get(patch_url, stream=True,
+                               headers={'Accept-Encoding': 'identity'})
+        with response:
+            if response.status_code == 404:
+                logger.debug(f'No patch from {base_version} for {url}')
+                return None
+            response.raise_for_status()
+            fd, tmp = mkstemp(dir=os.path.dirname(dst),
+                              prefix=f'.{os.path.basename(dst)}.',
+                              suffix='.part')
+            digest = hashlib.sha256()
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    decoder = zstandard.ZstdDecompressor(
+                        dict_data=_dictionary(base),
+                        max_window_size=1 << MAX_WINDOW_LOG
+                    ).decompressobj()
+                    for chunk in read_chunks(response, bandwidth):
+                        data = decoder.decompress(chunk)
+                        digest.update(data)
+                        f.write(data)
+                if digest.hexdigest() != sha256:
+                    raise RuntimeError((f'{url} patched from {base_version} '
+                                        f'has SHA-256 {digest.hexdigest()}, '
+                                        f'expected {sha256}.'))
+            except BaseException:
+                os.remove(tmp)
+                raise
+    logger.debug(f'Staged {url} at {tmp} from {base}')
+    return tmp, digest.hexdigest()
+
+
+def stage(url: str = None, dst: str = None, sha256: str = None,
+          base: str = None, base_version: str = None,
+          session: requests.Session = None,
+          bandwidth: Bandwidth = None) -> Tuple[str, str]:
+    """Download url next to dst, from a patch to base if there is one.
+
+    Falls back to downloading the whole of url if there's no base or no
+    patch, or if the patched result doesn't match sha256. Returns the
+    temporary path and the SHA-256 of what was staged.
+    """
+    logger = get_logger()
+    if base is not None and sha256 is not None:
+        try:
+            start = time.monotonic()
+            staged = stage_patched(url=url, dst=dst, sha256=sha256,
+                                   base=base, base_version=base_version,
+                                   session=session, bandwidth=bandwidth)
+            if staged is not None:
+                DOWNLOAD_SECONDS.observe(time.monotonic() - start)
+                return staged
+        except (RuntimeError, requests.RequestException,
+                zstandard.ZstdError) as e:
+            logger.warning(f'Unable to patch {base}, downloading {url} in '
+                           f'full: {e}')
+    return stage_download(url=url, dst=dst, sha256=sha256, session=session,
+                          bandwidth=bandwidth)
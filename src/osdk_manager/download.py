@@ -0,0 +1,623 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager downloads.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the helpers used to fetch release artifacts over HTTP.
+"""
+
+import fcntl
+import hashlib
+import os
+import re
+import requests
+import threading
+import time
+import urllib3
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from tempfile import mkstemp
+from typing import IO, Iterable, Iterator, Tuple
+from urllib.parse import urlparse
+
+from osdk_manager.compression import (SUFFIXES, accept_encoding,
+                                      available_codecs, decompress_stream)
+from osdk_manager.metrics import DOWNLOAD_BYTES, DOWNLOAD_SECONDS
+from osdk_manager.util import get_logger
+
+_session = None
+_scheduler = None
+
+# How many byte ranges a large artifact is fetched in at once
+SEGMENTS = 4
+# Artifacts smaller than this many bytes per segment are fetched in one stream
+MIN_SEGMENT_SIZE = 8 << 20
+# How many times a segment is resumed after its connection fails
+SEGMENT_RETRIES = 3
+# How many bytes are read from a response at a time
+CHUNK_SIZE = 1 << 20
+# How many connections may be open to one host at once, by default
+HOST_CONNECTIONS = 8
+# How long a background read waits for interactive downloads to finish
+BACKGROUND_WAIT = 1.0
+# How often to check for connections freed by other processes, in seconds
+POLL_INTERVAL = 0.1
+# Where downloads in every process coordinate, by default
+SCHEDULER_DIRECTORY = os.path.expanduser('~/.operator-sdk/scheduler')
+
+# The priority classes of download jobs, highest first
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+PRIORITIES = [INTERACTIVE, BACKGROUND]
+
+
+class RangesUnsupported(Exception):
+    """The server ignored a range request."""
+
+    pass
+
+
+class Bandwidth(object):
+    """The share of the network a download job may use.
+
+    Jobs are either interactive, for someone waiting on them, or background,
+    using only the capacity that interactive jobs leave spare. A job may
+    also be limited to a rate, as a token bucket: reads may burst up to
+    burst bytes, and are then held back to rate bytes per second on average,
+    however many downloads and segments of the job are reading at once. If
+    a path is given, the bucket is kept in that file instead of in memory,
+    and shared by every process that uses it.
+    """
+
+    def __init__(self, rate: int = None, burst: int = None,
+                 priority: str = INTERACTIVE, path: str = None) -> None:
+        """Initialize the bucket, full, for rate bytes per second."""
+        if priority not in PRIORITIES:
+            raise RuntimeError(f'Unknown download priority {priority}.')
+        self.rate = rate
+        # A quarter of a second of transfer by default
+        self.burst = burst or (max(rate // 4, 64 << 10) if rate else None)
+        self.priority = priority
+        self.path = path
+        self.tokens = self.burst
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        """Represent the state of this object as a string."""
+        return "Bandwidth(rate={}, burst={}, priority={})".format(
+            self.rate, self.burst, self.priority
+        )
+
+    @property
+    def chunk_size(self) -> int:
+        """Return a read size small enough to keep transfers smooth."""
+        if not self.rate:
+            return CHUNK_SIZE
+        return max(4 << 10, min(CHUNK_SIZE, self.burst // 4))
+
+    def consume(self, amount: int = 0) -> None:
+        """Take amount bytes from the bucket, sleeping until it can."""
+        if not self.rate:
+            return
+        with self.lock:
+            if self.path is None:
+                wait = self._take(amount)
+            else:
+                wait = self._take_shared(amount)
+        if wait > 0:
+            time.sleep(wait)
+
+    def _take(self, amount: int = 0) -> float:
+        """Refill the bucket and take amount, returning the wait owed."""
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens +
+                          max(now - self.updated, 0) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        # A debt is paid off by every later reader sleeping in turn
+        return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def _take_shared(self, amount: int = 0) -> float:
+        """Take amount from the bucket kept in path, under a lock on it."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    tokens, updated = f.read().split()
+                    self.tokens = float(tokens)
+                    self.updated = float(updated)
+                except ValueError:
+                    self.tokens, self.updated = self.burst, time.time()
+                wait = self._take(amount)
+                f.seek(0)
+                f.truncate()
+                f.write(f'{self.tokens} {self.updated}\n')
+                f.flush()
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return wait
+
+
+class Scheduler(object):
+    """Shares the network between downloads.
+
+    Every download is held to the global rate, if there is one, and reads
+    of background downloads hold back while interactive ones are running.
+    The connections open to each host are capped, and interactive downloads
+    are given the next free connection to a host first.
+
+    Without a directory, only the downloads in this process are scheduled
+    together. With one, every process using the same directory is: each
+    connection holds a lock on one of a host's slot files, interactive
+    downloads hold shared locks that background ones look for, and the
+    global rate's token bucket is kept in a file. Locks are released by the
+    kernel when a process dies, so nothing is left held by a crash.
+    """
+
+    def __init__(self, rate: int = None,
+                 host_connections: int = HOST_CONNECTIONS,
+                 directory: str = None) -> None:
+        """Initialize the scheduler with no connections open."""
+        self.directory = directory
+        self.bandwidth = Bandwidth(rate, path=directory and os.path.join(
+            directory, 'bandwidth'
+        ))
+        self.host_connections = host_connections
+        self.connections = Counter()
+        self.waiting = Counter()
+        self.active = Counter()
+        self.slots = {}
+        self.condition = threading.Condition()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self) -> str:
+        """Represent the state of this object as a string."""
+        return "Scheduler(rate={}, host_connections={}, active={})".format(
+            self.bandwidth.rate, self.host_connections, dict(self.active)
+        )
+
+    def _file(self, name: str = None) -> str:
+        """Return the path of a coordination file."""
+        return os.path.join(self.directory, name.replace(os.sep, '_'))
+
+    def _lock(self, name: str = None, mode: int = fcntl.LOCK_EX,
+              blocking: bool = False) -> IO:
+        """Lock a coordination file, waiting for it only if blocking.
+
+        Returns the open file holding the lock, or None if it's held
+        elsewhere in a conflicting mode.
+        """
+        f = open(self._file(name), 'a')
+        try:
+            fcntl.flock(f.fileno(), mode if blocking else
+                        mode | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return None
+        return f
+
+    def _held(self, name: str = None) -> bool:
+        """Return whether any process holds a lock on a coordination file."""
+        if self.directory is None:
+            return False
+        f = self._lock(name)
+        if f is None:
+            return True
+        f.close()
+        return False
+
+    def _available(self, host: str = None, priority: str = None) -> bool:
+        """Return whether a download may open a connection to host now."""
+        if self.connections[host] >= self.host_connections:
+            return False
+        return priority == INTERACTIVE or not (
+            self.waiting[host, INTERACTIVE] or self._held(f'{host}.waiting')
+        )
+
+    def _take_slot(self, host: str = None, priority: str = None) -> bool:
+        """Lock a free slot file for host, returning whether there was one.
+
+        Interactive connections also hold a shared lock that tells every
+        process's background downloads to hold back.
+        """
+        if self.directory is None:
+            return True
+        for index in range(self.host_connections):
+            slot = self._lock(f'{host}.{index}')
+            if slot is not None:
+                held = [slot]
+                # Background downloads only hold the exclusive lock for as
+                # long as it takes to look
+                if priority == INTERACTIVE:
+                    held.append(self._lock('interactive', fcntl.LOCK_SH,
+                                           blocking=True))
+                self.slots.setdefault(host, []).append(held)
+                return True
+        return False
+
+    def acquire(self, url: str = None, priority: str = INTERACTIVE,
+                blocking: bool = True) -> bool:
+        """Take a connection to the host of url, waiting for one if blocking.
+
+        Returns whether a connection was taken.
+        """
+        host = urlparse(url).netloc
+        waiting = None
+        with self.condition:
+            self.waiting[host, priority] += 1
+            try:
+                while not (self._available(host, priority) and
+                           self._take_slot(host, priority)):
+                    if not blocking:
+                        return False
+                    if self.directory is None:
+                        self.condition.wait()
+                        continue
+                    if priority == INTERACTIVE and waiting is None:
+                        waiting = self._lock(f'{host}.waiting',
+                                             fcntl.LOCK_SH, blocking=True)
+                    # Other processes don't notify, so look again shortly
+                    self.condition.wait(POLL_INTERVAL)
+            finally:
+                self.waiting[host, priority] -= 1
+                if waiting is not None:
+                    waiting.close()
+            self.connections[host] += 1
+            self.active[priority] += 1
+        return True
+
+    def reserve(self, url: str = None, count: int = 1,
+                priority: str = INTERACTIVE) -> int:
+        """Take up to count connections to the host of url without waiting.
+
+        Returns how many were taken.
+        """
+        taken = 0
+        while taken < count and self.acquire(url, priority, blocking=False):
+            taken += 1
+        return taken
+
+    def release(self, url: str = None, priority: str = INTERACTIVE,
+                count: int = 1) -> None:
+        """Give back connections to the host of url."""
+        host = urlparse(url).netloc
+        with self.condition:
+            for _ in range(count if self.directory is not None else 0):
+                for f in self.slots[host].pop():
+                    f.close()
+            self.connections[host] -= count
+            self.active[priority] -= count
+            self.condition.notify_all()
+
+    @contextmanager
+    def connection(self, url: str = None,
+                   priority: str = INTERACTIVE) -> Iterator[None]:
+        """Hold a connection to the host of url for the duration."""
+        self.acquire(url, priority)
+        try:
+            yield
+        finally:
+            self.release(url, priority)
+
+    def consume(self, amount: int = 0, priority: str = INTERACTIVE) -> None:
+        """Account for amount bytes read by a download.
+
+        Background downloads wait until no interactive download holds a
+        connection, but read on after BACKGROUND_WAIT seconds regardless so
+        that their connections aren't dropped.
+        """
+        if priority == BACKGROUND:
+            deadline = time.monotonic() + BACKGROUND_WAIT
+            with self.condition:
+                while self.active[INTERACTIVE] or self._held('interactive'):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    if self.directory is not None:
+                        remaining = min(remaining, POLL_INTERVAL)
+                    self.condition.wait(remaining)
+        self.bandwidth.consume(amount)
+
+
+def parse_rate(rate: str = None) -> int:
+    """Parse a rate like 500K or 2M, in bytes per second, to an integer.
+
+    Suffixes are powers of 1024. Raises RuntimeError for anything else.
+    """
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?(?:/s)?\s*$',
+                     str(rate), re.IGNORECASE)
+    if match is None:
+        raise RuntimeError(f'Unable to parse rate {rate}.')
+    number, suffix = match.groups()
+    return int(float(number) * 1024 ** ' KMG'.index(suffix.upper() or ' '))
+
+
+def get_scheduler() -> Scheduler:
+    """Return the scheduler for every download in this process.
+
+    It coordinates with every other process through the directory named by
+    $OSDK_MANAGER_SCHEDULER_DIR, or ~/.operator-sdk/scheduler. The global
+    rate is read from $OSDK_MANAGER_RATE_LIMIT, like 10M, and the cap on
+    connections to each host from $OSDK_MANAGER_HOST_CONNECTIONS. Every
+    process should be given the same ones.
+    """
+    global _scheduler
+    if _scheduler is None:
+        rate = os.getenv('OSDK_MANAGER_RATE_LIMIT')
+        _scheduler = Scheduler(
+            rate=parse_rate(rate) if rate else None,
+            host_connections=int(os.getenv('OSDK_MANAGER_HOST_CONNECTIONS',
+                                           HOST_CONNECTIONS)),
+            directory=os.getenv('OSDK_MANAGER_SCHEDULER_DIR',
+                                SCHEDULER_DIRECTORY)
+        )
+    return _scheduler
+
+
+def priority_of(bandwidth: Bandwidth = None) -> str:
+    """Return the priority class of a download job."""
+    return bandwidth.priority if bandwidth is not None else INTERACTIVE
+
+
+def read_chunks(response: requests.Response = None,
+                bandwidth: Bandwidth = None) -> Iterable[bytes]:
+    """Yield the raw body of a streamed response, within bandwidth.
+
+    Reads are also scheduled against every other download.
+    """
+    scheduler = get_scheduler()
+    priority = priority_of(bandwidth)
+    size = min(scheduler.bandwidth.chunk_size,
+               bandwidth.chunk_size if bandwidth else CHUNK_SIZE)
+    for chunk in response.raw.stream(size, decode_content=False):
+        if bandwidth is not None:
+            bandwidth.consume(len(chunk))
+        scheduler.consume(len(chunk), priority)
+        DOWNLOAD_BYTES.inc(len(chunk))
+        yield chunk
+
+
+def get_session() -> requests.Session:
+    """Return the HTTP session shared by every download in this process."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        # Room for several segmented downloads at once
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=32)
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+    return _session
+
+
+def file_sha256(filename: str = None) -> str:
+    """Return the SHA-256 of a file, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fetch_segment(url: str = None, fd: int = None, start: int = 0,
+                   end: int = 0, session: requests.Session = None,
+                   response: requests.Response = None,
+                   abort: threading.Event = None,
+                   bandwidth: Bandwidth = None) -> None:
+    """Download bytes start to end of url into fd at the same offset.
+
+    A response already streaming from start may be passed in. The segment is
+    resumed from where it got to, with a new range request, if its connection
+    fails. Raises RangesUnsupported if the server sends the whole file.
+    """
+    logger = get_logger()
+    offset = start
+    attempts = 0
+    while offset <= end:
+        try:
+            if response is None:
+                response = session.get(url, stream=True, headers={
+                    'Range': f'bytes={offset}-{end}',
+                    'Accept-Encoding': 'identity',
+                })
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise RangesUnsupported(url)
+            for chunk in read_chunks(response, bandwidth):
+                if abort.is_set():
+                    return
+                chunk = chunk[:end + 1 - offset]
+                os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+                if offset > end:
+                    break
+            if offset <= end:
+                raise requests.ConnectionError(f'{url} ended at {offset}')
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError,
+                urllib3.exceptions.ProtocolError,
+                urllib3.exceptions.ReadTimeoutError) as e:
+            attempts += 1
+            if attempts > SEGMENT_RETRIES:
+                raise
+            logger.debug(f'Resuming {url} at {offset}: {e}')
+        finally:
+            if response is not None:
+                response.close()
+            response = None
+
+
+def _fetch_segmented(url: str = None, fd: int = None, size: int = 0,
+                     segments: int = SEGMENTS,
+                     session: requests.Session = None,
+                     response: requests.Response = None,
+                     bandwidth: Bandwidth = None) -> None:
+    """Download url into fd as several byte ranges at once.
+
+    The file is preallocated so every segment writes straight to its place.
+    The response to the initial request provides the first segment.
+    """
+    if hasattr(os, 'posix_fallocate'):
+        os.posix_fallocate(fd, 0, size)
+    else:  # pragma: no cover
+        os.ftruncate(fd, size)
+    length = -(-size // segments)
+    ranges = [(start, min(start + length, size) - 1)
+              for start in range(0, size, length)]
+    abort = threading.Event()
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [pool.submit(_fetch_segment, url=url, fd=fd, start=start,
+                               end=end, session=session,
+                               response=response if start == 0 else None,
+                               abort=abort, bandwidth=bandwidth)
+                   for start, end in ranges]
+        try:
+            for future in futures:
+                future.result()
+        finally:
+            abort.set()
+
+
+def _request(url: str = None, session: requests.Session = None
+             ) -> Tuple[requests.Response, str]:
+    """Request url, preferring a compressed transfer.
+
+    Mirrors may serve a pre-compressed variant in response, or may keep only
+    the variants, beside where the artifact would be. Returns the response
+    and the codec its body is compressed with.
+    """
+    logger = get_logger()
+    response = session.get(url, stream=True, headers={
+        'Accept-Encoding': accept_encoding()
+    })
+    if response.status_code == 404:
+        for codec in available_codecs():
+            variant = session.get(url + SUFFIXES[codec], stream=True,
+                                  headers={'Accept-Encoding': 'identity'})
+            if variant.ok:
+                logger.debug(f'Using the {codec} variant of {url}')
+                response.close()
+                return variant, codec
+            variant.close()
+    response.raise_for_status()
+    return response, response.headers.get('Content-Encoding', 'identity')
+
+
+def _stream(response: requests.Response = None, fd: int = None,
+            codec: str = 'identity', bandwidth: Bandwidth = None) -> str:
+    """Write a response into fd as a single stream, returning its SHA-256.
+
+    The body is decompressed as it arrives, so the digest is that of the
+    artifact itself.
+    """
+    digest = hashlib.sha256()
+    os.ftruncate(fd, 0)
+    os.lseek(fd, 0, os.SEEK_SET)
+    for chunk in decompress_stream(read_chunks(response, bandwidth), codec):
+        digest.update(chunk)
+        os.write(fd, chunk)
+    return digest.hexdigest()
+
+
+@DOWNLOAD_SECONDS.time()
+def stage(url: str = None, dst: str = None, sha256: str = None,
+          session: requests.Session = None,
+          segments: int = SEGMENTS,
+          bandwidth: Bandwidth = None) -> Tuple[str, str]:
+    """Download url next to dst without replacing it.
+
+    The artifact is streamed into a temporary file in the same directory as
+    dst, so that it can later be renamed over dst atomically. Large artifacts
+    from servers that accept range requests are fetched as several segments
+    at once, which together get past per-connection throughput limits.
+    Otherwise a compressed transfer is preferred, and decompressed as it
+    arrives. If sha256 is provided, the download is checked against it. The
+    download is scheduled against every other, within the limit and priority
+    of its job's bandwidth, which is shared by every segment. Each segment
+    takes a connection to the host, so fewer segments are used when the
+    connections to it are mostly taken. Returns the
+    temporary path and the SHA-256 of what was downloaded.
+    """
+    logger = get_logger()
+    session = session or get_session()
+    fd, tmp = mkstemp(dir=os.path.dirname(dst),
+                      prefix=f'.{os.path.basename(dst)}.', suffix='.part')
+
+    logger.debug(f'Requesting {url}')
+    scheduler = get_scheduler()
+    priority = priority_of(bandwidth)
+    try:
+        with scheduler.connection(url, priority):
+            response, codec = _request(url, session)
+            with response:
+                size = int(response.headers.get('Content-Length') or 0)
+                segmented = (
+                    segments > 1 and size >= 2 * MIN_SEGMENT_SIZE and
+                    response.headers.get('Accept-Ranges') == 'bytes' and
+                    codec == 'identity'
+                )
+                # Redirects to signed URLs are followed once, up front
+                location = response.url
+                extra = scheduler.reserve(
+                    location, min(segments, size // MIN_SEGMENT_SIZE) - 1,
+                    priority
+                ) if segmented else 0
+                segmented = extra > 0
+                if segmented:
+                    logger.debug(f'Fetching {url} in {extra + 1} segments')
+                    try:
+                        _fetch_segmented(url=location, fd=fd, size=size,
+                                         segments=extra + 1, session=session,
+                                         response=response,
+                                         bandwidth=bandwidth)
+                    except RangesUnsupported:
+                        logger.debug(f'Range requests ignored, streaming '
+                                     f'{url}')
+                        segmented = False
+                        response, codec = _request(url, session)
+                    finally:
+                        scheduler.release(location, priority, extra)
+                if segmented:
+                    os.close(fd)
+                    fd = None
+                    digest = file_sha256(tmp)
+                else:
+                    with response:
+                        digest = _stream(response, fd, codec, bandwidth)
+        if sha256 is not None and digest != sha256:
+            raise RuntimeError((f'{url} has SHA-256 {digest}, '
+                                f'expected {sha256}.'))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+    logger.debug(f'Staged {url} at {tmp} with SHA-256 {digest}')
+    return tmp, digest
+
+
+def commit(tmp: str = None, dst: str = None, mode: int = 0o755) -> None:
+    """Move a staged download into place at dst."""
+    os.chmod(tmp, mode)
+    os.replace(tmp, dst)
+
+
+def fetch(url: str = None, dst: str = None, sha256: str = None,
+          session: requests.Session = None, mode: int = 0o755,
+          segments: int = SEGMENTS, bandwidth: Bandwidth = None) -> str:
+    """Download url to dst, replacing it atomically.
+
+    Returns the SHA-256 of the downloaded file.
+    """
+    tmp, digest = stage(url=url, dst=dst, sha256=sha256, session=session,
+                        segments=segments, bandwidth=bandwidth)
+    commit(tmp=tmp, dst=dst, mode=mode)
+    return digest
@@ -0,0 +1,204 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager binary installation.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the strategies for installing cached binaries into a
+directory in $PATH, from symlinks to full copies, and the records that let an
+installation be recognized when it isn't a symlink.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Tuple
+
+from osdk_manager.util import get_logger, locked
+
+# The FICLONE ioctl, from <linux/fs.h>
+FICLONE = 0x40049409
+
+# The ways a binary may be installed, cheapest first. Symlinks break when only
+# the directory in $PATH is visible, such as in containers that bind-mount it,
+# which the other strategies don't.
+STRATEGIES = ['symlink', 'hardlink', 'reflink', 'copy_file_range', 'copy']
+
+# Installs the binary as a file of its own, with the cheapest strategy that
+# the filesystem supports
+FILE = 'file'
+
+
+def _symlink(src: str = None, dst: str = None) -> None:
+    """Install src at dst as a symlink."""
+    os.symlink(src, dst)
+
+
+def _hardlink(src: str = None, dst: str = None) -> None:
+    """Install src at dst as a hard link, on the same filesystem."""
+    os.link(src, dst)
+
+
+def _reflink(src: str = None, dst: str = None) -> None:
+    """Install src at dst as a copy sharing its extents, on btrfs or XFS."""
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    shutil.copymode(src, dst)
+
+
+def _copy_file_range(src: str = None, dst: str = None) -> None:
+    """Install src at dst as a copy made in the kernel."""
+    if not hasattr(os, 'copy_file_range'):
+        raise OSError('copy_file_range is unavailable')
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        remaining = os.fstat(s.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+            if copied == 0:
+                raise OSError(f'{src} ended early')
+            remaining -= copied
+    shutil.copymode(src, dst)
+
+
+def _copy(src: str = None, dst: str = None) -> None:
+    """Install src at dst as a plain copy."""
+    shutil.copyfile(src, dst)
+    shutil.copymode(src, dst)
+
+
+_installers = {
+    'symlink': _symlink,
+    'hardlink': _hardlink,
+    'reflink': _reflink,
+    'copy_file_range': _copy_file_range,
+    'copy': _copy,
+}
+
+
+def stage_binary(src: str = None, dst: str = None,
+                 strategy: str = 'symlink') -> Tuple[str, str]:
+    """Install src next to dst under a temporary name.
+
+    With the file strategy, each strategy that makes a file of its own is
+    tried in turn. Returns the temporary path and the strategy that was used.
+    """
+    if strategy not in STRATEGIES + [FILE]:
+        raise RuntimeError(f'Unknown install strategy {strategy}.')
+    logger = get_logger()
+    tmp = f'{dst}.{os.getpid()}.{threading.get_ident()}.tmp'
+    candidates = STRATEGIES[1:] if strategy == FILE else [strategy]
+    for candidate in candidates:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        try:
+            _installers[candidate](src, tmp)
+            return tmp, candidate
+        except OSError as e:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+            if candidate == candidates[-1]:
+                raise
+            logger.debug(f'Unable to {candidate} {src}: {e}')
+
+
+def _records_path(directory: str = None) -> str:
+    """Return the path to the install records for a cache directory."""
+    return os.path.join(directory, 'installs.json')
+
+
+def _load_records(directory: str = None) -> Dict[str, dict]:
+    """Return the install records for a cache directory."""
+    try:
+        with open(_records_path(directory)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _record(installed: Dict[str, Tuple[str, str]] = {}) -> None:
+    """Record which binary each destination was installed from, and how.
+
+    Symlinks need no record, so any old record for them is dropped. Records
+    are kept in the cache directory of the binary that was installed.
+    """
+    by_directory = {}
+    for dst, (src, strategy) in installed.items():
+        by_directory.setdefault(os.path.dirname(src), {})[
+            os.path.abspath(dst)
+        ] = (src, strategy)
+    for directory, entries in by_directory.items():
+        path = _records_path(directory)
+        with locked(path):
+            records = _load_records(directory)
+            for dst, (src, strategy) in entries.items():
+                records.pop(dst, None)
+                if strategy != 'symlink':
+                    stat = os.stat(dst)
+                    records[dst] = {
+                        'src': src, 'strategy': strategy,
+                        'ino': stat.st_ino, 'size': stat.st_size,
+                        'mtime_ns': stat.st_mtime_ns,
+                    }
+            if not records and not os.path.exists(path):
+                continue
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(records, f, indent=2, sort_keys=True)
+            os.replace(tmp, path)
+
+
+def install_binaries(binaries: Dict[str, str] = {},
+                     strategy: str = 'symlink') -> None:
+    """Install each source binary in binaries at its destination.
+
+    Every binary is staged under a temporary name first and then renamed over
+    its destination, so each destination flips atomically and nothing is
+    changed at all if any of the binaries can't be staged.
+    """
+    logger = get_logger()
+    staged = {}
+    try:
+        for dst, src in binaries.items():
+            staged[dst] = stage_binary(src, dst, strategy)
+    except (OSError, RuntimeError):
+        for tmp, _ in staged.values():
+            os.remove(tmp)
+        raise
+    for dst, (tmp, used) in staged.items():
+        logger.info(f'Installing {binaries[dst]} at {dst} with {used}')
+        os.replace(tmp, dst)
+    _record({dst: (binaries[dst], used) for dst, (_, used) in staged.items()})
+
+
+def installed_source(dst: str = None, directory: str = None) -> str:
+    """Return the cached binary installed at dst, or None if it isn't one.
+
+    Installations that aren't symlinks are recognized from the records kept
+    in the cache directory, as long as they haven't been changed since.
+    """
+    if os.path.islink(dst):
+        return os.readlink(dst)
+    record = _load_records(directory).get(os.path.abspath(dst))
+    if record is None:
+        return None
+    try:
+        stat = os.stat(dst)
+    except FileNotFoundError:
+        return None
+    if (stat.st_ino, stat.st_size, stat.st_mtime_ns) != \
+            (record['ino'], record['size'], record['mtime_ns']):
+        return None
+    return record['src']
+
+
+def is_installed(src: str = None, dst: str = None, directory: str = None,
+                 strategy: str = 'symlink') -> bool:
+    """Return whether src is installed at dst the way strategy would."""
+    if installed_source(dst, directory) != src:
+        return False
+    if os.path.islink(dst):
+        return strategy == 'symlink'
+    recorded = _load_records(directory)[os.path.abspath(dst)]['strategy']
+    return strategy == FILE or strategy == recorded
@@ -0,0 +1,315 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager metrics.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the counters and histograms that osdk-manager keeps about
+its downloads, verification, builds and commands, and their rendering in the
+Prometheus text format. They can be written to a node-exporter textfile, where
+every process on a host adds to the same totals, or served by the daemon.
+
+It only uses the standard library, since the utilities it instruments import
+it.
+"""
+
+import fcntl
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from tempfile import mkstemp
+from typing import Dict, Iterable, List, Tuple
+
+# Histogram buckets for durations, in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+           300.0, 600.0, 1800.0)
+
+# The environment variable naming the textfile to write metrics to
+TEXTFILE_ENV = 'OSDK_MANAGER_METRICS_TEXTFILE'
+
+
+def _escape(value: str = None) -> str:
+    """Escape a label value for the text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def _format(value: float = 0) -> str:
+    """Format a sample value, without a fraction when it's whole."""
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _labels(pairs: Iterable[Tuple[str, str]] = ()) -> str:
+    """Format label pairs for the text format."""
+    pairs = list(pairs)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"'
+                          for name, value in pairs) + '}'
+
+
+class Metric(object):
+    """A family of samples, one series for each combination of labels.
+
+    Each series is kept as a list of numbers, so that series can be added
+    together and subtracted from each other the same way for any kind of
+    metric.
+    """
+
+    kind = None
+
+    def __init__(self, name: str = None, documentation: str = None,
+                 labelnames: Tuple[str, ...] = ()) -> None:
+        """Initialize an empty metric."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str] = {}) -> str:
+        """Return the key of the series for labels."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError((f'{self.name} takes labels '
+                              f'{", ".join(self.labelnames)}.'))
+        return json.dumps([str(labels[name]) for name in self.labelnames])
+
+    def _empty(self) -> List[float]:
+        """Return the values of a series with nothing in it."""
+        return [0]
+
+    def _update(self, key: str = None, values: List[float] = None,
+                sign: int = 1) -> None:
+        """Add values to the series at key, or subtract them."""
+        with self.lock:
+            series = self.series.setdefault(key, self._empty())
+            for i, value in enumerate(values):
+                series[i] += sign * value
+
+    def snapshot(self) -> Dict[str, List[float]]:
+        """Return a copy of every series."""
+        with self.lock:
+            return {key: list(values) for key, values in self.series.items()}
+
+    def render(self, series: Dict[str, List[float]] = None) -> List[str]:
+        """Return the lines of the text format for series."""
+        lines = [f'# HELP {self.name} {self.documentation}',
+                 f'# TYPE {self.name} {self.kind}']
+        for key, values in sorted(series.items()):
+            pairs = list(zip(self.labelnames, json.loads(key)))
+            lines += self._samples(pairs, values)
+        return lines
+
+    def _samples(self, pairs: List[Tuple[str, str]] = [],
+                 values: List[float] = None) -> List[str]:
+        """Return the sample lines of one series."""
+        return [f'{self.name}{_labels(pairs)} {_format(values[0])}']
+
+
+class Counter(Metric):
+    """A total that only goes up."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Add amount to the series for labels."""
+        if amount < 0:
+            raise ValueError('Counters can only be increased.')
+        self._update(self._key(labels), [amount])
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str = None, documentation: str = None,
+                 labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = BUCKETS) -> None:
+        """Initialize an empty histogram with upper bounds buckets."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _empty(self) -> List[float]:
+        """Return a count for each bucket and +Inf, the sum and the count."""
+        return [0] * (len(self.buckets) + 3)
+
+    def observe(self, value: float = None, **labels) -> None:
+        """Count value in the series for labels."""
+        values = [int(value <= bound) for bound in self.buckets] + \
+            [1, value, 1]
+        self._update(self._key(labels), values)
+
+    @contextmanager
+    def time(self, **labels) -> Iterable[None]:
+        """Observe how many seconds the context takes, even if it fails.
+
+        This can also decorate a function, to time each call.
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def _samples(self, pairs: List[Tuple[str, str]] = [],
+                 values: List[float] = None) -> List[str]:
+        """Return the bucket, sum and count lines of one series."""
+        bounds = [_format(bound) for bound in self.buckets] + ['+Inf']
+        lines = [f'{self.name}_bucket{_labels(pairs + [("le", bound)])} '
+                 f'{_format(count)}'
+                 for bound, count in zip(bounds, values)]
+        lines.append(f'{self.name}_sum{_labels(pairs)} '
+                     f'{_format(values[-2])}')
+        lines.append(f'{self.name}_count{_labels(pairs)} '
+                     f'{_format(values[-1])}')
+        return lines
+
+
+class Registry(object):
+    """The metrics of a process, and what has been written of them.
+
+    Textfiles accumulate what every process on a host has done, so each flush
+    adds only what this process did since its last one. Its own metrics are
+    never reset, so that a long-running process can serve them too.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a registry with no metrics."""
+        self.metrics = {}
+        self.flushed = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric: Metric = None) -> Metric:
+        """Add metric to the registry, returning it."""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> Dict[str, Dict[str, List[float]]]:
+        """Return a copy of every series of every metric."""
+        return {name: metric.snapshot()
+                for name, metric in self.metrics.items()}
+
+    def render(self, snapshot: Dict[str, Dict[str, List[float]]] = None
+               ) -> str:
+        """Return the metrics in the Prometheus text format.
+
+        Renders snapshot, if it's given, rather than this process's metrics.
+        Series of metrics that aren't registered are left out.
+        """
+        snapshot = self.snapshot() if snapshot is None else snapshot
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines += metric.render(snapshot.get(name, {}))
+        return '\n'.join(lines) + '\n'
+
+    def flush(self, path: str = None) -> bool:
+        """Add what this process did since its last flush to a textfile.
+
+        path defaults to $OSDK_MANAGER_METRICS_TEXTFILE. The totals are kept
+        in path.json, under a lock on path.lock, and the textfile is replaced
+        atomically so that node-exporter never reads it half-written. Returns
+        whether there was a textfile to write.
+        """
+        path = path or os.getenv(TEXTFILE_ENV)
+        if not path:
+            return False
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self.lock, open(f'{path}.lock', 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(f'{path}.json') as f:
+                        totals = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError):
+                    totals = {}
+                snapshot = self.snapshot()
+                for name, series in snapshot.items():
+                    flushed = self.flushed.get(name, {})
+                    for key, values in series.items():
+                        total = totals.setdefault(name, {}).setdefault(
+                            key, [0] * len(values)
+                        )
+                        before = flushed.get(key, [0] * len(values))
+                        for i, value in enumerate(values):
+                            total[i] += value - before[i]
+                _replace(f'{path}.json', json.dumps(totals))
+                _replace(path, self.render(totals))
+                self.flushed = snapshot
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+        return True
+
+
+def _replace(path: str = None, content: str = None) -> None:
+    """Write content to path atomically, readable by node-exporter."""
+    fd, tmp = mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                      prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+REGISTRY = Registry()
+
+DOWNLOAD_BYTES = REGISTRY.register(Counter(
+    'osdk_manager_download_bytes_total',
+    'Bytes downloaded from release mirrors.'
+))
+DOWNLOAD_SECONDS = REGISTRY.register(Histogram(
+    'osdk_manager_download_seconds',
+    'Seconds taken to download each artifact.'
+))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'osdk_manager_cache_lookups_total',
+    'Binaries looked up in the artifact cache, by whether they were there.',
+    ('result',)
+))
+UPDATE_SECONDS = REGISTRY.register(Histogram(
+    'osdk_manager_update_seconds',
+    'Seconds taken to update each binary.',
+    ('binary',)
+))
+VERIFY_SECONDS = REGISTRY.register(Histogram(
+    'osdk_manager_verify_seconds',
+    'Seconds taken to verify release signatures with GPG.'
+))
+VERIFY_FAILURES = REGISTRY.register(Counter(
+    'osdk_manager_verify_failures_total',
+    'Release signatures that failed GPG verification.'
+))
+BUILD_SECONDS = REGISTRY.register(Histogram(
+    'osdk_manager_operator_build_seconds',
+    'Seconds taken to build operator images.',
+    ('runtime',)
+))
+PUSH_SECONDS = REGISTRY.register(Histogram(
+    'osdk_manager_operator_push_seconds',
+    'Seconds taken to push operator images.',
+    ('runtime',)
+))
+SHELL_COMMANDS = REGISTRY.register(Counter(
+    'osdk_manager_shell_commands_total',
+    'Commands run in subprocesses, by program and whether they succeeded.',
+    ('command', 'result')
+))
+
+
+def flush(path: str = None) -> bool:
+    """Add this process's metrics to a textfile, as Registry.flush does."""
+    return REGISTRY.flush(path)
+
+
+def render() -> str:
+    """Return this process's metrics in the Prometheus text format."""
+    return REGISTRY.render()
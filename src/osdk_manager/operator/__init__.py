@@ -8,4 +8,6 @@ This subpackage includes the classes and modules required to scaffold, build,
 validate, and push Operator-related repositories and images.
 """
 
+from .build_cache import BuildCache  # noqa: F401
 from .operator import Operator  # noqa: F401
+from .scaffold import ScaffoldCache  # noqa: F401
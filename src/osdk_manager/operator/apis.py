@@ -0,0 +1,379 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager Operator API scaffolding.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This module includes an in-process equivalent of running operator-sdk create
+api once per kind for an Ansible operator. Every kind's files are rendered
+from templates matching the installed operator-sdk, and the files that all
+kinds share are read and written once, no matter how many kinds there are.
+"""
+
+import os
+import yaml
+from string import Template
+from typing import Dict, List
+
+from osdk_manager.util import get_logger
+
+# The operator-sdk releases whose ansible plugin these templates reproduce
+SUPPORTED_SDK_VERSIONS = ['1.3', '1.4']
+
+CRD = Template('''---
+apiVersion: apiextensions.k8s.io/v1
+kind: CustomResourceDefinition
+metadata:
+  name: ${plural}.${fqgroup}
+spec:
+  group: ${fqgroup}
+  names:
+    kind: ${kind}
+    listKind: ${kind}List
+    plural: ${plural}
+    singular: ${lower}
+  scope: Namespaced
+  versions:
+  - name: ${version}
+    schema:
+      openAPIV3Schema:
+        description: ${kind} is the Schema for the ${plural} API
+        properties:
+          apiVersion:
+            description: 'APIVersion defines the versioned schema of this representation
+              of an object. Servers should convert recognized schemas to the latest
+              internal value, and may reject unrecognized values. More info: https://git.k8s.io/community/contributors/devel/sig-architecture/api-conventions.md#resources'
+            type: string
+          kind:
+            description: 'Kind is a string value representing the REST resource this
+              object represents. Servers may infer this from the endpoint the client
+              submits requests to. Cannot be updated. In CamelCase. More info: https://git.k8s.io/community/contributors/devel/sig-architecture/api-conventions.md#types-kinds'
+            type: string
+          metadata:
+            type: object
+          spec:
+            description: Spec defines the desired state of ${kind}
+            type: object
+            x-kubernetes-preserve-unknown-fields: true
+          status:
+            description: Status defines the observed state of ${kind}
+            type: object
+            x-kubernetes-preserve-unknown-fields: true
+        type: object
+    served: true
+    storage: true
+    subresources:
+      status: {}
+''')  # noqa: E501
+
+SAMPLE = Template('''apiVersion: ${fqgroup}/${version}
+kind: ${kind}
+metadata:
+  name: ${lower}-sample
+spec:
+  foo: bar
+''')
+
+EDITOR_ROLE = Template('''# permissions for end users to edit ${plural}.
+apiVersion: rbac.authorization.k8s.io/v1
+kind: ClusterRole
+metadata:
+  name: ${lower}-editor-role
+rules:
+- apiGroups:
+  - ${fqgroup}
+  resources:
+  - ${plural}
+  verbs:
+  - create
+  - delete
+  - get
+  - list
+  - patch
+  - update
+  - watch
+- apiGroups:
+  - ${fqgroup}
+  resources:
+  - ${plural}/status
+  verbs:
+  - get
+''')
+
+VIEWER_ROLE = Template('''# permissions for end users to view ${plural}.
+apiVersion: rbac.authorization.k8s.io/v1
+kind: ClusterRole
+metadata:
+  name: ${lower}-viewer-role
+rules:
+- apiGroups:
+  - ${fqgroup}
+  resources:
+  - ${plural}
+  verbs:
+  - get
+  - list
+  - watch
+- apiGroups:
+  - ${fqgroup}
+  resources:
+  - ${plural}/status
+  verbs:
+  - get
+''')
+
+MOLECULE_TEST = Template('''---
+- name: Create the ${fqgroup}/${version}.${kind}
+  k8s:
+    state: present
+    namespace: '{{ namespace }}'
+    definition: "{{ lookup('template', '/'.join([samples_dir, cr_file])) | from_yaml }}"
+    wait: yes
+    wait_timeout: 300
+    wait_condition:
+      type: Running
+      reason: Successful
+      status: "True"
+  vars:
+    cr_file: '${group}_${version}_${lower}.yaml'
+
+- name: Add assertions here
+  assert:
+    that: false
+    fail_msg: FIXME Add real assertions for your operator
+''')  # noqa: E501
+
+CRD_KUSTOMIZATION = '''# This kustomization.yaml is not intended to be run by itself,
+# since it depends on service name and namespace that are out of this kustomize package.
+# It should be run by config/default
+resources:
+# +kubebuilder:scaffold:crdkustomizeresource
+'''  # noqa: E501
+
+SAMPLES_KUSTOMIZATION = '''## Append samples you want in your CSV to this file as resources ##
+resources:
+# +kubebuilder:scaffold:manifestskustomizesamples
+'''  # noqa: E501
+
+ROLE_RULES = Template('''  ##
+  ## Rules for ${fqgroup}/${version}, Kind: ${kind}
+  ##
+  - apiGroups:
+      - ${fqgroup}
+    resources:
+      - ${plural}
+      - ${plural}/status
+      - ${plural}/finalizers
+    verbs:
+      - create
+      - delete
+      - get
+      - list
+      - patch
+      - update
+      - watch
+''')
+
+WATCH = Template('''- version: ${version}
+  group: ${fqgroup}
+  kind: ${kind}
+  # FIXME: Specify the role or playbook for this resource.
+''')
+
+# Per-kind files, relative to the project, with their templates
+FILES = {
+    'config/crd/bases/${fqgroup}_${plural}.yaml': CRD,
+    'config/samples/${group}_${version}_${lower}.yaml': SAMPLE,
+    'config/rbac/${lower}_editor_role.yaml': EDITOR_ROLE,
+    'config/rbac/${lower}_viewer_role.yaml': VIEWER_ROLE,
+    'molecule/default/tasks/${lower}_test.yml': MOLECULE_TEST,
+}
+
+# Shared files, with the marker each kind's fragment is inserted before, the
+# fragment, and what to create the file with if it doesn't exist yet
+INSERTS = {
+    'config/crd/kustomization.yaml': (
+        '# +kubebuilder:scaffold:crdkustomizeresource',
+        Template('- bases/${fqgroup}_${plural}.yaml\n'),
+        CRD_KUSTOMIZATION,
+    ),
+    'config/samples/kustomization.yaml': (
+        '# +kubebuilder:scaffold:manifestskustomizesamples',
+        Template('- ${group}_${version}_${lower}.yaml\n'),
+        SAMPLES_KUSTOMIZATION,
+    ),
+    'config/rbac/role.yaml': (
+        '# +kubebuilder:scaffold:rules', ROLE_RULES, None
+    ),
+    'watches.yaml': (
+        '# +kubebuilder:scaffold:watch', WATCH, None
+    ),
+}
+
+
+# Endings that flect, which the operator-sdk pluralizes kinds with, treats
+# as irregular, uncountable or already plural. pluralize only reproduces its
+# regular rules, so kinds ending like this are left to the operator-sdk.
+IRREGULAR_ENDINGS = (
+    # -s other than -ss, like status, analysis, alias and news
+    'as', 'es', 'is', 'os', 'us', 'ys',
+    # -ex and -ix become -ices, like index and matrix
+    'ex', 'ix',
+    # -f and -fe become -ves, like leaf and knife
+    'f', 'fe',
+    # Latin and Greek endings, like datum, formula and phenomenon, though
+    # -ion is regular
+    'a', 'um', 'on', 'ae', 'eau',
+    # -o takes -es or -s, like potato and photo
+    'o',
+    # -z doubles, like quiz
+    'z',
+)
+
+# Words that flect pluralizes irregularly or not at all, whatever they end in
+IRREGULAR_WORDS = (
+    'criterion', 'child', 'person', 'people', 'man', 'men', 'foot', 'feet',
+    'tooth', 'teeth', 'goose', 'geese', 'mouse', 'mice', 'louse', 'lice', 'ox',
+    'deer', 'sheep', 'fish', 'moose', 'rice', 'equipment', 'information',
+    'money', 'police', 'aircraft', 'offspring', 'series', 'species',
+)
+
+
+def covered(kind: str = None) -> bool:
+    """Return whether pluralize matches the operator-sdk for kind."""
+    word = kind.lower()
+    if word.endswith(IRREGULAR_WORDS):
+        return False
+    return word.endswith('ion') or not word.endswith(IRREGULAR_ENDINGS)
+
+
+def pluralize(word: str = None) -> str:
+    """Pluralize a lowercase kind the way the operator-sdk does.
+
+    These are flect's regular rules, which only hold for kinds that covered
+    accepts.
+    """
+    if word.endswith(('ss', 'x', 'ch', 'sh')):
+        return word + 'es'
+    if word.endswith('y') and word[-2:-1] not in 'aeiou':
+        return word[:-1] + 'ies'
+    return word + 's'
+
+
+def supported(sdk_version: str = None) -> bool:
+    """Return whether the templates match an operator-sdk version."""
+    return '.'.join(str(sdk_version).split('.')[:2]) in SUPPORTED_SDK_VERSIONS
+
+
+def insert_before_marker(content: str = None, marker: str = None,
+                         fragments: List[str] = []) -> str:
+    """Insert fragments just before the line holding marker."""
+    index = content.find(marker)
+    if index < 0:
+        raise RuntimeError(f'Unable to find the {marker} marker.')
+    line_start = content.rfind('\n', 0, index) + 1
+    return content[:line_start] + ''.join(fragments) + content[line_start:]
+
+
+def add_project_resources(content: str = None,
+                          resources: List[Dict[str, str]] = []) -> str:
+    """Add resources to the PROJECT file without reformatting the rest."""
+    entries = ''.join(
+        f'- group: {r["group"]}\n  kind: {r["kind"]}\n'
+        f'  version: {r["version"]}\n' for r in resources
+    )
+    lines = content.splitlines(keepends=True)
+    for i, line in enumerate(lines):
+        if line.startswith('resources:'):
+            end = i + 1
+            while end < len(lines) and lines[end].startswith(('-', ' ')):
+                end += 1
+            return ''.join(lines[:end]) + entries + ''.join(lines[end:])
+    # Keep the keys sorted, as the operator-sdk writes them
+    for i, line in enumerate(lines):
+        if not line.startswith((' ', '-')) and line.split(':')[0] > \
+                'resources':
+            return (''.join(lines[:i]) + 'resources:\n' + entries +
+                    ''.join(lines[i:]))
+    return content + 'resources:\n' + entries
+
+
+def create_apis(directory: str = None, domain: str = None, group: str = None,
+                api_version: str = None, kinds: List[str] = [],
+                sdk_version: str = None) -> List[str]:
+    """Scaffold APIs for many kinds in an initialized Ansible operator.
+
+    The result matches running operator-sdk create api for each kind in turn.
+    Every file is rendered, and every shared file updated, in memory before
+    anything is written, so nothing changes if any of them fails. Raises
+    RuntimeError for operator-sdk versions the templates don't match, for
+    kinds that pluralize doesn't cover, if a kind already exists, or if a
+    shared file is missing or lacks its marker. Returns the files written.
+    """
+    logger = get_logger()
+    if not supported(sdk_version):
+        raise RuntimeError(f'No API templates for operator-sdk {sdk_version}.')
+    for kind in kinds:
+        if not covered(kind):
+            raise RuntimeError(f'Unable to pluralize {kind} as the '
+                               f'operator-sdk would.')
+
+    with open(os.path.join(directory, 'PROJECT')) as f:
+        project = f.read()
+    existing = (yaml.safe_load(project) or {}).get('resources') or []
+    for resource in existing:
+        if resource.get('group') == group and \
+                resource.get('version') == api_version and \
+                resource.get('kind') in kinds:
+            raise RuntimeError(f'API {group}/{api_version} '
+                               f'{resource["kind"]} already exists.')
+
+    values = []
+    for kind in kinds:
+        lower = kind.lower()
+        values.append({
+            'group': group,
+            'fqgroup': f'{group}.{domain}' if domain else group,
+            'version': api_version,
+            'kind': kind,
+            'lower': lower,
+            'plural': pluralize(lower),
+        })
+
+    files = {}
+    for value in values:
+        for path, template in FILES.items():
+            filename = os.path.join(directory,
+                                    Template(path).substitute(value))
+            if os.path.exists(filename):
+                raise RuntimeError(f'{filename} already exists.')
+            files[filename] = template.substitute(value)
+
+    updates = {}
+    for path, (marker, fragment, initial) in INSERTS.items():
+        filename = os.path.join(directory, path)
+        if os.path.isfile(filename):
+            with open(filename) as f:
+                content = f.read()
+        elif initial is not None:
+            content = initial
+        else:
+            raise RuntimeError(f'{filename} is missing, is the project '
+                               f'initialized?')
+        updates[filename] = insert_before_marker(content, marker, [
+            fragment.substitute(value) for value in values
+        ])
+    updates[os.path.join(directory, 'PROJECT')] = add_project_resources(
+        project, [{'group': group, 'version': api_version, 'kind': kind}
+                  for kind in kinds]
+    )
+
+    written = []
+    for filename, content in list(files.items()) + list(updates.items()):
+        logger.debug(f'Writing {filename}')
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'w') as f:
+            f.write(content)
+        written.append(filename)
+
+    return written
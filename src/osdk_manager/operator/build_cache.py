@@ -0,0 +1,181 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager Operator build cache.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This module includes a persistent, per-operator layer cache for image builds
+that can be exported and restored as a single archive, for runners that don't
+keep the container runtime's own cache between jobs.
+"""
+
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import time
+
+from osdk_manager.util import get_logger, shell
+
+
+def _size(path: str = None) -> int:
+    """Return the total size of the files under path."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            filename = os.path.join(root, name)
+            if not os.path.islink(filename):
+                total += os.path.getsize(filename)
+    return total
+
+
+class BuildCache(object):
+    """A layer cache directory for the images of one operator.
+
+    With docker, builds go through buildx and import and export its local
+    cache format, which covers every layer of the build. podman and buildah
+    can't export their layer cache to a directory, so the last image built is
+    saved instead and loaded back on restore. Builds then reuse its layers
+    with --layers, including the large operator base image.
+    """
+
+    logger = get_logger()
+
+    def __init__(self, image: str = None, directory: str = os.path.expanduser(
+            '~/.operator-sdk/build-cache'), platform: str = None) -> None:
+        """Initialize the cache for an operator image.
+
+        Builds for a specific platform, like linux/arm64, each get their own
+        cache.
+        """
+        self.image = image
+        self.directory = directory
+        self.platform = platform
+        name = image if platform is None else f'{image}_{platform}'
+        self.path = os.path.join(directory,
+                                 re.sub(r'[^A-Za-z0-9_.-]', '_', name))
+
+    def __repr__(self) -> str:
+        """Represent the state of this object as a string."""
+        return "BuildCache(image={}, platform={}, path={})".format(
+            self.image, self.platform, self.path
+        )
+
+    def build_command(self, runtime: str = None, image: str = None,
+                      context: str = '.', args: str = '') -> str:
+        """Return the build command that reads and writes this cache.
+
+        Any args are passed along to the build as they are.
+        """
+        args = f'{args} ' if args else ''
+        layers = os.path.join(self.path, 'layers')
+        if runtime == 'docker':
+            cache_from = ''
+            if os.path.isdir(layers):
+                cache_from = f'--cache-from type=local,src={layers} '
+            return (f'docker buildx build --load {cache_from}'
+                    f'--cache-to type=local,dest={layers}.new,mode=max '
+                    f'{args}-t {image} {context}')
+        return f'{runtime} build --layers {args}-t {image} {context}'
+
+    def save_command(self, runtime: str = None, image: str = None) -> str:
+        """Return the command that saves a built image into this cache.
+
+        Returns None if the build wrote the cache itself.
+        """
+        if runtime == 'docker':
+            return None
+        archive = os.path.join(self.path, 'image.tar')
+        return f'{runtime} save -o {archive}.tmp {image}'
+
+    def keep(self, runtime: str = None) -> None:
+        """Keep what a successful build, and its save command, wrote."""
+        layers = os.path.join(self.path, 'layers')
+        if runtime == 'docker':
+            if os.path.isdir(f'{layers}.new'):
+                shutil.rmtree(layers, ignore_errors=True)
+                os.rename(f'{layers}.new', layers)
+        else:
+            archive = os.path.join(self.path, 'image.tar')
+            os.replace(f'{archive}.tmp', archive)
+        os.utime(self.path)
+        self.logger.info(f'Updated build cache {self.path}')
+
+    def commit(self, runtime: str = None, image: str = None) -> None:
+        """Keep the cache from a successful build of image."""
+        os.makedirs(self.path, exist_ok=True)
+        command = self.save_command(runtime, image)
+        if command is not None:
+            [line for line in shell(command)]
+        self.keep(runtime)
+
+    def export(self, archive: str = None) -> str:
+        """Write the cache to a single archive, returning its path."""
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(
+            os.path.abspath(archive)
+        ))
+        os.close(fd)
+        with tarfile.open(tmp, 'w') as tar:
+            tar.add(self.path, arcname='.')
+        os.replace(tmp, archive)
+        self.logger.info(f'Exported build cache {self.path} to {archive}')
+        return archive
+
+    def restore(self, archive: str = None, runtime: str = None) -> None:
+        """Replace the cache with an exported archive.
+
+        For podman and buildah, the saved image is also loaded back so that
+        the next build can use its layers.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.directory, prefix='.restore.')
+        try:
+            with tarfile.open(archive) as tar:
+                for member in tar.getmembers():
+                    name = os.path.normpath(member.name)
+                    if name.startswith('..') or os.path.isabs(name) or \
+                            member.issym() or member.islnk():
+                        raise RuntimeError(f'Refusing to extract {name} '
+                                           f'from {archive}.')
+                tar.extractall(staging)
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.rename(staging, self.path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        os.utime(self.path)
+        self.logger.info(f'Restored build cache {self.path} from {archive}')
+
+        image_archive = os.path.join(self.path, 'image.tar')
+        if runtime != 'docker' and os.path.isfile(image_archive):
+            [line for line in shell(f'{runtime} load -i {image_archive}')]
+
+    def prune(self, max_bytes: int = None, max_age: int = None) -> list:
+        """Prune the build caches of every operator in the cache directory.
+
+        Caches unused for more than max_age seconds are removed, then the
+        least recently used ones until no more than max_bytes remain.
+        Returns the paths removed.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path) and not name.startswith('.'):
+                entries.append((os.stat(path).st_mtime, _size(path), path))
+        entries.sort()
+
+        removed = []
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+        for mtime, size, path in entries:
+            too_old = max_age is not None and now - mtime > max_age
+            too_big = max_bytes is not None and total > max_bytes
+            if too_old or too_big:
+                self.logger.info(f'Pruning build cache {path}')
+                shutil.rmtree(path)
+                total -= size
+                removed.append(path)
+        return removed
@@ -0,0 +1,174 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager Operator local cluster loading.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This module includes side-loading of images into the nodes of local minikube
+and kind clusters, without a registry and without an image archive on disk.
+"""
+
+import json
+import queue
+import shlex
+import subprocess
+import threading
+from typing import List
+
+from osdk_manager.util import get_logger, shell
+
+PROVIDERS = ['minikube', 'kind']
+
+# How much of an image archive to read at a time while loading it
+LOAD_CHUNK_SIZE = 1 << 20
+
+# How many chunks may wait for each node before reading more of the archive
+LOAD_QUEUE_CHUNKS = 16
+
+
+def bare_id(image_id: str = None) -> str:
+    """Return an image ID without its sha256: prefix, which podman omits."""
+    if image_id is not None and image_id.startswith('sha256:'):
+        return image_id[len('sha256:'):]
+    return image_id
+
+
+class Cluster(object):
+    """The nodes of a local cluster, and how to run commands on them."""
+
+    logger = get_logger()
+
+    def __init__(self, provider: str = 'minikube', profile: str = None,
+                 runtime: str = 'docker') -> None:
+        """Initialize the cluster, finding its nodes.
+
+        The profile is the minikube profile or the kind cluster name. kind
+        nodes are containers run by runtime.
+        """
+        if provider not in PROVIDERS:
+            raise RuntimeError(f'Unsupported cluster provider {provider}.')
+        self.provider = provider
+        self.profile = profile or provider
+        self.runtime = runtime
+        if provider == 'kind':
+            self.nodes = [line.strip() for line in shell(
+                f'kind get nodes --name {self.profile}'
+            ) if line.strip()]
+            self.container_runtime = 'containerd'
+        else:
+            self.nodes = [line.split()[0] for line in shell(
+                f'minikube -p {self.profile} node list'
+            ) if line.strip()]
+            self.container_runtime = self._minikube_container_runtime()
+
+    def __repr__(self) -> str:
+        """Represent the state of this object as a string."""
+        return "Cluster(provider={}, profile={}, nodes={})".format(
+            self.provider, self.profile, self.nodes
+        )
+
+    def _minikube_container_runtime(self) -> str:
+        """Return the container runtime a minikube profile was started with."""
+        profiles = json.loads('\n'.join(shell(
+            'minikube profile list -o json'
+        )))
+        for profile in profiles.get('valid') or []:
+            if profile.get('Name') == self.profile:
+                return profile['Config']['KubernetesConfig'].get(
+                    'ContainerRuntime'
+                ) or 'docker'
+        return 'docker'
+
+    def node_command(self, node: str = None,
+                     command: List[str] = []) -> List[str]:
+        """Return the arguments that run command on a node."""
+        if self.provider == 'kind':
+            return [self.runtime, 'exec', '-i', node] + command
+        return ['minikube', '-p', self.profile, 'ssh', '-n', node, '--',
+                ' '.join(['sudo'] + [shlex.quote(arg) for arg in command])]
+
+    def load_command(self) -> List[str]:
+        """Return the command that loads an image archive from stdin."""
+        if self.container_runtime == 'docker':
+            return ['docker', 'load']
+        if self.container_runtime == 'crio':
+            return ['podman', 'load']
+        return ['ctr', '--namespace=k8s.io', 'images', 'import', '--digests',
+                '-']
+
+    def image_id(self, node: str = None, image: str = None) -> str:
+        """Return the ID of an image on a node, or None if it isn't there."""
+        result = subprocess.run(
+            self.node_command(node, ['crictl', 'inspecti', '-o', 'json',
+                                     image]),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        if result.returncode != 0:
+            return None
+        try:
+            return json.loads(result.stdout)['status']['id']
+        except (ValueError, KeyError):
+            return None
+
+    def load(self, image: str = None, nodes: List[str] = []) -> None:
+        """Stream an image from the runtime into nodes, all at once.
+
+        The image is saved once, and the archive is fanned out to a load
+        running on every node as it's read, without touching the disk. Each
+        load is fed from its own thread and queue, so a slow node only holds
+        up the others once its queue is full.
+        """
+        self.logger.info("Loading {} into {}".format(image, ', '.join(nodes)))
+        save = subprocess.Popen([self.runtime, 'save', image],
+                                stdout=subprocess.PIPE)
+        loaders = [subprocess.Popen(self.node_command(node,
+                                                      self.load_command()),
+                                    stdin=subprocess.PIPE,
+                                    stdout=subprocess.DEVNULL)
+                   for node in nodes]
+        queues = [queue.Queue(LOAD_QUEUE_CHUNKS) for _ in loaders]
+        feeders = [threading.Thread(target=self._feed, args=(loader, chunks),
+                                    daemon=True)
+                   for loader, chunks in zip(loaders, queues)]
+        for feeder in feeders:
+            feeder.start()
+        try:
+            for chunk in iter(lambda: save.stdout.read(LOAD_CHUNK_SIZE),
+                              b''):
+                for chunks in queues:
+                    chunks.put(chunk)
+        finally:
+            for chunks in queues:
+                chunks.put(None)
+            for feeder in feeders:
+                feeder.join()
+            save.stdout.close()
+        failed = [command for command, proc in
+                  [(save.args, save)] + [(loader.args, loader)
+                                         for loader in loaders]
+                  if proc.wait() != 0]
+        if failed:
+            raise RuntimeError('Unable to load {}: {} failed.'.format(
+                image, ' '.join(failed[0])
+            ))
+
+    @staticmethod
+    def _feed(loader: subprocess.Popen = None,
+              chunks: queue.Queue = None) -> None:
+        """Write chunks to a loader's stdin until the None that ends them.
+
+        A loader that stops reading has failed, which its exit code will
+        report, so the rest of its chunks are dropped.
+        """
+        broken = False
+        for chunk in iter(chunks.get, None):
+            if broken:
+                continue
+            try:
+                loader.stdin.write(chunk)
+            except BrokenPipeError:
+                broken = True
+        try:
+            loader.stdin.close()
+        except BrokenPipeError:
+            pass
@@ -0,0 +1,108 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager Operator source fingerprints.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This module includes the fingerprint of an operator's build context, which is
+stored as a label on the images built from it so that an identical build can
+be recognized without running it.
+"""
+
+import hashlib
+import os
+from fnmatch import fnmatch
+from typing import Iterator, List, Tuple
+
+# The image label that carries the fingerprint of the build context
+FINGERPRINT_LABEL = 'osdk-manager.source-fingerprint'
+
+# How much of a file to read at a time while hashing it
+CHUNK_SIZE = 1024 * 1024
+
+
+def dockerignore_patterns(directory: str = None) -> List[str]:
+    """Return the patterns in the .dockerignore file in directory."""
+    patterns = []
+    try:
+        with open(os.path.join(directory, '.dockerignore')) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                negate = line.startswith('!')
+                pattern = os.path.normpath(line.lstrip('!').strip('/'))
+                patterns.append(('!' if negate else '') + pattern)
+    except FileNotFoundError:
+        pass
+    return patterns
+
+
+def ignored(path: str = None, patterns: List[str] = []) -> bool:
+    """Return whether a context-relative path is excluded by patterns.
+
+    As with docker, the last pattern that matches wins, and a pattern that
+    matches a directory excludes everything under it.
+    """
+    parts = path.split('/')
+    prefixes = ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+    excluded = False
+    for pattern in patterns:
+        negate = pattern.startswith('!')
+        pattern = pattern.lstrip('!').replace('**/', '*/')
+        if any(fnmatch(prefix, pattern) for prefix in prefixes):
+            excluded = not negate
+    return excluded
+
+
+def walk_context(directory: str = None) -> Iterator[Tuple[str, List[str]]]:
+    """Walk the build context, yielding each directory and its files.
+
+    Directories are relative to directory, and only the files the build
+    context would include are listed. The .git directory is always left
+    out, since fetches change it without changing the source.
+    """
+    patterns = dockerignore_patterns(directory)
+    # Exceptions can bring back files under an excluded directory
+    prune = not any(pattern.startswith('!') for pattern in patterns)
+    for root, dirs, files in os.walk(directory):
+        rel_root = os.path.relpath(root, directory)
+        dirs[:] = sorted(
+            name for name in dirs if name != '.git' and not (prune and ignored(
+                os.path.normpath(os.path.join(rel_root, name)), patterns
+            ))
+        )
+        yield rel_root, [name for name in sorted(files) if not ignored(
+            os.path.normpath(os.path.join(rel_root, name)), patterns
+        )]
+
+
+def context_files(directory: str = None) -> Iterator[str]:
+    """Yield the relative paths of the files in the build context, in order."""
+    for rel_root, files in walk_context(directory):
+        for name in files:
+            yield os.path.normpath(os.path.join(rel_root, name))
+
+
+def source_fingerprint(directory: str = None) -> str:
+    """Return the SHA-256 fingerprint of the build context in directory.
+
+    The fingerprint covers the path, executable bit and content of every
+    file the build context would include. Files are read in chunks, so
+    large ones aren't held in memory.
+    """
+    digest = hashlib.sha256()
+    for rel in context_files(directory):
+        filename = os.path.join(directory, rel)
+        content = hashlib.sha256()
+        if os.path.islink(filename):
+            content.update(os.readlink(filename).encode())
+            mode = 'l'
+        else:
+            with open(filename, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    content.update(chunk)
+            mode = 'x' if os.access(filename, os.X_OK) else 'f'
+        digest.update(f'{rel}\0{mode}\0'.encode())
+        digest.update(content.digest())
+    return digest.hexdigest()
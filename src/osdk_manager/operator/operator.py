@@ -8,10 +8,28 @@ This module includes the class that scaffolds, builds, validates, and pushes
 Operator-related images with the necessary context.
 """
 
+import json
 import os
+import requests
+import time
 import yaml
-from typing import TypeVar, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, TypeVar, List
 
+from osdk_manager.operator.apis import covered, create_apis, supported
+from osdk_manager.operator.build_cache import BuildCache
+from osdk_manager.operator.cluster import Cluster, bare_id
+from osdk_manager.operator.fingerprint import (FINGERPRINT_LABEL,
+                                               source_fingerprint)
+from osdk_manager.operator.retention import (referenced_images,
+                                             select_removals)
+from osdk_manager.operator.scaffold import ScaffoldCache, sdk_version
+from osdk_manager.metrics import BUILD_SECONDS, PUSH_SECONDS
+from osdk_manager.registry import (INDEX_TYPES, Registry, copy_image,
+                                   split_image)
+from osdk_manager.runtime import RuntimeClient
+from osdk_manager.shim import read_pins
 from osdk_manager.util import determine_runtime, get_logger, shell
 
 
@@ -32,7 +50,8 @@ class Operator(object):
                  kinds: List[str] = [], default_sample: str = None,
                  domain: str = None, group: str = None,
                  api_version: str = None, initialized: bool = False,
-                 runtime: str = None) -> None:
+                 runtime: str = None, osdk_version: str = None,
+                 opm_version: str = None, platforms: List[str] = []) -> None:
         """Initialize an Operator with the necessary variables."""
         self.directory = directory
         os.chdir(self.directory)
@@ -49,17 +68,38 @@ class Operator(object):
         self.group = group
         self.api_version = api_version
         self.initialized = initialized
+        self.osdk_version = osdk_version
+        self.opm_version = opm_version
+        self.platforms = platforms or []
+        self.build_times = {}
+        self.build_cache = BuildCache(image=self.image)
+        self.credentials = None
+        self._registry = None
+        self._runtime_client = None
+        self._published = set()
         if runtime is not None:
             self.runtime = runtime
         else:
             self.runtime = determine_runtime()
 
+    def __getstate__(self) -> dict:
+        """Return the state to pickle, leaving out the API clients.
+
+        The clients hold sessions and locks, and are created again when
+        they're next needed.
+        """
+        state = self.__dict__.copy()
+        state['_registry'] = None
+        state['_runtime_client'] = None
+        return state
+
     def __repr__(self) -> str:
         """Represent the state of this object as a string."""
         return ("Operator(directory={}, image={}, version={}, tag={},"
                 " channels={}, kinds={}, default_sample={}, domain={},"
                 " group={}, api_version={}, initialized={},"
-                " runtime={})").format(
+                " runtime={}, osdk_version={}, opm_version={},"
+                " platforms={})").format(
             self.directory,
             self.image,
             self.version,
@@ -71,7 +111,10 @@ class Operator(object):
             self.group,
             self.api_version,
             self.initialized,
-            self.runtime
+            self.runtime,
+            self.osdk_version,
+            self.opm_version,
+            self.platforms
         )
 
     @classmethod
@@ -82,6 +125,14 @@ class Operator(object):
             settings = yaml.safe_load(f)
         cls.logger.debug("Recovered settings:")
         cls.logger.debug(settings)
+        # YAML parses a pin like 1.10 as a float, losing digits, so pins are
+        # read as the text the shims see
+        pins = read_pins(os.path.join(directory, filename))
+        for pin in ["osdk-version", "opm-version"]:
+            if pin in pins:
+                settings[pin] = pins[pin]
+            elif settings.get(pin) is not None:
+                settings[pin] = str(settings[pin])
 
         return cls(directory=os.path.realpath(directory),
                    image=settings.get("image"),
@@ -92,29 +143,74 @@ class Operator(object):
                    domain=settings.get("domain"),
                    group=settings.get("group"),
                    api_version=settings.get("api-version"),
-                   runtime=runtime)
+                   runtime=runtime,
+                   osdk_version=settings.get("osdk-version"),
+                   opm_version=settings.get("opm-version"),
+                   platforms=settings.get("platforms"))
 
-    def initialize_ansible_operator(self) -> None:
+    def initialize_ansible_operator(self, cache: ScaffoldCache = None,
+                                    hardlink: bool = False,
+                                    batch: bool = False) -> None:
         """Initialize an Ansible Operator SDK operator.
 
-        Also creates APIs represented by the Kinds specified.
+        Also creates APIs represented by the Kinds specified. If a
+        ScaffoldCache is provided, operator-sdk only runs the first time a
+        given set of settings is scaffolded, and the result is copied from
+        the cache after that. With batch, the APIs for every Kind are
+        scaffolded in one pass instead of one operator-sdk run per Kind.
         """
         if self.initialized:
             return
 
+        # A shim may run another operator-sdk than osdk_version names, so
+        # the cache and the batch templates go by the one that will run
+        version = None
+        if cache is not None or batch:
+            version = sdk_version(self.directory)
+        scaffold = partial(self._scaffold_ansible, batch=batch,
+                           version=version)
+        if cache is None:
+            scaffold(self.directory)
+        else:
+            key = cache.key(sdk_version=version, plugin="ansible",
+                            domain=self.domain, group=self.group,
+                            api_version=self.api_version, kinds=self.kinds)
+            cache.scaffold(key, self.directory, scaffold, hardlink=hardlink)
+
+        self.initialized = True
+
+    def _scaffold_ansible(self, directory: str = None, batch: bool = False,
+                          version: str = None) -> None:
+        """Run the operator-sdk to scaffold an Ansible operator.
+
+        version is the operator-sdk version that runs in directory, which
+        batch scaffolding needs to pick its templates.
+        """
         [line for line in shell(
             "operator-sdk init --plugins=ansible --domain={}".format(
                 self.domain
-            )
+            ), cwd=directory
         )]
+        if batch:
+            if not supported(version):
+                self.logger.warning(("Unable to batch scaffold APIs with "
+                                     "operator-sdk {}, scaffolding them one "
+                                     "at a time.").format(version))
+            elif not all(covered(kind) for kind in self.kinds):
+                self.logger.warning(("Unable to pluralize every kind as the "
+                                     "operator-sdk would, scaffolding them "
+                                     "one at a time."))
+            else:
+                create_apis(directory=directory, domain=self.domain,
+                            group=self.group, api_version=self.api_version,
+                            kinds=self.kinds, sdk_version=version)
+                return
         [[line for line in shell(
             "operator-sdk create api --group={} --version={} --kind={}".format(
                 self.group, self.api_version, kind
-            )
+            ), cwd=directory
         )] for kind in self.kinds]
 
-        self.initialized = True
-
     def _set_vars(self) -> None:
         """Export appropriate variables into the environment for the SDK."""
         os.environ["IMG"] = ':'.join([self.image, self.tag])
@@ -135,32 +231,313 @@ class Operator(object):
     def login(self, username: str = None, password: str = None) -> None:
         """Log in to the repository for the current image.
 
-        Will raise an exception if unable to log in.
+        Will raise an exception if unable to log in. The credentials are also
+        kept for looking up images in the registry directly.
         """
         [line for line in shell("{} login -u {} -p {} {}".format(
             self.runtime, username, password, self.image.split('/', 2)[0]
         ))]
+        self.credentials = (username, password)
+        self._registry = None
 
-    def build(self) -> str:
+    def registry(self) -> Registry:
+        """Return a client for the registry of the current image."""
+        if self._registry is None:
+            self._registry = Registry(self.image.split('/', 1)[0],
+                                      *(self.credentials or (None, None)))
+        return self._registry
+
+    def published(self, fingerprint: str = None) -> bool:
+        """Return whether the registry already has this build of the image.
+
+        The image tag must exist and carry the fingerprint of the current
+        source. Only the manifest and image config are fetched, never the
+        layers. An unreachable registry, or one that refuses the
+        credentials or doesn't say where to get a token, counts as not
+        published.
+        """
+        self._set_vars()
+        fingerprint = fingerprint or source_fingerprint(self.directory)
+        if (os.getenv("IMG"), fingerprint) in self._published:
+            return True
+        _, repository, tag = split_image(os.getenv("IMG"))
+        try:
+            digest = self.registry().manifest_digest(repository, tag)
+            if digest is None:
+                return False
+            labels = self.registry().labels(repository, digest)
+        except (requests.RequestException, RuntimeError, KeyError) as e:
+            self.logger.warning("Unable to look up {}: {}".format(
+                os.getenv("IMG"), e
+            ))
+            return False
+        if labels.get(FINGERPRINT_LABEL) != fingerprint:
+            return False
+        self._published.add((os.getenv("IMG"), fingerprint))
+        return True
+
+    def build(self, cache: bool = False, skip_published: bool = False,
+              builders: Dict[str, str] = {}) -> str:
         """Build an operator image using the saved values.
 
+        With cache, the build reads and updates this operator's build_cache,
+        which can be exported and restored between ephemeral runners. With
+        skip_published, nothing is built if the registry already has an image
+        with this tag built from the same source.
+
+        If the operator has platforms, an image is built for each of them at
+        the same time, tagged with the platform, and push assembles them into
+        a manifest list. Platforms are emulated unless builders maps them to
+        the docker buildx builders to run them on natively. The time each
+        platform took is kept in build_times.
+
+        Images built with cache or skip_published are labeled with the
+        fingerprint of their source, which skip_published compares against.
+        Other builds skip reading the whole build context to compute it.
+
+        Returns the image name and tag as a string.
+        """
+        self._set_vars()
+        label = ""
+        if cache or skip_published:
+            fingerprint = source_fingerprint(self.directory)
+            if skip_published and self.published(fingerprint):
+                self.logger.info("{} is already published, skipping the {}."
+                                 .format(os.getenv("IMG"), "build"))
+                return os.getenv("IMG")
+            label = "--label {}={}".format(FINGERPRINT_LABEL, fingerprint)
+        if self.platforms and builders and self.runtime != "docker":
+            raise RuntimeError("Builders are only supported with docker.")
+        with BUILD_SECONDS.time(runtime=self.runtime):
+            if self.platforms:
+                build = partial(self._build_platform, label=label,
+                                cache=cache, builders=builders)
+                with ThreadPoolExecutor(
+                    max_workers=len(self.platforms)
+                ) as pool:
+                    self.build_times = dict(zip(
+                        self.platforms, pool.map(build, self.platforms)
+                    ))
+            elif cache:
+                [line for line in shell(self.build_cache.build_command(
+                    self.runtime, os.getenv("IMG"), args=label
+                ))]
+                self.build_cache.commit(self.runtime, os.getenv("IMG"))
+            else:
+                [line for line in shell("{} build {} -t {} .".format(
+                    self.runtime, label, os.getenv("IMG")
+                ))]
+        return os.getenv("IMG")
+
+    def platform_image(self, platform: str = None) -> str:
+        """Return the image and tag built for one platform."""
+        return "{}:{}-{}".format(self.image, self.tag,
+                                 platform.replace("/", "-"))
+
+    def _build_platform(self, platform: str = None, label: str = None,
+                        cache: bool = False,
+                        builders: Dict[str, str] = {}) -> float:
+        """Build the image for one platform, returning how long it took."""
+        start = time.monotonic()
+        image = self.platform_image(platform)
+        args = "--platform {} {}".format(platform, label)
+        if platform in builders:
+            args = "--builder {} {}".format(builders[platform], args)
+        if cache:
+            build_cache = BuildCache(image=self.image,
+                                     directory=self.build_cache.directory,
+                                     platform=platform)
+            [line for line in shell(build_cache.build_command(
+                self.runtime, image, args=args
+            ))]
+            build_cache.commit(self.runtime, image)
+        else:
+            [line for line in shell("{} build {} -t {} .".format(
+                self.runtime, args, image
+            ))]
+        elapsed = time.monotonic() - start
+        self.logger.info("Built {} for {} in {:.1f}s".format(
+            os.getenv("IMG"), platform, elapsed
+        ))
+        return elapsed
+
+    def push(self, skip_published: bool = False) -> str:
+        """Push the operator image to its registry.
+
+        With skip_published, nothing is pushed if the registry already has an
+        image with this tag built from the same source. If the operator has
+        platforms, each platform's image is pushed at the same time, and then
+        a manifest list of them is pushed under the image tag.
+
         Returns the image name and tag as a string.
         """
         self._set_vars()
-        [line for line in shell("{} build . -t {}".format(self.runtime,
-                                                          os.getenv("IMG")))]
+        if skip_published and self.published():
+            self.logger.info("{} is already published, skipping the {}."
+                             .format(os.getenv("IMG"), "push"))
+            return os.getenv("IMG")
+        with PUSH_SECONDS.time(runtime=self.runtime):
+            if self.platforms:
+                images = [self.platform_image(p) for p in self.platforms]
+                with ThreadPoolExecutor(max_workers=len(images)) as pool:
+                    list(pool.map(lambda image: [line for line in shell(
+                        "{} push {}".format(self.runtime, image)
+                    )], images))
+                self._push_manifest_list()
+            else:
+                [line for line in shell("{} push {}".format(
+                    self.runtime, os.getenv("IMG")
+                ))]
         return os.getenv("IMG")
 
+    def _push_manifest_list(self, image: str = None) -> None:
+        """Push a manifest list of the pushed images for each platform.
+
+        The list is pushed as image, or as $IMG by default.
+        """
+        image = image or os.getenv("IMG")
+        _, repository, tag = split_image(image)
+        manifests = []
+        for platform in self.platforms:
+            _, _, platform_tag = split_image(self.platform_image(platform))
+            media_type, content, digest = self.registry().manifest_raw(
+                repository, platform_tag
+            )
+            os_name, architecture, variant = (platform.split("/") +
+                                              [None])[:3]
+            entry = {
+                "mediaType": media_type,
+                "digest": digest,
+                "size": len(content),
+                "platform": {"architecture": architecture, "os": os_name},
+            }
+            if variant:
+                entry["platform"]["variant"] = variant
+            manifests.append(entry)
+        # Match the list to what the runtime pushed, OCI or Docker
+        if all("docker" in m["mediaType"] for m in manifests):
+            media_type = INDEX_TYPES[1]
+        else:
+            media_type = INDEX_TYPES[0]
+        self.registry().put_manifest(repository, tag, media_type, json.dumps({
+            "schemaVersion": 2,
+            "mediaType": media_type,
+            "manifests": manifests,
+        }).encode())
+        self.logger.info("Pushed a manifest list of {} for {}".format(
+            image, ", ".join(self.platforms)
+        ))
+
+    def promote(self, dest_registry: str = None, tags: List[str] = [],
+                username: str = None, password: str = None,
+                jobs: int = 4) -> List[str]:
+        """Copy the operator and bundle images to another registry.
+
+        dest_registry is a registry host, optionally followed by the
+        namespace to promote into, such as quay.io/example. Without a
+        namespace, the images keep their repository path. The images are
+        copied registry to registry, without a pull or a push through the
+        container runtime, and only the blobs the destination is missing are
+        transferred. The images are tagged with tags, or the current tag.
+
+        Returns the promoted images.
+        """
+        self._set_vars()
+        tags = tags or [self.tag]
+        host, _, namespace = dest_registry.partition('/')
+        destination = Registry(host, username, password)
+        promoted = []
+        for image, required in [(os.getenv("IMG"), True),
+                                (os.getenv("BUNDLE_IMG"), False)]:
+            _, repository, tag = split_image(image)
+            if namespace:
+                dest_repository = '/'.join([namespace,
+                                            repository.split('/')[-1]])
+            else:
+                dest_repository = repository
+            if self.registry().manifest_digest(repository, tag) is None:
+                if required:
+                    raise RuntimeError("Unable to find {} to promote.".format(
+                        image
+                    ))
+                self.logger.warning("Unable to find {}, not promoting it."
+                                    .format(image))
+                continue
+            copy_image(self.registry(), repository, tag, destination,
+                       dest_repository, tags, jobs)
+            promoted.extend("{}/{}:{}".format(host, dest_repository, t)
+                            for t in tags)
+        return promoted
+
+    def load_into_cluster(self, profile: str = None,
+                          provider: str = "minikube",
+                          images: List[str] = []) -> Dict[str, List[str]]:
+        """Load images into every node of a local minikube or kind cluster.
+
+        Loads the operator image by default. Nodes that already have the
+        same image ID are skipped, and the rest are loaded at the same time
+        from a single save of the image.
+
+        Returns the nodes each image was loaded into.
+        """
+        self._set_vars()
+        cluster = Cluster(provider=provider, profile=profile,
+                          runtime=self.runtime)
+        if not cluster.nodes:
+            raise RuntimeError("No nodes found in the {} cluster {}.".format(
+                provider, cluster.profile
+            ))
+        loaded = {}
+        for image in images or [os.getenv("IMG")]:
+            details = self.runtime_client().inspect(image)
+            if details is None:
+                raise RuntimeError("Unable to find {} to load.".format(image))
+            with ThreadPoolExecutor(max_workers=len(cluster.nodes)) as pool:
+                ids = pool.map(partial(cluster.image_id, image=image),
+                               cluster.nodes)
+                nodes = [node for node, image_id in zip(cluster.nodes, ids)
+                         if bare_id(image_id) != bare_id(details["Id"])]
+            if nodes:
+                cluster.load(image, nodes)
+            else:
+                self.logger.info("{} is already loaded, skipping it.".format(
+                    image
+                ))
+            loaded[image] = nodes
+        return loaded
+
+    def runtime_client(self) -> RuntimeClient:
+        """Return a client for the container runtime's image API."""
+        if self._runtime_client is None:
+            self._runtime_client = RuntimeClient(self.runtime)
+        return self._runtime_client
+
     def get_images(self) -> List[str]:
         """Return a list of all images related to this operator."""
-        ret = []
-        for line in shell(self.runtime +
-                          " images --format='{{.Repository}}:{{.Tag}}'"):
-            if line.startswith(self.image):
-                ret.append(line.strip())
-        return ret
+        return self.runtime_client().images(self.image)
 
     def remove_images(self) -> None:
         """Remove all identified images that belong to this operator."""
         for image in self.get_images():
-            [line for line in shell(self.runtime + " rmi -f " + image)]
+            self.runtime_client().remove(image, force=True)
+
+    def prune_images(self, keep_releases: int = 3, keep: List[str] = [],
+                     dry_run: bool = False) -> List[str]:
+        """Remove old images that belong to this operator.
+
+        Keeps the newest keep_releases releases, the current tag, any images
+        or tags in keep, and the images the project's bundle and catalog
+        manifests reference, so the build cache stays warm for current work.
+        The rest are removed together, unless this is a dry run.
+
+        Returns the images removed.
+        """
+        keep = list(keep) + [self.tag] + sorted(
+            referenced_images(self.directory, self.image)
+        )
+        removals = select_removals(self.get_images(), keep_releases, keep)
+        self.logger.info("Pruning {} images of {}".format(len(removals),
+                                                          self.image))
+        if not dry_run:
+            self.runtime_client().remove_images(removals, force=True)
+        return removals
@@ -0,0 +1,75 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager Operator image retention.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This module includes the policy that decides which of an operator's local
+images to keep, so that old releases can be removed without losing the
+images, and layers, that current work still builds on.
+"""
+
+import os
+import re
+from typing import List, Set
+
+from osdk_manager.util import version_key
+
+# The suffix of the tags that Operator.platform_image gives platform images
+PLATFORM_SUFFIX = re.compile(r'-(linux|windows)-[a-z0-9]+(-v[0-9]+)?$')
+
+# The project directories that may reference images by tag
+REFERENCE_DIRECTORIES = ['bundle', 'config', 'catalog']
+
+
+def release_tag(tag: str = None) -> str:
+    """Return the release a tag belongs to, without any platform suffix."""
+    return PLATFORM_SUFFIX.sub('', tag)
+
+
+def referenced_images(directory: str = None, image: str = None) -> Set[str]:
+    """Return the images under image referenced by the project's manifests.
+
+    This finds the operator images that bundle and catalog manifests point
+    at, along with the bundle images that catalogs point at.
+    """
+    pattern = re.compile(re.escape(image) +
+                         r'[A-Za-z0-9._/-]*:[A-Za-z0-9._-]+')
+    found = set()
+    for name in REFERENCE_DIRECTORIES:
+        for root, _, files in os.walk(os.path.join(directory, name)):
+            for filename in files:
+                if not filename.endswith(('.yaml', '.yml', '.json')):
+                    continue
+                with open(os.path.join(root, filename)) as f:
+                    found.update(pattern.findall(f.read()))
+    return found
+
+
+def select_removals(images: List[str] = [], keep_releases: int = 3,
+                    keep: List[str] = []) -> List[str]:
+    """Return the images that a retention policy would remove.
+
+    The newest keep_releases releases are kept, across every repository, so
+    that a release's operator and bundle images are kept or removed
+    together. So are any images or tags in keep, along with their platform
+    images, and any tags that aren't versions, like latest.
+    """
+    releases = set()
+    for name in images:
+        key = version_key(release_tag(name.rpartition(':')[2]))
+        if key is not None:
+            releases.add(key)
+    kept_releases = set(sorted(releases, reverse=True)[:keep_releases])
+
+    removals = []
+    for name in images:
+        tag = name.rpartition(':')[2]
+        key = version_key(release_tag(tag))
+        if key is None or key in kept_releases:
+            continue
+        release = '{}:{}'.format(name.rpartition(':')[0], release_tag(tag))
+        if {name, release, tag, release_tag(tag)} & set(keep):
+            continue
+        removals.append(name)
+    return removals
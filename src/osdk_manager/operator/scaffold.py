@@ -0,0 +1,179 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager Operator scaffolding cache.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This module includes a cache of operator-sdk scaffolding, so that projects
+with identical settings are only ever scaffolded by operator-sdk once and
+copied from the cache from then on. Copies share their extents with the cache
+on filesystems that support reflinks.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Callable, List
+
+from osdk_manager.install import _reflink
+from osdk_manager.util import get_logger, locked, shell
+
+# The project directory is named this while being scaffolded for the cache,
+# and every occurrence is replaced with the real project name when copied out.
+PROJECT_TOKEN = 'osdk-manager-scaffold-project'
+
+
+def sdk_version(cwd: str = None) -> str:
+    """Return the version of the operator-sdk that would run in cwd."""
+    for line in shell("operator-sdk version", cwd=cwd):
+        match = re.search(r'operator-sdk version: "?v?([^",]+)', line)
+        if match:
+            return match.group(1)
+    return ''
+
+
+class ScaffoldCache(object):
+    """A cache of generated operator-sdk project trees.
+
+    Each entry holds the tree generated for one combination of SDK version,
+    plugin and API settings, with the project name templated out.
+    """
+
+    logger = get_logger()
+
+    def __init__(self, directory: str = os.path.expanduser(
+            '~/.operator-sdk/scaffolds')) -> None:
+        """Initialize the cache in directory."""
+        self.directory = directory
+
+    @staticmethod
+    def key(sdk_version: str = None, plugin: str = None, domain: str = None,
+            group: str = None, api_version: str = None,
+            kinds: List[str] = []) -> str:
+        """Return the cache key for a set of scaffolding settings."""
+        settings = json.dumps([sdk_version, plugin, domain, group,
+                               api_version, list(kinds)])
+        return hashlib.sha256(settings.encode()).hexdigest()
+
+    def path(self, key: str = None) -> str:
+        """Return the directory an entry is kept in."""
+        return os.path.join(self.directory, key)
+
+    def has(self, key: str = None) -> bool:
+        """Return whether the cache holds an entry for key."""
+        return os.path.isfile(os.path.join(self.path(key), 'index.json'))
+
+    def store(self, key: str = None, source: str = None) -> None:
+        """Store the tree scaffolded in source, named PROJECT_TOKEN."""
+        os.makedirs(self.directory, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.directory, prefix=f'.{key}.')
+        token = PROJECT_TOKEN.encode()
+        index = {'dirs': [], 'files': [], 'templated': []}
+        try:
+            shutil.copytree(source, os.path.join(staging, 'tree'),
+                            symlinks=True)
+            for root, dirs, files in os.walk(source):
+                rel_root = os.path.relpath(root, source)
+                for name in dirs:
+                    index['dirs'].append(os.path.normpath(
+                        os.path.join(rel_root, name)
+                    ))
+                for name in files:
+                    rel = os.path.normpath(os.path.join(rel_root, name))
+                    index['files'].append(rel)
+                    with open(os.path.join(root, name), 'rb') as f:
+                        if token in f.read():
+                            index['templated'].append(rel)
+            with open(os.path.join(staging, 'index.json'), 'w') as f:
+                json.dump(index, f)
+            os.rename(staging, self.path(key))
+            self.logger.info(f'Stored scaffolding {key}')
+        except OSError:
+            if not self.has(key):
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def materialize(self, key: str = None, target: str = None,
+                    project_name: str = None, hardlink: bool = False) -> None:
+        """Recreate a cached tree in target for project_name.
+
+        Files that mention the project name are written out with it filled
+        in. The rest are reflinked to the cache where the filesystem allows
+        and copied otherwise, or hardlinked to the cache if requested, which
+        is only safe if they're never edited in place.
+        """
+        tree = os.path.join(self.path(key), 'tree')
+        with open(os.path.join(self.path(key), 'index.json')) as f:
+            index = json.load(f)
+        templated = set(index['templated'])
+
+        def rename(rel: str) -> str:
+            return os.path.join(target, rel.replace(PROJECT_TOKEN,
+                                                    project_name))
+
+        for rel in index['files']:
+            if os.path.lexists(rename(rel)):
+                raise RuntimeError(f'{rename(rel)} already exists.')
+        for rel in index['dirs']:
+            os.makedirs(rename(rel), exist_ok=True)
+        for rel in index['files']:
+            src, dst = os.path.join(tree, rel), rename(rel)
+            if rel in templated:
+                with open(src, 'rb') as f:
+                    content = f.read()
+                with open(dst, 'wb') as f:
+                    f.write(content.replace(PROJECT_TOKEN.encode(),
+                                            project_name.encode()))
+                shutil.copymode(src, dst)
+                continue
+            if hardlink:
+                try:
+                    os.link(src, dst)
+                    continue
+                except OSError:
+                    pass
+            if not os.path.islink(src):
+                try:
+                    _reflink(src, dst)
+                    shutil.copystat(src, dst)
+                    continue
+                except OSError as e:
+                    self.logger.debug(f'Unable to reflink {src}: {e}')
+                    if os.path.lexists(dst):
+                        os.remove(dst)
+            shutil.copy2(src, dst, follow_symlinks=False)
+        self.logger.info(f'Materialized scaffolding {key} in {target}')
+
+    def scaffold(self, key: str = None, target: str = None,
+                 generate: Callable[[str], None] = None,
+                 hardlink: bool = False) -> bool:
+        """Scaffold target from the cache, generating the entry if needed.
+
+        On a miss, generate is called with an empty directory to scaffold
+        into. That directory is inside target, so that the operator-sdk a
+        shim picks for target is the one that runs. Concurrent misses for the
+        same key only generate it once. Returns whether the entry was already
+        cached.
+        """
+        hit = self.has(key)
+        if not hit:
+            os.makedirs(self.directory, exist_ok=True)
+            with locked(self.path(key)):
+                hit = self.has(key)
+                if not hit:
+                    workspace = tempfile.mkdtemp(dir=target,
+                                                 prefix='.osdk-manager-')
+                    try:
+                        source = os.path.join(workspace, PROJECT_TOKEN)
+                        os.makedirs(source)
+                        generate(source)
+                        self.store(key, source)
+                    finally:
+                        shutil.rmtree(workspace, ignore_errors=True)
+        self.materialize(key, target,
+                         os.path.basename(os.path.normpath(target)), hardlink)
+        return hit
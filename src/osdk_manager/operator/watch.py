@@ -0,0 +1,282 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager Operator watch mode.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This module includes the loop that rebuilds an operator whenever its build
+context changes, watching with inotify where it's available.
+"""
+
+import ctypes
+import ctypes.util
+import multiprocessing
+import os
+import select
+import signal
+import struct
+import threading
+import time
+from typing import Callable, Dict, Set, Tuple
+
+from osdk_manager import metrics
+from osdk_manager.operator.fingerprint import (dockerignore_patterns, ignored,
+                                               walk_context)
+from osdk_manager.util import get_logger
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+              IN_MOVED_TO | IN_CREATE | IN_DELETE)
+EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher(object):
+    """Watches a build context for changes with inotify.
+
+    Every directory in the context is watched, including ones created after
+    watching starts.
+    """
+
+    logger = get_logger()
+
+    # Events arrive as they happen, so the watch loop can check in often
+    interval = 0.1
+
+    def __init__(self, directory: str = None) -> None:
+        """Start watching directory.
+
+        Raises OSError if inotify isn't available.
+        """
+        self.directory = directory
+        self.patterns = dockerignore_patterns(directory)
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'),
+                                use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}
+        self._add_tree('.')
+
+    def _add_tree(self, rel: str = None) -> None:
+        """Watch a directory in the context and every directory under it."""
+        # Exceptions can bring back files under an excluded directory
+        prune = not any(p.startswith('!') for p in self.patterns)
+        for root, dirs, _ in os.walk(os.path.join(self.directory, rel)):
+            path = os.path.normpath(os.path.relpath(root, self.directory))
+            dirs[:] = [name for name in dirs if name != '.git' and not (
+                prune and ignored(os.path.normpath(os.path.join(path, name)),
+                                  self.patterns)
+            )]
+            wd = self.libc.inotify_add_watch(
+                self.fd, os.path.join(self.directory, path).encode(),
+                WATCH_MASK
+            )
+            if wd >= 0:
+                self.watches[wd] = path
+
+    def wait(self, timeout: float = None) -> Set[str]:
+        """Wait up to timeout seconds for changes, returning what changed."""
+        changes = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        while ready:
+            try:
+                buffer = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = EVENT.unpack_from(buffer, offset)
+                name = buffer[offset + EVENT.size:
+                              offset + EVENT.size + length].rstrip(b'\0')
+                offset += EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changes.add('.')
+                    continue
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+                if wd not in self.watches:
+                    continue
+                rel = os.path.normpath(os.path.join(self.watches[wd],
+                                                    name.decode()))
+                if rel == '.dockerignore':
+                    # Directories it no longer excludes need watching
+                    self.patterns = dockerignore_patterns(self.directory)
+                    self._add_tree('.')
+                    changes.add(rel)
+                    continue
+                if rel.split('/')[0] == '.git' or ignored(rel,
+                                                          self.patterns):
+                    continue
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(rel)
+                changes.add(rel)
+            ready, _, _ = select.select([self.fd], [], [], 0)
+        return changes
+
+    def close(self) -> None:
+        """Stop watching."""
+        os.close(self.fd)
+
+
+class PollingWatcher(object):
+    """Watches a build context for changes by polling modification times."""
+
+    def __init__(self, directory: str = None,
+                 interval: float = 0.5) -> None:
+        """Start watching directory, checking every interval seconds."""
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Return the modification time and size of every file."""
+        snapshot = {}
+        for rel_root, files in walk_context(self.directory):
+            for name in files:
+                rel = os.path.normpath(os.path.join(rel_root, name))
+                try:
+                    stat = os.lstat(os.path.join(self.directory, rel))
+                except FileNotFoundError:
+                    continue
+                snapshot[rel] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: float = None) -> Set[str]:
+        """Wait up to timeout seconds for changes, returning what changed."""
+        deadline = time.monotonic() + (timeout or 0)
+        while True:
+            time.sleep(max(0, min(self.interval,
+                                  deadline - time.monotonic())))
+            snapshot = self._snapshot()
+            changes = {rel for rel in set(snapshot) | set(self.snapshot)
+                       if snapshot.get(rel) != self.snapshot.get(rel)}
+            self.snapshot = snapshot
+            if changes or time.monotonic() >= deadline:
+                return changes
+
+    def close(self) -> None:
+        """Stop watching."""
+        pass
+
+
+def get_watcher(directory: str = None, poll: bool = False) -> object:
+    """Return an inotify watcher for directory, or a polling one."""
+    if not poll:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            get_logger().warning(f'Unable to use inotify ({e}), polling for '
+                                 f'changes instead.')
+    return PollingWatcher(directory)
+
+
+def _build(operator: object = None, cache: bool = True,
+           level: int = None) -> None:
+    """Build an operator in its own process group, so it can be cancelled.
+
+    The child's logger starts out fresh, so it's set to log at level.
+    """
+    os.setpgid(0, 0)
+    get_logger().handlers[0].setLevel(level)
+    operator.build(cache=cache)
+
+
+def start_build(operator: object = None,
+                cache: bool = True) -> multiprocessing.Process:
+    """Build an operator in a child process.
+
+    The child is spawned rather than forked, since the watch loop runs
+    alongside other threads whose locks a fork could copy while held.
+    """
+    process = multiprocessing.get_context('spawn').Process(
+        target=_build, daemon=True,
+        args=(operator, cache, get_logger().handlers[0].level)
+    )
+    process.start()
+    try:
+        # Also done by the child, but it may not have got that far yet
+        os.setpgid(process.pid, process.pid)
+    except OSError:
+        pass
+    return process
+
+
+def cancel_build(process: multiprocessing.Process = None) -> None:
+    """Cancel a build, along with the runtime commands it's running."""
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    process.join()
+
+
+def watch(operator: object = None, debounce: float = 0.5, cache: bool = True,
+          poll: bool = False, on_build: Callable[[bool], None] = None,
+          stop: threading.Event = None) -> None:
+    """Rebuild an operator whenever its build context changes.
+
+    Changes are collected until none have been seen for debounce seconds,
+    and a change while a build is running cancels it, so only the latest
+    source is ever built. Builds use the operator's build cache unless cache
+    is False. on_build is called with whether each build succeeded. Runs
+    until stop is set.
+    """
+    logger = get_logger()
+    stop = stop or threading.Event()
+    watcher = get_watcher(operator.directory, poll)
+    logger.info(f'Watching {operator.directory} for changes')
+    pending = set()
+    last_change = None
+    build = None
+    started = None
+    try:
+        while not stop.is_set():
+            changes = watcher.wait(min(debounce, watcher.interval))
+            if changes:
+                logger.debug(f'Changed: {sorted(changes)}')
+                pending |= changes
+                last_change = time.monotonic()
+                if build is not None:
+                    logger.info('Cancelling the build of superseded changes')
+                    cancel_build(build)
+                    build = None
+                continue
+
+            quiet = pending and time.monotonic() - last_change >= debounce
+            if quiet and build is None:
+                logger.info('Rebuilding after changes to {}'.format(
+                    ', '.join(sorted(pending))
+                ))
+                pending = set()
+                started = time.monotonic()
+                build = start_build(operator, cache)
+            elif build is not None and not build.is_alive():
+                build.join()
+                success = build.exitcode == 0
+                elapsed = time.monotonic() - started
+                logger.info('Build {} in {:.1f}s'.format(
+                    'succeeded' if success else 'failed', elapsed
+                ))
+                build = None
+                # Builds run in a child process, so their metrics are kept
+                # here, and written out as each one finishes
+                metrics.BUILD_SECONDS.observe(elapsed,
+                                              runtime=operator.runtime)
+                metrics.flush()
+                if on_build is not None:
+                    on_build(success)
+    finally:
+        if build is not None:
+            cancel_build(build)
+        watcher.close()
@@ -8,13 +8,16 @@ This subpackage includes necessary modules for updating the installation of the
 Operator Package Manager, opm.
 """
 
-import hashlib
 import logging
 import os
-import requests
-from lastversion.lastversion import latest as lastversion
 
-from osdk_manager.util import get_logger
+from osdk_manager.cache import ArtifactCache
+from osdk_manager.catalog import is_constraint, resolve_version
+from osdk_manager.download import Bandwidth
+from osdk_manager.install import (install_binaries, installed_source,
+                                  is_installed)
+from osdk_manager.metrics import CACHE_LOOKUPS, UPDATE_SECONDS
+from osdk_manager.util import get_logger, latest_version
 
 _called_from_test = False
 
@@ -24,9 +27,10 @@ class OpmPaths(object):
 
     def __init__(self, version: str = None, arch: str = 'linux-amd64',
                  directory: str = os.path.expanduser('~/.operator-sdk'),
-                 path: str = os.path.expanduser('~/.local/bin')) -> None:
+                 path: str = os.path.expanduser('~/.local/bin'),
+                 mirror: str = 'https://github.com') -> None:
         """Initialize a simple tracker for OPM-related paths."""
-        download_base_url = (f'https://github.com/operator-framework/'
+        download_base_url = (f'{mirror}/operator-framework/'
                              f'operator-registry/releases/download/v{version}')
         self.filename = f'{arch}-opm'
         self.download_url = f'{download_base_url}/{self.filename}'
@@ -44,17 +48,16 @@ def opm_version(directory: str = os.path.expanduser('~/.operator-sdk'),
         logger.debug(type(arg))
         logger.debug(arg)
 
-    link_path = os.path.join(path, 'opm')
-    if os.path.islink(link_path):
-        target = os.readlink(link_path)
+    target = installed_source(os.path.join(path, 'opm'), directory)
+    if target is not None:
         binary = os.path.basename(target)
         assumed_version = binary.split('-')[-1]
     else:
-        logger.info('Unable to identify opm symlink.')
+        logger.info('Unable to identify opm installation.')
         return ''
     paths = OpmPaths(version=assumed_version, directory=directory, path=path)
-    if not os.readlink(paths.dst) == paths.src:
-        logger.info(f'opm not symlinked into {path}.')
+    if not target == paths.src:
+        logger.info(f'opm not installed into {path}.')
         return ''
     if not os.path.isfile(paths.src):
         logger.info(f'{paths.dst} is a dangling link to {paths.src}')
@@ -63,12 +66,23 @@ def opm_version(directory: str = os.path.expanduser('~/.operator-sdk'),
     return assumed_version
 
 
+@UPDATE_SECONDS.time(binary='opm')
 def opm_update(directory: str = os.path.expanduser('~/.operator-sdk'),
                path: str = os.path.expanduser('~/.local/bin'),
-               version: str = 'latest') -> str:
-    """Update the opm binary."""
+               version: str = 'latest',
+               mirror: str = 'https://github.com',
+               strategy: str = 'symlink',
+               bandwidth: Bandwidth = None,
+               api: str = 'https://api.github.com') -> str:
+    """Update the opm binary.
+
+    The binary is installed with strategy, one of the install STRATEGIES or
+    FILE, after being downloaded within bandwidth, if it's given. A version
+    constraint is resolved against the release catalog, fetched from api if
+    there isn't one yet.
+    """
     logger = get_logger()
-    for arg in [directory, path, version]:
+    for arg in [directory, path, version, mirror, strategy, bandwidth, api]:
         logger.debug(type(arg))
         logger.debug(arg)
 
@@ -80,11 +94,14 @@ def opm_update(directory: str = os.path.expanduser('~/.operator-sdk'),
 
     if version == 'latest':
         logger.debug('Determining latest version of opm')
-        version = lastversion('operator-framework/operator-registry')
+        version = latest_version('operator-framework/operator-registry')
         # lastversion sets handlers on the root logger because it's mean.
         if not _called_from_test:  # pragma: no cover
             root_logger = logging.getLogger()
             root_logger.handlers.clear()
+    elif is_constraint(version):
+        logger.debug(f'Resolving {version} against the release catalog')
+        version = resolve_version('opm', version, directory, api)
 
     if len(str(version)) < 1:  # pragma: no cover
         raise RuntimeError(('Unable to determine latest version. '
@@ -93,23 +110,18 @@ def opm_update(directory: str = os.path.expanduser('~/.operator-sdk'),
 
     logger.info(f'Identified desired installation version as {version}')
     installed_version = opm_version(directory=directory, path=path)
+    paths = OpmPaths(version=version, directory=directory, path=path,
+                     mirror=mirror)
 
-    if version == installed_version:
+    if version == installed_version and \
+            is_installed(paths.src, paths.dst, directory, strategy):
         logger.info(f'{version} is already installed.')
+        CACHE_LOOKUPS.inc(result='hit')
         return version
 
-    paths = OpmPaths(version=version, directory=directory, path=path)
-    if os.path.isfile(paths.src):
-        logger.debug(f'Already downloaded: {paths.filename}')
-    else:
-        logger.debug(f'Requesting {paths.download_url}')
-        binary = requests.get(paths.download_url).content
-        logger.debug(f'Saving {paths.download_url}')
-        with open(paths.src, 'wb') as f:
-            f.write(binary)
-
-        binary_sha256 = hashlib.sha256(binary).hexdigest()
-        logger.debug(f'Saved {paths.dst} with SHA 256 {binary_sha256}')
+    cache = ArtifactCache(directory)
+    cache.ensure(filename=os.path.basename(paths.src), url=paths.download_url,
+                 bandwidth=bandwidth)
 
     src_mode = os.stat(paths.src).st_mode
     src_mode_ex = src_mode | 0o111
@@ -117,15 +129,9 @@ def opm_update(directory: str = os.path.expanduser('~/.operator-sdk'),
         logger.info(f'Making {paths.src} executable.')
         os.chmod(paths.src, src_mode_ex & 0o7777)
 
-    if os.path.islink(paths.dst):
-        if os.readlink(paths.dst) == paths.src:
-            logger.debug(f'Already linked {paths.src} to {paths.dst}')
-        else:
-            logger.info(f'Symlinking {paths.src} to {paths.dst}')
-            os.remove(paths.dst)
-            os.symlink(paths.src, paths.dst)
+    if is_installed(paths.src, paths.dst, directory, strategy):
+        logger.debug(f'Already installed {paths.src} at {paths.dst}')
     else:
-        logger.info(f'Symlinking {paths.src} to {paths.dst}')
-        os.symlink(paths.src, paths.dst)
+        install_binaries({paths.dst: paths.src}, strategy)
 
     return str(version)
@@ -7,49 +7,74 @@ version Operator SDK-based Kubernetes operators.
 This file contains the code to update the installed Operator SDK binaries.
 """
 
-import hashlib
 import logging
 import os
-import requests
-from lastversion.lastversion import latest as lastversion
+from concurrent.futures import ThreadPoolExecutor
 from tempfile import mkstemp
 from pathlib import Path
 from typing import List
 
-from osdk_manager.util import get_logger, GpgTrust
+from osdk_manager.cache import ArtifactCache
+from osdk_manager.catalog import is_constraint, resolve_version
+from osdk_manager.download import Bandwidth, get_session
+from osdk_manager.install import install_binaries, installed_source
+from osdk_manager.metrics import CACHE_LOOKUPS, UPDATE_SECONDS, VERIFY_SECONDS
+from osdk_manager.util import get_gpg_trust, get_logger, latest_version
 
 _called_from_test = False
 
+OSDK_DOWNLOADS = ['operator-sdk', 'ansible-operator', 'helm-operator']
+
+# The key that operator-sdk release checksums are signed with
+OSDK_SIGNING_KEY = '3B2F1481D146238080B346BB052996E2A20B5C7E'
+
 # TODO: Go full classful
 
 
+def osdk_download_url(version: str = None,
+                      mirror: str = 'https://github.com') -> str:
+    """Return the URL the release assets for an osdk version are under."""
+    return (f'{mirror}/operator-framework/operator-sdk/releases/download/'
+            f'v{version}')
+
+
+def osdk_src(download: str = None, version: str = None,
+             arch: str = 'linux_amd64',
+             directory: str = os.path.expanduser('~/.operator-sdk')) -> str:
+    """Return the path a versioned osdk binary is kept at."""
+    return f'{directory}/{download}_{arch}-{version}'
+
+
 class OsdkFileData(object):
     """A basic class to build paths for osdk updates."""
 
     def __init__(self, version: str = None, arch: str = 'linux_amd64',
+                 directory: str = os.path.expanduser('~/.operator-sdk'),
                  path: Path = os.path.expanduser('~/.local/bin'),
-                 verify: bool = True) -> None:
+                 verify: bool = True,
+                 mirror: str = 'https://github.com') -> None:
         """Initialize a simple tracker for OSDK-related paths."""
-        osdk_download_url = 'https://github.com/operator-framework/operator-sdk/releases/download'  # noqa: E501
-        download_base_url = f'{osdk_download_url}/v{version}'
-        osdk_downloads = ['operator-sdk', 'ansible-operator', 'helm-operator']
+        download_base_url = osdk_download_url(version, mirror)
 
         self.logger = get_logger()
         self.logger.debug(self.__dict__)
+        self.directory = directory
 
-        self.hashes = requests.get(
+        session = get_session()
+        self.hashes = session.get(
             f'{download_base_url}/checksums.txt'
         ).content
-        self.hash_signature = requests.get(
+        self.hash_signature = session.get(
             f'{download_base_url}/checksums.txt.asc'
         ).content if verify else None
 
         self.downloads = {}
-        for download in osdk_downloads:
+        for download in OSDK_DOWNLOADS:
             filename = f'{download}_{arch}'
             file_data = {
                 'filename': filename,
                 'url': f'{download_base_url}/{filename}',
+                'src': osdk_src(download, version, arch, directory),
                 'dst': f'{path}/{download}'
             }
             for sha256 in self.hashes.decode().split('\n'):
@@ -59,50 +84,143 @@ class OsdkFileData(object):
             self.logger.debug({download: file_data})
             self.downloads[download] = file_data
 
-    def files_not_matching(self) -> List[str]:
-        """Return all of the download names that don't pass checksum."""
+    def files_not_matching(self, cache: ArtifactCache = None) -> List[str]:
+        """Return all of the download names that don't pass checksum.
+
+        Checksums are looked up in the cache's manifest, so binaries recorded
+        there aren't hashed again.
+        """
+        cache = cache or ArtifactCache(self.directory)
         not_matching = []
         for download in self.downloads:
-            filename = self.downloads[download]['dst']
+            filename = self.downloads[download]['src']
             expected_hash = self.downloads[download]['hash']
             self.logger.debug(
                 f'Checking {filename} for expected hash {expected_hash}'
             )
-            if os.path.exists(filename):
-                existing_hash = hashlib.sha256()
-                with open(filename, 'rb') as f:
-                    existing_hash.update(f.read())
-                if existing_hash.hexdigest() != expected_hash:
-                    self.logger.info((f'Hash for {filename} does not match'
-                                      f' expected hash, {expected_hash}.'))
-                    not_matching.append(download)
-                else:
-                    self.logger.info(f'Hash for {filename} appears current.')
+            if cache.has(os.path.basename(filename), expected_hash):
+                self.logger.info(f'Hash for {filename} appears current.')
             else:
-                self.logger.info(f'{filename} not present.')
+                self.logger.info((f'{filename} is not present with the '
+                                  f'expected hash, {expected_hash}.'))
                 not_matching.append(download)
         self.logger.debug(f'not_matching: {not_matching}')
         return not_matching
 
 
-def osdk_update(path: str = os.path.expanduser('~/.local/bin'),
-                version: str = 'latest', verify: bool = True) -> str:
-    """Update the operator-sdk binaries."""
+@VERIFY_SECONDS.time()
+def verify_checksums(osdk_file_data: OsdkFileData = None) -> None:
+    """Verify the signature on a release's checksums.
+
+    Raises RuntimeError if the checksums fail verification.
+    """
+    gpg = get_gpg_trust()
+    gpg.trust(OSDK_SIGNING_KEY)
+    hashes_fd, hashes_path = mkstemp()
+    with os.fdopen(hashes_fd, 'wb') as f:
+        f.write(osdk_file_data.hashes)
+    try:
+        gpg.verify(hashes_path, osdk_file_data.hash_signature)
+    finally:
+        os.remove(hashes_path)
+
+
+def osdk_version(directory: str = os.path.expanduser('~/.operator-sdk'),
+                 path: str = os.path.expanduser('~/.local/bin'),
+                 arch: str = 'linux_amd64') -> str:
+    """Return the version of the installed operator-sdk binaries."""
+    logger = get_logger()
+    for arg in [directory, path, arch]:
+        logger.debug(type(arg))
+        logger.debug(arg)
+
+    target = installed_source(os.path.join(path, 'operator-sdk'), directory)
+    if target is not None:
+        binary = os.path.basename(target)
+        assumed_version = binary.split('-')[-1]
+    else:
+        logger.info('Unable to identify operator-sdk installation.')
+        return ''
+    for download in OSDK_DOWNLOADS:
+        src = osdk_src(download, assumed_version, arch, directory)
+        dst = os.path.join(path, download)
+        if not installed_source(dst, directory) == src:
+            logger.info(f'{download} {assumed_version} not installed into '
+                        f'{path}.')
+            return ''
+        if not os.path.isfile(src):
+            logger.info(f'{dst} is a dangling link to {src}')
+            return ''
+
+    return assumed_version
+
+
+def osdk_use(version: str = None,
+             directory: str = os.path.expanduser('~/.operator-sdk'),
+             path: str = os.path.expanduser('~/.local/bin'),
+             arch: str = 'linux_amd64', strategy: str = 'symlink') -> str:
+    """Switch the operator-sdk binaries in path to an installed version.
+
+    The binaries are installed with strategy, one of the install STRATEGIES
+    or FILE.
+    """
+    logger = get_logger()
+    for arg in [version, directory, path, arch, strategy]:
+        logger.debug(type(arg))
+        logger.debug(arg)
+
+    links = {}
+    for download in OSDK_DOWNLOADS:
+        src = osdk_src(download, version, arch, directory)
+        if not os.path.isfile(src):
+            raise RuntimeError((f'{download} {version} is not installed in '
+                                f'{directory}. Install it with the osdk '
+                                f'update command first.'))
+        links[os.path.join(path, download)] = src
+
+    logger.debug(f'Creating {path}')
+    os.makedirs(path, exist_ok=True)
+    install_binaries(links, strategy)
+
+    return str(version)
+
+
+@UPDATE_SECONDS.time(binary='osdk')
+def osdk_update(directory: str = os.path.expanduser('~/.operator-sdk'),
+                path: str = os.path.expanduser('~/.local/bin'),
+                version: str = 'latest', verify: bool = True,
+                mirror: str = 'https://github.com',
+                strategy: str = 'symlink',
+                bandwidth: Bandwidth = None,
+                api: str = 'https://api.github.com') -> str:
+    """Update the operator-sdk binaries.
+
+    Binaries are downloaded within bandwidth, if it's given. A version
+    constraint is resolved against the release catalog, fetched from api if
+    there isn't one yet.
+    """
     logger = get_logger()
-    for arg in [path, version, verify]:
+    for arg in [directory, path, version, verify, mirror, strategy,
+                bandwidth, api]:
         logger.debug(type(arg))
         logger.debug(arg)
 
+    logger.debug(f'Creating {directory}')
+    os.makedirs(directory, exist_ok=True)
+
     logger.debug(f'Creating {path}')
     os.makedirs(path, exist_ok=True)
 
     if version == 'latest':
         logger.debug('Determining latest version of the operator-sdk')
-        version = lastversion('operator-framework/operator-sdk')
+        version = latest_version('operator-framework/operator-sdk')
         # lastversion sets handlers on the root logger because it's mean.
         if not _called_from_test:  # pragma: no cover
             root_logger = logging.getLogger()
             root_logger.handlers.clear()
+    elif is_constraint(version):
+        logger.debug(f'Resolving {version} against the release catalog')
+        version = resolve_version('osdk', version, directory, api)
 
     if len(str(version)) < 1:  # pragma: no cover
         raise RuntimeError(('Unable to determine latest version. '
@@ -110,32 +228,41 @@ def osdk_update(path: str = os.path.expanduser('~/.local/bin'),
                             'option at the command line.'))
 
     logger.info(f'Identified desired installation version as {version}')
-    osdk_file_data = OsdkFileData(version=version, path=path)
-
-    if verify:
-        gpg = GpgTrust()
-        gpg.trust('3B2F1481D146238080B346BB052996E2A20B5C7E')
-        hashes_fd, hashes_path = mkstemp()
-        with os.fdopen(hashes_fd, 'wb') as f:
-            f.write(osdk_file_data.hashes)
-        try:
-            gpg.verify(hashes_path, osdk_file_data.hash_signature)
-        finally:
-            os.remove(hashes_path)
-    else:
+    osdk_file_data = OsdkFileData(version=version, directory=directory,
+                                  path=path, verify=verify, mirror=mirror)
+
+    if not verify:
         logger.warning('Not validating signatures as requested.')
 
-    for download in osdk_file_data.files_not_matching():
-        data = osdk_file_data.downloads[download]
-        binary = requests.get(data["url"]).content
-        logger.info(f'Writing {data["dst"]}.')
-        with open(data["dst"], 'wb') as f:
-            f.write(binary)
+    # Binaries are staged while the checksums they're checked against are
+    # verified, and only installed once both have succeeded
+    cache = ArtifactCache(directory)
+    downloads = [osdk_file_data.downloads[download]
+                 for download in osdk_file_data.files_not_matching(cache)]
+    CACHE_LOOKUPS.inc(len(osdk_file_data.downloads) - len(downloads),
+                      result='hit')
+    with ThreadPoolExecutor(max_workers=len(downloads) + 1) as pool:
+        verification = pool.submit(verify_checksums, osdk_file_data) \
+            if verify else None
+        staged = [(data, pool.submit(cache.stage,
+                                     filename=os.path.basename(data["src"]),
+                                     url=data["url"], sha256=data["hash"],
+                                     version=version, bandwidth=bandwidth))
+                  for data in downloads]
 
-        mode = os.stat(data["dst"]).st_mode
-        mode_ex = mode | 0o111
-        if mode != mode_ex:
-            logger.info(f'Making {data["dst"]} executable.')
-            os.chmod(data["dst"], mode_ex & 0o7777)
+    futures = [future for _, future in staged] + \
+        ([verification] if verify else [])
+    failed = [future for future in futures if future.exception() is not None]
+    if failed:
+        for _, future in staged:
+            if future.exception() is None and future.result() is not None:
+                os.remove(future.result())
+        raise failed[0].exception()
 
-    return str(version)
+    for data, future in staged:
+        if future.result() is not None:
+            cache.install(filename=os.path.basename(data["src"]),
+                          tmp=future.result(), sha256=data["hash"])
+
+    return osdk_use(version=version, directory=directory, path=path,
+                    strategy=strategy)
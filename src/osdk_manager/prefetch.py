@@ -0,0 +1,118 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager release prefetching.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the code to fill the artifact cache with the newest
+releases ahead of time, so that updating to them later is a local install.
+It's meant to be run from a timer, under a bandwidth limit.
+"""
+
+import os
+from typing import List
+
+from osdk_manager.cache import ArtifactCache
+from osdk_manager.catalog import REPOSITORIES, ReleaseCatalog
+from osdk_manager.download import BACKGROUND, Bandwidth
+from osdk_manager.opm.update import OpmPaths
+from osdk_manager.osdk.update import OsdkFileData
+from osdk_manager.util import get_logger
+
+
+def _prefetch_osdk(cache: ArtifactCache = None, version: str = None,
+                   arch: str = 'linux_amd64', release: dict = None,
+                   mirror: str = 'https://github.com',
+                   bandwidth: Bandwidth = None) -> List[str]:
+    """Cache the operator-sdk binaries of a release for an arch.
+
+    The binaries are checked against the release's checksums, whose signature
+    is verified when they're installed by osdk update.
+    """
+    logger = get_logger()
+    file_data = OsdkFileData(version=version, arch=arch,
+                             directory=cache.directory, verify=False,
+                             mirror=mirror)
+    fetched = []
+    for data in file_data.downloads.values():
+        filename = os.path.basename(data['src'])
+        if data['filename'] not in release['assets']:
+            logger.debug(f'{version} has no {data["filename"]}')
+            continue
+        if 'hash' not in data:
+            logger.warning(f'No checksum for {data["filename"]} in {version}')
+            continue
+        tmp = cache.stage(filename=filename, url=data['url'],
+                          sha256=data['hash'], version=version,
+                          bandwidth=bandwidth)
+        if tmp is not None:
+            cache.install(filename=filename, tmp=tmp, sha256=data['hash'])
+            fetched.append(filename)
+    return fetched
+
+
+def _prefetch_opm(cache: ArtifactCache = None, version: str = None,
+                  arch: str = 'linux_amd64', release: dict = None,
+                  mirror: str = 'https://github.com',
+                  bandwidth: Bandwidth = None) -> List[str]:
+    """Cache the opm binary of a release for an arch."""
+    logger = get_logger()
+    # opm names its arches with a dash
+    paths = OpmPaths(version=version, arch=arch.replace('_', '-'),
+                     directory=cache.directory, mirror=mirror)
+    if paths.filename not in release['assets']:
+        logger.debug(f'{version} has no {paths.filename}')
+        return []
+    filename = os.path.basename(paths.src)
+    if cache.ensure(filename=filename, url=paths.download_url,
+                    bandwidth=bandwidth):
+        return [filename]
+    return []
+
+
+_prefetchers = {
+    'osdk': _prefetch_osdk,
+    'opm': _prefetch_opm,
+}
+
+
+def prefetch(directory: str = os.path.expanduser('~/.operator-sdk'),
+             versions: int = 1, arches: List[str] = ['linux_amd64'],
+             names: List[str] = ['osdk', 'opm'],
+             mirror: str = 'https://github.com',
+             api: str = 'https://api.github.com',
+             bandwidth: Bandwidth = None) -> List[str]:
+    """Download the newest releases into the artifact cache.
+
+    The release catalog is refreshed first, and the newest versions of each
+    of names, leaving out prereleases, are cached for every arch the release
+    has binaries for. Binaries are downloaded one at a time, within
+    bandwidth, in the background by default, and nothing is installed into
+    $PATH. Returns the binaries that were downloaded.
+    """
+    logger = get_logger()
+    for arg in [directory, versions, arches, names, mirror, api, bandwidth]:
+        logger.debug(type(arg))
+        logger.debug(arg)
+
+    logger.debug(f'Creating {directory}')
+    os.makedirs(directory, exist_ok=True)
+
+    bandwidth = bandwidth or Bandwidth(priority=BACKGROUND)
+    cache = ArtifactCache(directory)
+    fetched = []
+    for name in names:
+        if name not in _prefetchers:
+            raise RuntimeError(f'Unable to prefetch unknown binary {name}.')
+        catalog = ReleaseCatalog(REPOSITORIES[name], directory, api)
+        catalog.refresh()
+        for version in catalog.versions()[:versions]:
+            for arch in arches:
+                logger.info(f'Prefetching {name} {version} for {arch}')
+                fetched.extend(_prefetchers[name](
+                    cache=cache, version=version, arch=arch,
+                    release=catalog.releases[version], mirror=mirror,
+                    bandwidth=bandwidth
+                ))
+    logger.info(f'Prefetched {len(fetched)} binaries')
+    return fetched
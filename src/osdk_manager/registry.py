@@ -0,0 +1,386 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager container registry client.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains a small client for the registry HTTP API, for looking up
+images without pulling them through a container runtime.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import urljoin
+
+from osdk_manager.download import get_session
+from osdk_manager.util import get_logger
+
+# Media types of image indexes, which list a manifest per platform
+INDEX_TYPES = [
+    'application/vnd.oci.image.index.v1+json',
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+]
+
+# Media types of single-platform image manifests
+MANIFEST_TYPES = [
+    'application/vnd.oci.image.manifest.v1+json',
+    'application/vnd.docker.distribution.manifest.v2+json',
+]
+
+# Files that podman, buildah and docker store registry logins in
+AUTH_FILES = [
+    os.path.join(os.getenv('XDG_RUNTIME_DIR', '/run/user/{}'.format(
+        os.getuid())), 'containers', 'auth.json'),
+    os.path.expanduser('~/.config/containers/auth.json'),
+    os.path.expanduser('~/.docker/config.json'),
+]
+
+
+def split_image(image: str = None) -> Tuple[str, str, str]:
+    """Split an image into its registry, repository and tag or digest."""
+    registry, _, rest = image.partition('/')
+    if '@' in rest:
+        repository, reference = rest.split('@', 1)
+    elif ':' in rest.rsplit('/', 1)[-1]:
+        repository, reference = rest.rsplit(':', 1)
+    else:
+        repository, reference = rest, 'latest'
+    if registry == 'docker.io':
+        registry = 'registry-1.docker.io'
+        if '/' not in repository:
+            repository = f'library/{repository}'
+    return registry, repository, reference
+
+
+def stored_credentials(registry: str = None) -> Tuple[str, str]:
+    """Return the username and password a runtime saved for registry."""
+    for filename in AUTH_FILES:
+        try:
+            with open(filename) as f:
+                auths = json.load(f).get('auths', {})
+        except (OSError, ValueError):
+            continue
+        for key, value in auths.items():
+            host = key.split('://')[-1].split('/')[0]
+            if host == registry and value.get('auth'):
+                username, _, password = base64.b64decode(
+                    value['auth']
+                ).decode().partition(':')
+                return username, password
+    return None
+
+
+class Registry(object):
+    """A client for one registry's HTTP API.
+
+    Handles both basic and bearer token authentication, using the credentials
+    provided or the ones saved by a container runtime login.
+    """
+
+    logger = get_logger()
+
+    def __init__(self, registry: str = None, username: str = None,
+                 password: str = None,
+                 session: requests.Session = None) -> None:
+        """Initialize the client for a registry host."""
+        self.registry = registry
+        if registry.startswith(('localhost', '127.')):
+            self.url = f'http://{registry}'
+        else:
+            self.url = f'https://{registry}'
+        if username is not None:
+            self.credentials = (username, password)
+        else:
+            self.credentials = stored_credentials(registry)
+        self.session = session or get_session()
+        self.authorizations = {}
+        self.lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        """Represent the state of this object as a string."""
+        return "Registry(url={})".format(self.url)
+
+    def _authenticate(self, challenge: str = None, repository: str = None,
+                      scopes: List[str] = None) -> None:
+        """Answer an authentication challenge for a repository.
+
+        A bearer token is requested for scopes if provided, and otherwise for
+        the scope the registry asked for.
+        """
+        scheme, _, params = challenge.partition(' ')
+        if scheme.lower() == 'basic' and self.credentials is not None:
+            authorization = 'Basic ' + base64.b64encode(
+                ':'.join(self.credentials).encode()
+            ).decode()
+        elif scheme.lower() == 'bearer':
+            params = dict(re.findall(r'(\w+)="([^"]*)"', params))
+            self.logger.debug(f'Requesting a token from {params["realm"]}')
+            response = self.session.get(params['realm'], params={
+                'service': params.get('service'),
+                'scope': scopes or params.get(
+                    'scope', f'repository:{repository}:pull'
+                ),
+            }, auth=self.credentials, timeout=30)
+            response.raise_for_status()
+            token = response.json()
+            authorization = 'Bearer ' + (
+                token.get('token') or token.get('access_token')
+            )
+        else:
+            raise RuntimeError(f'Unable to authenticate to {self.registry}.')
+        with self.lock:
+            self.authorizations[repository] = authorization
+
+    def request(self, method: str = 'GET', repository: str = None,
+                path: str = None, headers: Dict[str, str] = {},
+                scopes: List[str] = None, **kwargs) -> requests.Response:
+        """Make an authenticated request for a path under a repository.
+
+        The path may also be a full URL, such as an upload location. A
+        request refused for its authorization is authenticated and sent
+        again, unless its body is streamed and can't be sent twice, so
+        streamed requests must be preceded by another to the repository.
+        """
+        if '://' in path:
+            url = path
+        else:
+            url = f'{self.url}/v2/{repository}/{path}'
+        headers = dict(headers)
+        replayable = isinstance(kwargs.get('data'),
+                                (type(None), bytes, str, dict))
+        for attempt in range(2):
+            with self.lock:
+                authorization = self.authorizations.get(repository)
+            if authorization is not None:
+                headers['Authorization'] = authorization
+            self.logger.debug(f'{method} {url}')
+            response = self.session.request(method, url, headers=headers,
+                                            timeout=30, **kwargs)
+            if response.status_code != 401 or attempt or not replayable:
+                return response
+            self._authenticate(response.headers.get('WWW-Authenticate', ''),
+                               repository, scopes)
+
+    def manifest_digest(self, repository: str = None,
+                        reference: str = None) -> str:
+        """Return the digest of a tag's manifest, or None if it's missing."""
+        response = self.request('HEAD', repository,
+                                f'manifests/{reference}', headers={
+                                    'Accept': ', '.join(INDEX_TYPES +
+                                                        MANIFEST_TYPES)
+                                })
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.headers.get('Docker-Content-Digest')
+
+    def manifest_raw(self, repository: str = None,
+                     reference: str = None) -> Tuple[str, bytes, str]:
+        """Return the media type, content and digest of a manifest.
+
+        The content is returned exactly as stored, so that it can be pushed
+        elsewhere without changing its digest.
+        """
+        response = self.request('GET', repository, f'manifests/{reference}',
+                                headers={'Accept': ', '.join(INDEX_TYPES +
+                                                             MANIFEST_TYPES)})
+        response.raise_for_status()
+        content = response.content
+        media_type = response.headers.get('Content-Type', '').split(';')[0] \
+            or json.loads(content).get('mediaType')
+        digest = response.headers.get('Docker-Content-Digest') or \
+            'sha256:' + hashlib.sha256(content).hexdigest()
+        return media_type, content, digest
+
+    def manifest(self, repository: str = None,
+                 reference: str = None) -> dict:
+        """Return a manifest, resolving an index to its linux/amd64 entry."""
+        manifest = json.loads(self.manifest_raw(repository, reference)[1])
+        if manifest.get('mediaType') in INDEX_TYPES or \
+                'manifests' in manifest:
+            entries = manifest['manifests']
+            entry = next((e for e in entries
+                          if e.get('platform', {}).get('os') == 'linux' and
+                          e['platform'].get('architecture') == 'amd64'),
+                         entries[0])
+            return self.manifest(repository, entry['digest'])
+        return manifest
+
+    def labels(self, repository: str = None,
+               reference: str = None) -> Dict[str, str]:
+        """Return the labels of an image."""
+        config = self.manifest(repository, reference)['config']
+        response = self.request('GET', repository,
+                                f'blobs/{config["digest"]}')
+        response.raise_for_status()
+        return (response.json().get('config') or {}).get('Labels') or {}
+
+    def put_manifest(self, repository: str = None, reference: str = None,
+                     media_type: str = None, content: bytes = None) -> None:
+        """Push a manifest under a tag or its digest."""
+        response = self.request('PUT', repository, f'manifests/{reference}',
+                                headers={'Content-Type': media_type},
+                                data=content)
+        response.raise_for_status()
+
+    def has_blob(self, repository: str = None, digest: str = None) -> bool:
+        """Return whether a repository already has a blob."""
+        response = self.request('HEAD', repository, f'blobs/{digest}')
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    def mount_blob(self, repository: str = None, digest: str = None,
+                   source_repository: str = None) -> str:
+        """Mount a blob from another repository on this registry.
+
+        Returns None if it was mounted. Registries that don't support
+        mounting start an upload instead, and its location is returned.
+        """
+        response = self.request('POST', repository, 'blobs/uploads/',
+                                params={'mount': digest,
+                                        'from': source_repository},
+                                scopes=[
+                                    f'repository:{repository}:pull,push',
+                                    f'repository:{source_repository}:pull',
+                                ])
+        response.raise_for_status()
+        if response.status_code == 201:
+            return None
+        return urljoin(self.url, response.headers['Location'])
+
+    def upload_blob(self, repository: str = None, digest: str = None,
+                    chunks: Iterator[bytes] = None, size: int = None,
+                    location: str = None) -> None:
+        """Upload a blob in one request, streaming it from chunks.
+
+        A new upload is started unless the location of one is provided. The
+        request that started the upload authenticated the push, since chunks
+        can only be sent once.
+        """
+        if location is None:
+            response = self.request('POST', repository, 'blobs/uploads/')
+            response.raise_for_status()
+            location = urljoin(self.url, response.headers['Location'])
+        response = self.request('PUT', repository, location,
+                                params={'digest': digest},
+                                headers={
+                                    'Content-Type':
+                                        'application/octet-stream',
+                                },
+                                data=_SizedStream(chunks, size))
+        response.raise_for_status()
+
+
+class _SizedStream(object):
+    """Chunks of a known total size, sent with a Content-Length."""
+
+    def __init__(self, chunks: Iterator[bytes] = None,
+                 size: int = None) -> None:
+        """Wrap chunks totalling size bytes."""
+        self.chunks = chunks
+        self.size = size
+
+    def __len__(self) -> int:
+        """Return the total size."""
+        return self.size
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Yield the chunks."""
+        return iter(self.chunks)
+
+
+def _copy_blob(source: Registry = None, source_repository: str = None,
+               destination: Registry = None,
+               destination_repository: str = None,
+               descriptor: dict = None) -> str:
+    """Copy a blob unless the destination has it.
+
+    Returns whether it was already there, mounted, or copied.
+    """
+    digest = descriptor['digest']
+    if destination.has_blob(destination_repository, digest):
+        return 'existing'
+    location = None
+    if destination.url == source.url:
+        location = destination.mount_blob(destination_repository, digest,
+                                          source_repository)
+        if location is None:
+            return 'mounted'
+    with source.request('GET', source_repository, f'blobs/{digest}',
+                        stream=True) as response:
+        response.raise_for_status()
+        destination.upload_blob(
+            destination_repository, digest,
+            response.raw.stream(1 << 20, decode_content=False),
+            descriptor['size'], location
+        )
+    return 'copied'
+
+
+def copy_image(source: Registry = None, source_repository: str = None,
+               reference: str = None, destination: Registry = None,
+               destination_repository: str = None, tags: List[str] = [],
+               jobs: int = 4) -> Dict[str, int]:
+    """Copy an image between repositories without pulling it.
+
+    Image indexes are copied with every image they list. Only the blobs the
+    destination is missing are transferred, jobs at a time, and blobs on the
+    same registry are mounted rather than copied where it's supported. The
+    manifests are pushed last, so the tags never point at an incomplete
+    image. Returns how many blobs were existing, mounted and copied, and the
+    bytes copied.
+    """
+    logger = get_logger()
+    stats = {'existing': 0, 'mounted': 0, 'copied': 0, 'bytes': 0}
+    media_type, content, digest = source.manifest_raw(source_repository,
+                                                      reference)
+    tags = tags or [digest]
+    if all(destination.manifest_digest(destination_repository, tag) == digest
+           for tag in tags):
+        logger.info(f'{destination_repository} is already up to date.')
+        return stats
+
+    manifest = json.loads(content)
+    children = []
+    if media_type in INDEX_TYPES or 'manifests' in manifest:
+        children = [source.manifest_raw(source_repository, entry['digest'])
+                    for entry in manifest['manifests']]
+
+    blobs = {}
+    for child in children or [(media_type, content, digest)]:
+        image = json.loads(child[1])
+        for descriptor in [image['config']] + image.get('layers', []):
+            # Foreign layers are fetched from their own URLs, not copied
+            if not descriptor.get('urls'):
+                blobs[descriptor['digest']] = descriptor
+
+    copy = partial(_copy_blob, source, source_repository, destination,
+                   destination_repository)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for descriptor, how in zip(blobs.values(),
+                                   pool.map(copy, blobs.values())):
+            logger.debug(f'Blob {descriptor["digest"]} {how}')
+            stats[how] += 1
+            if how == 'copied':
+                stats['bytes'] += descriptor['size']
+
+    for child_type, child_content, child_digest in children:
+        destination.put_manifest(destination_repository, child_digest,
+                                 child_type, child_content)
+    for tag in tags:
+        destination.put_manifest(destination_repository, tag, media_type,
+                                 content)
+    logger.info(f'Copied {source_repository}@{digest} to '
+                f'{destination_repository} ({stats["copied"]} blobs copied, '
+                f'{stats["mounted"]} mounted, {stats["existing"]} existing)')
+    return stats
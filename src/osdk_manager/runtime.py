@@ -0,0 +1,187 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager container runtime client.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains a client for the image API that docker and podman serve on
+a Unix socket, which falls back to running the runtime's CLI when the socket
+isn't available.
+"""
+
+import http.client
+import json
+import os
+import shlex
+import socket
+from typing import Dict, List, Tuple
+from urllib.parse import quote, urlencode
+
+from osdk_manager.util import get_logger, shell
+
+
+def socket_paths(runtime: str = None) -> List[str]:
+    """Return the sockets a runtime's API may be listening on, in order."""
+    paths = []
+    host = os.getenv('CONTAINER_HOST' if runtime == 'podman' else
+                     'DOCKER_HOST', '')
+    if host.startswith('unix://'):
+        paths.append(host[len('unix://'):])
+    if runtime == 'podman':
+        if os.getenv('XDG_RUNTIME_DIR'):
+            paths.append(os.path.join(os.getenv('XDG_RUNTIME_DIR'), 'podman',
+                                      'podman.sock'))
+        paths.append('/run/podman/podman.sock')
+    else:
+        paths.append('/var/run/docker.sock')
+    return paths
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """An HTTP connection over a Unix socket."""
+
+    def __init__(self, path: str = None, timeout: int = 60) -> None:
+        """Initialize the connection to the socket at path."""
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self) -> None:
+        """Connect to the socket."""
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class RuntimeClient(object):
+    """Image operations for a container runtime.
+
+    Talks to the runtime's API socket when there is one, so that a query is a
+    single request no matter how many images there are, and runs the CLI for
+    each operation otherwise.
+    """
+
+    logger = get_logger()
+
+    def __init__(self, runtime: str = None, path: str = None) -> None:
+        """Initialize the client, finding the runtime's API socket."""
+        self.runtime = runtime
+        self.path = path
+        if self.path is None:
+            for candidate in socket_paths(runtime):
+                if self._ping(candidate):
+                    self.path = candidate
+                    break
+        if self.path is None:
+            self.logger.debug(f'No {runtime} API socket, using the CLI.')
+
+    def __repr__(self) -> str:
+        """Represent the state of this object as a string."""
+        return "RuntimeClient(runtime={}, path={})".format(self.runtime,
+                                                           self.path)
+
+    @staticmethod
+    def _ping(path: str = None) -> bool:
+        """Return whether a runtime API answers on path."""
+        if not os.path.exists(path):
+            return False
+        connection = UnixHTTPConnection(path, timeout=5)
+        try:
+            connection.request('GET', '/_ping')
+            response = connection.getresponse()
+            response.read()
+            return response.status == 200
+        except OSError:
+            return False
+        finally:
+            connection.close()
+
+    def request(self, method: str = 'GET', path: str = None,
+                query: Dict[str, str] = {}) -> Tuple[int, object]:
+        """Make a request to the API, returning the status and parsed body.
+
+        Raises RuntimeError for error responses other than 404.
+        """
+        url = path + ('?' + urlencode(query) if query else '')
+        self.logger.debug(f'{method} {url} on {self.path}')
+        connection = UnixHTTPConnection(self.path)
+        try:
+            connection.request(method, url)
+            response = connection.getresponse()
+            body = response.read()
+        finally:
+            connection.close()
+        if response.status >= 400 and response.status != 404:
+            raise RuntimeError(f'{method} {url} failed with {response.status}:'
+                               f' {body.decode(errors="replace").strip()}')
+        return response.status, json.loads(body) if body.strip() else None
+
+    def images(self, prefix: str = None) -> List[str]:
+        """Return the name and tag of the images whose names start with prefix.
+
+        With the API, the runtime filters the images itself.
+        """
+        if self.path is None:
+            names = [line.strip() for line in shell(
+                self.runtime + " images --format='{{.Repository}}:{{.Tag}}'"
+            )]
+        else:
+            query = {}
+            if prefix:
+                query['filters'] = json.dumps({'reference': [f'{prefix}*']})
+            _, images = self.request('GET', '/images/json', query)
+            names = [tag for image in images or []
+                     for tag in image.get('RepoTags') or []]
+        return [name for name in names if name.startswith(prefix or '')]
+
+    def inspect(self, image: str = None) -> dict:
+        """Return the details of an image, or None if it doesn't exist."""
+        if self.path is None:
+            try:
+                output = '\n'.join(shell("{} image inspect {}".format(
+                    self.runtime, shlex.quote(image)
+                )))
+            except RuntimeError:
+                return None
+            return json.loads(output)[0]
+        status, details = self.request('GET',
+                                       f'/images/{quote(image)}/json')
+        return None if status == 404 else details
+
+    def tag(self, image: str = None, target: str = None) -> None:
+        """Tag an image as target."""
+        if self.path is None:
+            [line for line in shell("{} tag {} {}".format(
+                self.runtime, shlex.quote(image), shlex.quote(target)
+            ))]
+            return
+        repository, _, tag = target.rpartition(':')
+        if '/' in tag or not repository:
+            repository, tag = target, 'latest'
+        status, _ = self.request('POST', f'/images/{quote(image)}/tag',
+                                 {'repo': repository, 'tag': tag})
+        if status == 404:
+            raise RuntimeError(f'Unable to find {image} to tag.')
+
+    def remove(self, image: str = None, force: bool = False) -> None:
+        """Remove an image, doing nothing if it doesn't exist."""
+        if self.path is None:
+            [line for line in shell("{} rmi {}{}".format(
+                self.runtime, '-f ' if force else '', shlex.quote(image)
+            ), fail=False)]
+            return
+        self.request('DELETE', f'/images/{quote(image)}',
+                     {'force': 'true'} if force else {})
+
+    def remove_images(self, images: List[str] = [],
+                      force: bool = False) -> None:
+        """Remove many images, with a single command if using the CLI."""
+        if not images:
+            return
+        if self.path is not None:
+            for image in images:
+                self.remove(image, force)
+            return
+        [line for line in shell("{} rmi {}{}".format(
+            self.runtime, '-f ' if force else '',
+            ' '.join(shlex.quote(image) for image in images)
+        ), fail=False)]
@@ -0,0 +1,186 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager version shims.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the resolver behind the operator-sdk and opm shims. A shim
+walks up from the working directory to the nearest operate.yml, reads the
+version pinned there, and executes the matching cached binary. It runs on
+every invocation of the shimmed binaries, so it must only import what it
+strictly needs from the standard library (not even typing).
+"""
+
+import os
+import sys
+
+PIN_FILE = 'operate.yml'
+SHIMS = {
+    'operator-sdk': 'osdk-version',
+    'ansible-operator': 'osdk-version',
+    'helm-operator': 'osdk-version',
+    'opm': 'opm-version',
+}
+
+
+def binary_path(name: str = None, version: str = None,
+                directory: str = os.path.expanduser('~/.operator-sdk')) -> str:
+    """Return the path a versioned binary is kept at.
+
+    This must agree with osdk_src and OpmPaths, which can't be imported here
+    without pulling in the rest of the package.
+    """
+    if name == 'opm':
+        return f'{directory}/linux-amd64-opm-{version}'
+    return f'{directory}/{name}_linux_amd64-{version}'
+
+
+def find_pin_file(cwd: str = None) -> str:
+    """Return the nearest operate.yml at or above cwd, or None."""
+    current = os.path.abspath(cwd or os.getcwd())
+    while True:
+        candidate = os.path.join(current, PIN_FILE)
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def read_pins(filename: str = None) -> dict:
+    """Read the top-level version pins out of an operate.yml file.
+
+    Only simple top-level "key: value" lines are understood, which is all a
+    pin ever needs, so that YAML doesn't have to be imported.
+    """
+    keys = set(SHIMS.values())
+    pins = {}
+    with open(filename) as f:
+        for line in f:
+            if line[:1] in (' ', '\t', '#') or ':' not in line:
+                continue
+            key, value = line.split(':', 1)
+            if key.strip() in keys:
+                value = value.split('#', 1)[0].strip().strip('\'"')
+                if value:
+                    pins[key.strip()] = value
+    return pins
+
+
+def cached_pins(filename: str = None, cache_file: str = None) -> dict:
+    """Return the pins from filename, reusing a cached read when current.
+
+    The cache holds one tab-separated line per pin file, with its mtime, size
+    and pins, since even json costs more to import than a shim can afford.
+    """
+    stat = os.stat(filename)
+    stamp = f'{stat.st_mtime_ns}\t{stat.st_size}'
+    entries = {}
+    try:
+        with open(cache_file) as f:
+            for line in f:
+                cached, rest = line.rstrip('\n').split('\t', 1)
+                entries[cached] = rest
+    except (OSError, ValueError):
+        entries = {}
+    entry = entries.get(filename)
+    if entry is not None and entry.startswith(stamp + '\t'):
+        pins = entry[len(stamp) + 1:]
+        return dict(pin.split('=', 1) for pin in pins.split(',') if pin)
+
+    pins = read_pins(filename)
+    entries[filename] = '\t'.join([stamp, ','.join(
+        f'{key}={value}' for key, value in pins.items()
+    )])
+    tmp = f'{cache_file}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'w') as f:
+            for cached, rest in entries.items():
+                f.write(f'{cached}\t{rest}\n')
+        os.replace(tmp, cache_file)
+    except OSError:
+        pass
+    return pins
+
+
+def resolve(name: str = None, cwd: str = None,
+            directory: str = os.path.expanduser('~/.operator-sdk'),
+            path: str = os.path.expanduser('~/.local/bin')) -> str:
+    """Return the binary that the shim for name should execute.
+
+    A version pinned in the nearest operate.yml wins, otherwise the version
+    currently linked into path is used.
+    """
+    pin_file = find_pin_file(cwd)
+    if pin_file is not None:
+        pins = cached_pins(pin_file, os.path.join(directory,
+                                                  '.shim-cache'))
+        version = pins.get(SHIMS[name])
+        if version is not None:
+            binary = binary_path(name, version, directory)
+            if not os.path.isfile(binary):
+                raise FileNotFoundError(
+                    f'{name} {version} is pinned in {pin_file} but is not '
+                    f'installed in {directory}.'
+                )
+            return binary
+    return os.path.join(path, name)
+
+
+def main(name: str = None, argv: list = None,
+         directory: str = os.path.expanduser('~/.operator-sdk'),
+         path: str = os.path.expanduser('~/.local/bin')) -> int:
+    """Execute the binary the shim for name resolves to.
+
+    Returns 127, as a shell would, if there's no binary to execute, and 126
+    if there is one but it can't be executed.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        binary = resolve(name, directory=directory, path=path)
+    except FileNotFoundError as e:
+        sys.stderr.write(f'{e}\n')
+        return 127
+    try:
+        os.execv(binary, [name] + argv)
+    except FileNotFoundError:
+        sys.stderr.write(f'{name} is not pinned in an operate.yml and is not '
+                         f'installed in {path}.\n')
+        return 127
+    except OSError as e:
+        sys.stderr.write(f'Unable to execute {binary}: {e.strerror}\n')
+        return 126
+
+
+SHIM_TEMPLATE = '''#!{python} -S
+# Generated by osdk-manager, do not edit.
+import sys
+sys.path.insert(0, {package_root!r})
+from osdk_manager.shim import main
+sys.exit(main({name!r}, directory={directory!r}, path={path!r}))
+'''
+
+
+def write_shims(shim_dir: str = os.path.expanduser('~/.operator-sdk/shims'),
+                directory: str = os.path.expanduser('~/.operator-sdk'),
+                path: str = os.path.expanduser('~/.local/bin')) -> list:
+    """Write a shim for each managed binary into shim_dir."""
+    if os.path.realpath(shim_dir) == os.path.realpath(path):
+        raise RuntimeError(('The shim directory must be different from the '
+                            'directory the binaries are linked into.'))
+    os.makedirs(shim_dir, exist_ok=True)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    written = []
+    for name in SHIMS:
+        shim = os.path.join(shim_dir, name)
+        tmp = f'{shim}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(SHIM_TEMPLATE.format(
+                python=sys.executable, package_root=package_root, name=name,
+                directory=directory, path=path
+            ))
+        os.chmod(tmp, 0o755)
+        os.replace(tmp, shim)
+        written.append(shim)
+    return written
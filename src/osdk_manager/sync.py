@@ -0,0 +1,173 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager lockfile synchronization.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This file contains the code to provision operator-sdk, ansible-operator,
+helm-operator and opm together from a lockfile of pinned versions and digests.
+"""
+
+import os
+import yaml
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import ExitStack
+from typing import List
+
+from osdk_manager.cache import ArtifactCache
+from osdk_manager.delta import stage
+from osdk_manager.download import Bandwidth, commit, get_session
+from osdk_manager.metrics import CACHE_LOOKUPS
+from osdk_manager.opm.update import OpmPaths
+from osdk_manager.osdk.update import (
+    OSDK_DOWNLOADS,
+    osdk_download_url,
+    osdk_src
+)
+from osdk_manager.install import install_binaries
+from osdk_manager.util import get_logger, locked
+
+
+class Artifact(object):
+    """A single pinned binary from a lockfile."""
+
+    def __init__(self, name: str = None, version: str = None,
+                 sha256: str = None,
+                 directory: str = os.path.expanduser('~/.operator-sdk'),
+                 mirror: str = 'https://github.com') -> None:
+        """Work out where a pinned binary comes from and is kept."""
+        self.name = name
+        self.version = str(version)
+        self.sha256 = sha256
+        self.fetched = False
+        if name == 'opm':
+            paths = OpmPaths(version=self.version, directory=directory,
+                             mirror=mirror)
+            self.url = paths.download_url
+            self.src = paths.src
+        elif name in OSDK_DOWNLOADS:
+            self.url = (f'{osdk_download_url(self.version, mirror)}/'
+                        f'{name}_linux_amd64')
+            self.src = osdk_src(name, self.version, directory=directory)
+        else:
+            raise RuntimeError(f'Unknown artifact {name} in lockfile.')
+        self.filename = os.path.basename(self.src)
+
+    def __repr__(self) -> str:
+        """Represent the state of this object as a string."""
+        return "Artifact(name={}, version={}, sha256={})".format(
+            self.name, self.version, self.sha256
+        )
+
+
+def load_lockfile(lockfile: str = 'tools.lock',
+                  directory: str = os.path.expanduser('~/.operator-sdk')
+                  ) -> List[Artifact]:
+    """Load the artifacts pinned in a lockfile.
+
+    The lockfile is YAML, with an optional mirror to download from and the
+    pinned version and SHA-256 of each binary:
+
+        mirror: https://github.com
+        artifacts:
+          operator-sdk:
+            version: 1.3.1
+            sha256: ...
+          opm:
+            version: 1.14.2
+            sha256: ...
+    """
+    logger = get_logger()
+    with open(lockfile) as f:
+        settings = yaml.safe_load(f) or {}
+    logger.debug("Recovered lockfile:")
+    logger.debug(settings)
+
+    mirror = settings.get('mirror', 'https://github.com').rstrip('/')
+    artifacts = []
+    for name, pin in (settings.get('artifacts') or {}).items():
+        if not pin or 'version' not in pin or 'sha256' not in pin:
+            raise RuntimeError((f'{name} in {lockfile} must pin both a '
+                                f'version and a sha256.'))
+        artifacts.append(Artifact(name=name, version=pin['version'],
+                                  sha256=pin['sha256'], directory=directory,
+                                  mirror=mirror))
+    return artifacts
+
+
+def _fetch_all(cache: ArtifactCache = None, artifacts: List[Artifact] = [],
+               jobs: int = 4, bandwidth: Bandwidth = None) -> None:
+    """Download artifacts concurrently, committing them only if all succeed."""
+    logger = get_logger()
+    session = get_session()
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {}
+        for a in artifacts:
+            base_version, base = cache.previous(a.filename, a.version)
+            futures[pool.submit(stage, url=a.url, dst=a.src, sha256=a.sha256,
+                                base=base, base_version=base_version,
+                                session=session, bandwidth=bandwidth)] = a
+        wait(futures)
+    failed = [f for f in futures if f.exception() is not None]
+    if failed:
+        for future in futures:
+            if future.exception() is None:
+                os.remove(future.result()[0])
+        raise failed[0].exception()
+
+    for future, artifact in futures.items():
+        tmp, sha256 = future.result()
+        logger.info(f'Writing {artifact.src}.')
+        commit(tmp=tmp, dst=artifact.src)
+        cache.record(artifact.filename, sha256)
+        artifact.fetched = True
+
+
+def sync(lockfile: str = 'tools.lock',
+         directory: str = os.path.expanduser('~/.operator-sdk'),
+         path: str = os.path.expanduser('~/.local/bin'),
+         jobs: int = 4, strategy: str = 'symlink',
+         bandwidth: Bandwidth = None) -> List[Artifact]:
+    """Install exactly the binaries pinned in a lockfile.
+
+    Only the binaries missing from the cache manifest are downloaded, all at
+    once over a shared HTTP session. Nothing is changed unless every download
+    succeeds and matches its pinned digest, after which the binaries are moved
+    into the cache and all of the binaries in path are switched together,
+    installed with strategy. The downloads share bandwidth, if it's given.
+    """
+    logger = get_logger()
+    for arg in [lockfile, directory, path, jobs, strategy, bandwidth]:
+        logger.debug(type(arg))
+        logger.debug(arg)
+
+    artifacts = load_lockfile(lockfile=lockfile, directory=directory)
+
+    logger.debug(f'Creating {directory}')
+    os.makedirs(directory, exist_ok=True)
+
+    logger.debug(f'Creating {path}')
+    os.makedirs(path, exist_ok=True)
+
+    cache = ArtifactCache(directory)
+    missing = [a for a in artifacts if not cache.has(a.filename, a.sha256)]
+
+    # Lock in a stable order so that concurrent syncs can't deadlock, then
+    # check again in case another process finished them while we waited.
+    with ExitStack() as stack:
+        for artifact in sorted(missing, key=lambda a: a.src):
+            stack.enter_context(locked(artifact.src))
+        cache.load()
+        missing = [a for a in missing
+                   if not cache.has(a.filename, a.sha256)]
+        logger.info((f'{len(missing)} of {len(artifacts)} artifacts to '
+                     f'download'))
+        CACHE_LOOKUPS.inc(len(artifacts) - len(missing), result='hit')
+        CACHE_LOOKUPS.inc(len(missing), result='miss')
+        _fetch_all(cache, missing, jobs, bandwidth)
+
+    install_binaries({
+        os.path.join(path, artifact.name): artifact.src
+        for artifact in artifacts
+    }, strategy)
+    return artifacts
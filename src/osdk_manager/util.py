@@ -7,20 +7,27 @@ version Operator SDK-based Kubernetes operators.
 This file contains utilities utilized throughout the package and modules.
 """
 
+import fcntl
+import functools
 import gnupg
 import logging
 import logging.handlers
 import os
+import re
 import shlex
+import shutil
 import subprocess
+import time
+from contextlib import contextmanager
 from io import BytesIO
 from pathlib import Path
-from typing import List, Iterable
+from typing import List, Iterable, Tuple
 
 from osdk_manager.exceptions import (
     ContainerRuntimeException,
     ShellRuntimeException
 )
+from osdk_manager.metrics import SHELL_COMMANDS, VERIFY_FAILURES
 
 
 def get_logger(verbosity: int = None):
@@ -58,23 +65,27 @@ def _utf8ify(line_bytes: List[bytes] = None) -> str:
     return line_bytes.decode("utf-8").rstrip()
 
 
-def shell(cmd: str = None, fail: bool = True) -> Iterable[str]:
+def shell(cmd: str = None, fail: bool = True,
+          cwd: str = None) -> Iterable[str]:
     """Run a command in a subprocess, yielding lines of output from it.
 
     By default will cause a failure using the return code of the command. To
-    change this behavior, pass fail=False.
+    change this behavior, pass fail=False. The command runs in cwd if given.
     """
     logger = get_logger()
     logger.debug("Running: {}".format(cmd))
     proc = subprocess.Popen(shlex.split(cmd),
                             stdout=subprocess.PIPE,
-                            stderr=subprocess.STDOUT)
+                            stderr=subprocess.STDOUT,
+                            cwd=cwd)
 
     for line in map(_utf8ify, iter(proc.stdout.readline, b'')):
         logger.debug("Line:    {}".format(line))
         yield line
 
     ret = proc.wait()
+    SHELL_COMMANDS.inc(command=os.path.basename(shlex.split(cmd)[0]),
+                       result='success' if ret == 0 else 'failure')
     if fail and ret != 0:
         logger.error("Command errored: {}".format(cmd))
         raise ShellRuntimeException(ret)
@@ -82,24 +93,89 @@ def shell(cmd: str = None, fail: bool = True) -> Iterable[str]:
         logger.warning("Command returned {}: {}".format(ret, cmd))
 
 
+@contextmanager
+def locked(path: str = None) -> Iterable[None]:
+    """Hold an exclusive lock on path for the duration of the context.
+
+    The lock is taken on a separate path.lock file with flock, so it is
+    released even if the holder dies, and it coordinates threads as well as
+    processes since each acquisition opens the lock file anew.
+    """
+    logger = get_logger()
+    lock_path = f'{path}.lock'
+    with open(lock_path, 'a') as f:
+        logger.debug(f'Waiting for {lock_path}')
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        logger.debug(f'Acquired {lock_path}')
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+VERSION = re.compile(r'^v?(\d+)\.(\d+)\.(\d+)(?:-([0-9A-Za-z.-]+))?'
+                     r'(?:\+[0-9A-Za-z.-]+)?$')
+
+
+def version_key(tag: str = None) -> Tuple:
+    """Return a sort key for a semantic version tag, or None if it isn't one.
+
+    Releases sort after their own prereleases.
+    """
+    match = VERSION.match(tag)
+    if match is None:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    if prerelease is None:
+        prerelease_key = (1,)
+    else:
+        prerelease_key = (0,) + tuple(
+            (0, int(part), '') if part.isdigit() else (1, 0, part)
+            for part in prerelease.split('.')
+        )
+    return (int(major), int(minor), int(patch), prerelease_key)
+
+
+_latest_versions = {}
+
+
+def latest_version(repo: str = None, ttl: int = 300) -> str:
+    """Return the latest released version of a GitHub repository.
+
+    Answers are remembered for ttl seconds, which matters to long-running
+    processes like the daemon that are asked the same question repeatedly.
+    """
+    cached = _latest_versions.get(repo)
+    if cached is not None and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+
+    # lastversion is slow to import, and most commands never need it
+    from lastversion.lastversion import latest as lastversion
+    version = lastversion(repo)
+    _latest_versions[repo] = (time.monotonic(), version)
+    return version
+
+
+@functools.lru_cache(maxsize=None)
 def determine_runtime() -> str:  # pragma: no cover
-    """Determine the container runtime installed on the system."""
-    try:
-        [line for line in shell("docker --help", fail=False)]
-        return "docker"
-    except FileNotFoundError:
-        pass
-    try:
-        [line for line in shell("podman --help", fail=False)]
-        return "podman"
-    except FileNotFoundError:
-        raise ContainerRuntimeException
+    """Determine the container runtime installed on the system.
+
+    Only looks the runtimes up in $PATH, rather than running them.
+    """
+    for runtime in ["docker", "podman"]:
+        if shutil.which(runtime) is not None:
+            return runtime
+    raise ContainerRuntimeException
+
+
+# The key server that signing keys are imported from
+KEY_SERVER = 'keys.gnupg.net'
 
 
 class GpgTrust(object):
     """Handles GPG key trust and signature validation."""
 
-    def __init__(self, key_server: str = 'keys.gnupg.net') -> None:
+    def __init__(self, key_server: str = KEY_SERVER) -> None:
         """Initialize a GPG Trust database object."""
         self.logger = get_logger()
         self.gnupghome = os.path.expanduser('~/.gnupg')
@@ -112,6 +188,10 @@ class GpgTrust(object):
 
     def trust(self, key_id: str = None) -> bool:
         """Trust a GPG public key."""
+        for key in self.gpg.list_keys():
+            if key['fingerprint'].endswith(key_id.upper()):
+                self.logger.debug(f'Key {key_id} is already trusted')
+                return True
         try:
             self.logger.debug(f'Importing key {key_id} from {self.key_server}')
             self.gpg.recv_keys(self.key_server, key_id)
@@ -130,4 +210,16 @@ class GpgTrust(object):
             self.logger.debug(f'{target} verified.')
             return True
         else:
+            VERIFY_FAILURES.inc()
             raise RuntimeError(f'{target} failed verification.')
+
+
+_gpg_trust = None
+
+
+def get_gpg_trust() -> GpgTrust:
+    """Return the GPG trust database shared within this process."""
+    global _gpg_trust
+    if _gpg_trust is None:
+        _gpg_trust = GpgTrust()
+    return _gpg_trust
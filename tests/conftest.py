@@ -7,12 +7,26 @@ version Operator SDK-based Kubernetes operators.
 This file contains common fixtures used by tests for osdk-manager.
 """
 
+import base64
+import fcntl
+import hashlib
+import json
 import logging
 import os
 import pytest
+import re
 import shutil
+import socketserver
+import sys
 import tempfile
+import threading
 import yaml
+from fnmatch import fnmatch
+from functools import partial
+from urllib.parse import parse_qs, unquote, urlparse
+from typing import List
+from http.server import (BaseHTTPRequestHandler, SimpleHTTPRequestHandler,
+                         ThreadingHTTPServer)
 
 from osdk_manager.util import shell
 from osdk_manager.exceptions import ShellRuntimeException
@@ -87,6 +101,756 @@ def new_folder():
     shutil.rmtree(folder)
 
 
+@pytest.fixture()
+def osdk_cache(new_folder):
+    """Populate a directory with fake versioned operator-sdk binaries.
+
+    Returns a dictionary with the cache directory, the bin directory to link
+    into, and the versions available in the cache.
+    """
+    directory = os.path.join(new_folder, 'cache')
+    path = os.path.join(new_folder, 'bin')
+    versions = ['1.3.1', '1.4.0']
+    os.makedirs(directory)
+    for version in versions:
+        for download in ['operator-sdk', 'ansible-operator', 'helm-operator']:
+            src = os.path.join(directory, f'{download}_linux_amd64-{version}')
+            with open(src, 'w') as f:
+                f.write(f'#!/bin/sh\necho {download} {version} "$@"\n')
+            os.chmod(src, 0o755)
+    return {"directory": directory, "path": path, "versions": versions}
+
+
+class ReleaseMirror(object):
+    """A local stand-in for the GitHub release download layout."""
+
+    def __init__(self, root: str = None, url: str = None) -> None:
+        """Track the root directory and URL of the mirror."""
+        self.root = root
+        self.url = url
+        self.requests = []
+        # Whether range requests are honoured, and how many of them to cut
+        # off halfway through
+        self.ranges = True
+        self.range_failures = 0
+        self.lock = threading.Lock()
+        # Whether pre-compressed variants are negotiated, and the
+        # Content-Encoding of every one served
+        self.negotiate = True
+        self.encodings = []
+
+    def add(self, project: str = None, version: str = None,
+            filename: str = None, content: bytes = None) -> str:
+        """Publish a release asset, returning its SHA-256."""
+        release = os.path.join(self.root, 'operator-framework', project,
+                               'releases', 'download', f'v{version}')
+        os.makedirs(release, exist_ok=True)
+        with open(os.path.join(release, filename), 'wb') as f:
+            f.write(content)
+        return hashlib.sha256(content).hexdigest()
+
+    def add_osdk(self, version: str = None) -> dict:
+        """Publish fake operator-sdk binaries, returning their SHA-256s."""
+        sums = {}
+        for download in ['operator-sdk', 'ansible-operator', 'helm-operator']:
+            content = f'#!/bin/sh\necho {download} {version}\n'.encode()
+            sums[download] = self.add('operator-sdk', version,
+                                      f'{download}_linux_amd64', content)
+        checksums = ''.join(f'{sha256}  {download}_linux_amd64\n'
+                            for download, sha256 in sums.items())
+        self.add('operator-sdk', version, 'checksums.txt', checksums.encode())
+        return sums
+
+    def add_opm(self, version: str = None) -> str:
+        """Publish a fake opm binary, returning its SHA-256."""
+        content = f'#!/bin/sh\necho opm {version}\n'.encode()
+        return self.add('operator-registry', version, 'linux-amd64-opm',
+                        content)
+
+
+@pytest.fixture()
+def release_mirror(new_folder):
+    """Serve a local release mirror over HTTP for the duration of a test."""
+    root = os.path.join(new_folder, 'mirror')
+    os.makedirs(root)
+    mirror = ReleaseMirror(root=root)
+
+    class Handler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            mirror.requests.append(self.path)
+
+        def log_error(self, format, *args):
+            # Errors are logged as requests too
+            pass
+
+        def end_headers(self):
+            if mirror.ranges:
+                self.send_header('Accept-Ranges', 'bytes')
+            super().end_headers()
+
+        def do_GET(self):
+            path = self.translate_path(self.path)
+            accepted = [part.split(';')[0].strip() for part in
+                        self.headers.get('Accept-Encoding', '').split(',')]
+            for encoding, suffix in [('zstd', '.zst'), ('gzip', '.gz')]:
+                if mirror.negotiate and encoding in accepted and \
+                        os.path.isfile(path + suffix):
+                    with open(path + suffix, 'rb') as f:
+                        body = f.read()
+                    mirror.encodings.append(encoding)
+                    self.send_response(200)
+                    self.send_header('Content-Encoding', encoding)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+            match = re.match(r'bytes=(\d+)-(\d*)$',
+                             self.headers.get('Range', ''))
+            if not mirror.ranges or not match or not os.path.isfile(path):
+                return super().do_GET()
+            with open(path, 'rb') as f:
+                content = f.read()
+            start = int(match.group(1))
+            end = int(match.group(2) or len(content) - 1)
+            body = content[start:end + 1]
+            self.send_response(206)
+            self.send_header('Content-Range',
+                             f'bytes {start}-{end}/{len(content)}')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            with mirror.lock:
+                fail = mirror.range_failures > 0
+                mirror.range_failures -= fail
+            if fail:
+                body = body[:len(body) // 2]
+                self.close_connection = True
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                 partial(Handler, directory=root))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    mirror.url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    yield mirror
+    server.shutdown()
+    server.server_close()
+
+
+FAKE_OSDK = r"""#!/bin/sh
+# A stand-in for operator-sdk that scaffolds a few representative files
+echo "$@" >> "$FAKE_OSDK_LOG"
+project=$(basename "$PWD")
+case "$1" in
+version)
+    echo 'operator-sdk version: "v1.3.1", commit: "fake"'
+    ;;
+init)
+    domain=$(echo "$@" | sed 's/.*--domain=\([^ ]*\).*/\1/')
+    mkdir -p config/default
+    printf 'domain: %s\nlayout: ansible.sdk.operatorframework.io/v1\n' \
+        "$domain" > PROJECT
+    printf 'projectName: %s\nversion: "3"\n' "$project" >> PROJECT
+    printf 'namespace: %s-system\nnamePrefix: %s-\n' "$project" \
+        "$project" > config/default/kustomization.yaml
+    printf -- '---\n# +kubebuilder:scaffold:watch\n' > watches.yaml
+    mkdir -p config/rbac
+    printf 'rules:\n  # +kubebuilder:scaffold:rules\n' \
+        > config/rbac/role.yaml
+    printf 'FROM quay.io/operator-framework/ansible-operator:v1.3.1\n' \
+        > Dockerfile
+    ;;
+create)
+    kind=$(echo "$@" | sed 's/.*--kind=\([^ ]*\).*/\1/')
+    lower=$(echo "$kind" | tr '[:upper:]' '[:lower:]')
+    mkdir -p "roles/$lower/tasks"
+    printf -- '---\n# tasks file for %s\n' "$kind" \
+        > "roles/$lower/tasks/main.yml"
+    printf -- '- kind: %s\n  role: %s\n' "$kind" "$lower" >> watches.yaml
+    ;;
+esac
+"""
+
+
+@pytest.fixture()
+def lockfile(new_folder, release_mirror):
+    """Write a lockfile pinning binaries published on the local mirror."""
+    sums = release_mirror.add_osdk('1.3.1')
+    settings = {
+        'mirror': release_mirror.url,
+        'artifacts': {
+            download: {'version': '1.3.1', 'sha256': sha256}
+            for download, sha256 in sums.items()
+        },
+    }
+    settings['artifacts']['opm'] = {
+        'version': '1.14.2', 'sha256': release_mirror.add_opm('1.14.2')
+    }
+    filename = os.path.join(new_folder, 'tools.lock')
+    with open(filename, 'w') as f:
+        yaml.safe_dump(settings, f)
+    return {
+        'lockfile': filename,
+        'directory': os.path.join(new_folder, 'cache'),
+        'path': os.path.join(new_folder, 'bin'),
+    }
+
+
+@pytest.fixture()
+def fake_osdk(new_folder, monkeypatch):
+    """Put a fake operator-sdk first in $PATH, returning its invocation log.
+
+    The log file gets one line per invocation, with the arguments used.
+    """
+    bin_dir = os.path.join(new_folder, 'fake-bin')
+    os.makedirs(bin_dir)
+    osdk = os.path.join(bin_dir, 'operator-sdk')
+    with open(osdk, 'w') as f:
+        f.write(FAKE_OSDK)
+    os.chmod(osdk, 0o755)
+    log = os.path.join(new_folder, 'fake-osdk.log')
+    open(log, 'w').close()
+    monkeypatch.setenv('PATH', ':'.join([bin_dir, os.getenv('PATH')]))
+    monkeypatch.setenv('FAKE_OSDK_LOG', log)
+    return log
+
+
+FAKE_RUNTIME = r"""
+import fcntl
+import hashlib
+import json
+import os
+import sys
+import time
+
+args = sys.argv[1:]
+with open(os.environ['FAKE_RUNTIME_LOG'], 'a') as f:
+    f.write(json.dumps([os.path.basename(sys.argv[0])] + args) + '\n')
+state_file = os.environ['FAKE_RUNTIME_STATE']
+# Image archives come from another fake runtime process, so read them before
+# waiting on the lock that it needs too
+archive = sys.stdin.read() if args[:1] == ['exec'] and 'ctr' in args else None
+# Builds take their time outside the lock, as separate builds would
+if 'build' in args:
+    time.sleep(float(os.environ.get('FAKE_RUNTIME_BUILD_SECONDS', 0)))
+# Builds and pushes may run concurrently
+lock = open(state_file + '.lock', 'w')
+fcntl.flock(lock, fcntl.LOCK_EX)
+with open(state_file) as f:
+    state = json.load(f)
+
+
+def image_id(image):
+    return 'sha256:' + hashlib.sha256(json.dumps(
+        image, sort_keys=True
+    ).encode()).hexdigest()
+
+
+def option(name):
+    for i, arg in enumerate(args):
+        if arg == name:
+            return args[i + 1]
+        if arg.startswith(name + '='):
+            return arg.split('=', 1)[1]
+
+
+if 'build' in args:
+    cache_to = option('--cache-to')
+    if cache_to is not None:
+        dest = dict(kv.split('=', 1) for kv in cache_to.split(','))['dest']
+        os.makedirs(dest, exist_ok=True)
+        with open(os.path.join(dest, 'index.json'), 'w') as f:
+            f.write('{}')
+    image = option('-t')
+    state['images'][image] = {'labels': {}}
+    labels = [args[i + 1] for i, arg in enumerate(args) if arg == '--label']
+    for label in labels:
+        key, value = label.split('=', 1)
+        state['images'][image]['labels'][key] = value
+elif args[0] == 'save' and option('-o') is None:
+    # Streamed to stdout, as the image name and the image
+    json.dump([args[-1], state['images'][args[-1]]], sys.stdout)
+elif args[0] == 'save':
+    with open(option('-o'), 'w') as f:
+        json.dump(args[-1], f)
+elif args[0] == 'exec':
+    # Stand in for crictl and ctr on a kind node
+    node = state.setdefault('nodes', {}).setdefault(args[2], {})
+    if args[3] == 'crictl':
+        if args[-1] not in node:
+            print('FATA[0000] no such image')
+            sys.exit(1)
+        print(json.dumps({'status': {'id': node[args[-1]]}}))
+    elif args[3] == 'ctr':
+        name, image = json.loads(archive)
+        node[name] = image_id(image)
+elif args[0] == 'load':
+    with open(option('-i')) as f:
+        state['images'][json.load(f)] = {'labels': {}}
+elif args[0] == 'images':
+    for image in state['images']:
+        print(image)
+elif args[0] == 'rmi':
+    for image in args[1:]:
+        state['images'].pop(image, None)
+elif args[0] == 'tag':
+    state['images'][args[2]] = dict(state['images'][args[1]])
+elif args[:2] == ['image', 'inspect']:
+    if args[2] not in state['images']:
+        print('Error: no such image')
+        sys.exit(1)
+    print(json.dumps([{'Id': image_id(state['images'][args[2]]),
+                       'RepoTags': [args[2]], 'Config': {
+        'Labels': state['images'][args[2]]['labels']
+    }}]))
+elif args[0] == 'push':
+    state.setdefault('pushed', []).append(args[-1])
+
+with open(state_file, 'w') as f:
+    json.dump(state, f)
+"""
+
+
+class FakeRuntime(object):
+    """The log and image state of a fake container runtime."""
+
+    def __init__(self, log: str = None, state: str = None) -> None:
+        """Track the files the fake runtime writes to."""
+        self.log = log
+        self.state = state
+
+    def calls(self) -> list:
+        """Return the arguments of every invocation so far."""
+        with open(self.log) as f:
+            return [json.loads(line) for line in f]
+
+    def images(self) -> dict:
+        """Return the images the fake runtime holds."""
+        with open(self.state) as f:
+            return json.load(f)['images']
+
+    def add_images(self, *images) -> None:
+        """Add images to the fake runtime."""
+        with open(self.state) as f:
+            state = json.load(f)
+        for image in images:
+            state['images'][image] = {'labels': {}}
+        with open(self.state, 'w') as f:
+            json.dump(state, f)
+
+
+@pytest.fixture()
+def fake_runtime(new_folder, monkeypatch):
+    """Put fake docker and podman commands first in $PATH."""
+    bin_dir = os.path.join(new_folder, 'fake-runtime-bin')
+    os.makedirs(bin_dir)
+    for name in ['docker', 'podman']:
+        runtime = os.path.join(bin_dir, name)
+        with open(runtime, 'w') as f:
+            f.write('#!{}\n{}'.format(sys.executable, FAKE_RUNTIME))
+        os.chmod(runtime, 0o755)
+    runtime = FakeRuntime(log=os.path.join(new_folder, 'fake-runtime.log'),
+                          state=os.path.join(new_folder, 'fake-runtime.json'))
+    open(runtime.log, 'w').close()
+    with open(runtime.state, 'w') as f:
+        json.dump({'images': {}}, f)
+    monkeypatch.setenv('PATH', ':'.join([bin_dir, os.getenv('PATH')]))
+    monkeypatch.setenv('FAKE_RUNTIME_LOG', runtime.log)
+    monkeypatch.setenv('FAKE_RUNTIME_STATE', runtime.state)
+    return runtime
+
+
+@pytest.fixture()
+def fake_kind(fake_runtime, new_folder):
+    """Put a fake kind command in $PATH, for a cluster with three nodes.
+
+    The nodes are handled by the fake runtime's exec.
+    """
+    kind = os.path.join(new_folder, 'fake-runtime-bin', 'kind')
+    with open(kind, 'w') as f:
+        f.write('#!/bin/sh\nfor node in control-plane worker worker2; do\n'
+                '  echo "$4-$node"\ndone\n')
+    os.chmod(kind, 0o755)
+    return ['pytest-control-plane', 'pytest-worker', 'pytest-worker2']
+
+
+@pytest.fixture()
+def runtime_api(fake_runtime, new_folder, monkeypatch):
+    """Serve a runtime API over a Unix socket, backed by the fake runtime.
+
+    Returns the requests it receives as it receives them.
+    """
+    path = os.path.join(new_folder, 'runtime.sock')
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, code, body=None):
+            content = b'' if body is None else json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            if content:
+                self.wfile.write(content)
+
+        def handle_request(self):
+            requests.append((self.command, self.path))
+            url = urlparse(self.path)
+            name = unquote(url.path)
+            query = parse_qs(url.query)
+            if name == '/_ping':
+                return self.reply(200)
+            with open(fake_runtime.state + '.lock', 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                with open(fake_runtime.state) as f:
+                    state = json.load(f)
+                code, body = self.images(state['images'], name, query)
+                with open(fake_runtime.state, 'w') as f:
+                    json.dump(state, f)
+            self.reply(code, body)
+
+        def images(self, images, name, query):
+            if self.command == 'GET' and name == '/images/json':
+                patterns = json.loads(query.get('filters', ['{}'])[0]).get(
+                    'reference', ['*']
+                )
+                return 200, [
+                    {'RepoTags': [image],
+                     'Labels': images[image]['labels']}
+                    for image in images
+                    if any(fnmatch(image, p) for p in patterns)
+                ]
+            match = re.match(r'^/images/(.+?)(/json|/tag)?$', name)
+            if match is None:
+                return 404, {'message': 'page not found'}
+            image, action = match.groups()
+            if image not in images:
+                return 404, {'message': 'No such image: ' + image}
+            if self.command == 'GET' and action == '/json':
+                return 200, {'Id': 'sha256:' + hashlib.sha256(json.dumps(
+                                 images[image], sort_keys=True
+                             ).encode()).hexdigest(),
+                             'RepoTags': [image],
+                             'Config': {'Labels': images[image]['labels']}}
+            if self.command == 'POST' and action == '/tag':
+                target = '{}:{}'.format(query['repo'][0], query['tag'][0])
+                images[target] = dict(images[image])
+                return 201, None
+            if self.command == 'DELETE' and action is None:
+                images.pop(image)
+                return 200, [{'Untagged': image}]
+            return 405, {'message': 'method not allowed'}
+
+        do_GET = do_POST = do_DELETE = handle_request
+
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('DOCKER_HOST', 'unix://' + path)
+    monkeypatch.setenv('CONTAINER_HOST', 'unix://' + path)
+    yield requests
+    server.shutdown()
+    server.server_close()
+
+
+class FakeRegistry(object):
+    """A local stand-in for a container registry with token authentication.
+
+    Repositories are held in memory, as blobs and manifests by digest and
+    tags pointing at manifest digests.
+    """
+
+    username = 'pytest'
+    password = 'hunter2'
+    token = 'pytest-token'
+
+    def __init__(self) -> None:
+        """Start with no repositories."""
+        self.host = None
+        self.blobs = {}
+        self.manifests = {}
+        self.tags = {}
+        self.requests = []
+        self.uploads = 0
+        self.uploaded = 0
+
+    def add_blob(self, repository: str = None, content: bytes = None) -> str:
+        """Store a blob in a repository, returning its digest."""
+        digest = 'sha256:' + hashlib.sha256(content).hexdigest()
+        self.blobs.setdefault(repository, {})[digest] = content
+        return digest
+
+    def add_manifest(self, repository: str = None, tag: str = None,
+                     manifest: dict = None) -> str:
+        """Store a manifest and tag it, returning its digest."""
+        return self.put_manifest(repository, tag, manifest['mediaType'],
+                                 json.dumps(manifest).encode())
+
+    def put_manifest(self, repository: str = None, tag: str = None,
+                     media_type: str = None, content: bytes = None) -> str:
+        """Store a manifest as pushed and tag it, returning its digest."""
+        digest = 'sha256:' + hashlib.sha256(content).hexdigest()
+        self.manifests.setdefault(repository, {})[digest] = (media_type,
+                                                             content)
+        if tag is not None and not tag.startswith('sha256:'):
+            self.tags.setdefault(repository, {})[tag] = digest
+        return digest
+
+    def add_image(self, repository: str = None, tag: str = None,
+                  labels: dict = {}, layers: list = [b'layer']) -> str:
+        """Store a single-platform image, returning its manifest digest."""
+        config = self.add_blob(repository, json.dumps({
+            'architecture': 'amd64', 'os': 'linux',
+            'config': {'Labels': labels},
+        }).encode())
+        return self.add_manifest(repository, tag, {
+            'schemaVersion': 2,
+            'mediaType': 'application/vnd.oci.image.manifest.v1+json',
+            'config': {
+                'mediaType': 'application/vnd.oci.image.config.v1+json',
+                'digest': config,
+                'size': len(self.blobs[repository][config]),
+            },
+            'layers': [{
+                'mediaType': 'application/vnd.oci.image.layer.v1.tar+gzip',
+                'digest': self.add_blob(repository, layer),
+                'size': len(layer),
+            } for layer in layers],
+        })
+
+
+def serve_registry():
+    """Serve a FakeRegistry over HTTP until the generator is closed."""
+    registry = FakeRegistry()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, code, body=b'', headers={}):
+            self.send_response(code)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def body(self):
+            length = int(self.headers.get('Content-Length', 0))
+            return self.rfile.read(length)
+
+        def handle_token(self):
+            expected = 'Basic ' + base64.b64encode('{}:{}'.format(
+                registry.username, registry.password
+            ).encode()).decode()
+            if self.headers.get('Authorization') != expected:
+                return self.reply(401)
+            return self.reply(200, json.dumps({
+                'token': registry.token
+            }).encode())
+
+        def route(self):
+            """Authenticate a /v2/ request, returning its path parts."""
+            registry.requests.append((self.command, self.path))
+            url = urlparse(self.path)
+            match = re.match(
+                r'^/v2/(.+)/(manifests|blobs|blobs/uploads)/([^/]*)$',
+                url.path
+            )
+            if match is None:
+                self.body()
+                self.reply(404)
+                return None
+            repository = match.group(1)
+            if self.headers.get('Authorization') != \
+                    'Bearer {}'.format(registry.token):
+                self.body()
+                actions = 'pull' if self.command in ['GET', 'HEAD'] else \
+                    'pull,push'
+                self.reply(401, headers={
+                    'WWW-Authenticate': (
+                        'Bearer realm="http://{}/token",service="pytest",'
+                        'scope="repository:{}:{}"'
+                    ).format(registry.host, repository, actions)
+                })
+                return None
+            return match.groups() + (parse_qs(url.query),)
+
+        def do_GET(self):
+            if self.path.startswith('/token'):
+                registry.requests.append((self.command, self.path))
+                return self.handle_token()
+            route = self.route()
+            if route is None:
+                return
+            repository, kind, reference, _ = route
+            if kind == 'blobs':
+                blob = registry.blobs.get(repository, {}).get(reference)
+                if blob is None:
+                    return self.reply(404)
+                return self.reply(200, blob, {'Docker-Content-Digest':
+                                              reference})
+            digest = registry.tags.get(repository, {}).get(reference,
+                                                           reference)
+            if digest not in registry.manifests.get(repository, {}):
+                return self.reply(404)
+            media_type, content = registry.manifests[repository][digest]
+            self.reply(200, content, {'Content-Type': media_type,
+                                      'Docker-Content-Digest': digest})
+
+        do_HEAD = do_GET
+
+        def do_POST(self):
+            route = self.route()
+            if route is None:
+                return
+            repository, kind, _, query = route
+            self.body()
+            if kind != 'blobs/uploads':
+                return self.reply(405)
+            if 'mount' in query:
+                digest = query['mount'][0]
+                source = query.get('from', [None])[0]
+                blob = registry.blobs.get(source, {}).get(digest)
+                if blob is not None:
+                    registry.blobs.setdefault(repository, {})[digest] = blob
+                    return self.reply(201, headers={
+                        'Location': '/v2/{}/blobs/{}'.format(repository,
+                                                             digest)
+                    })
+            registry.uploads += 1
+            self.reply(202, headers={
+                'Location': '/v2/{}/blobs/uploads/{}?_state=pytest'.format(
+                    repository, registry.uploads
+                )
+            })
+
+        def do_PUT(self):
+            route = self.route()
+            if route is None:
+                return
+            repository, kind, reference, query = route
+            content = self.body()
+            if kind == 'manifests':
+                registry.put_manifest(repository, reference,
+                                      self.headers.get('Content-Type'),
+                                      content)
+                return self.reply(201)
+            digest = query['digest'][0]
+            if registry.add_blob(repository, content) != digest:
+                return self.reply(400)
+            registry.uploaded += len(content)
+            self.reply(201)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    registry.host = '127.0.0.1:{}'.format(server.server_address[1])
+    yield registry
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def fake_registry():
+    """Serve a local registry over HTTP for the duration of a test."""
+    yield from serve_registry()
+
+
+@pytest.fixture()
+def other_registry():
+    """Serve a second, separate local registry."""
+    yield from serve_registry()
+
+
+class FakeGithub(object):
+    """A local stand-in for the GitHub releases API."""
+
+    def __init__(self) -> None:
+        """Start with no releases."""
+        self.releases = {}
+        self.requests = []
+        self.url = None
+
+    def add_release(self, repository: str = None, version: str = None,
+                    prerelease: bool = False, draft: bool = False,
+                    assets: List[str] = ['binary_linux_amd64']) -> None:
+        """Publish a release with binaries and checksums, newest first."""
+        download = f'https://github.com/{repository}/releases/download/' \
+            f'v{version}'
+        self.releases.setdefault(repository, []).insert(0, {
+            'tag_name': f'v{version}',
+            'published_at': '2020-12-01T00:00:00Z',
+            'prerelease': prerelease,
+            'draft': draft,
+            'assets': [
+                {'name': name, 'size': size,
+                 'browser_download_url': f'{download}/{name}'}
+                for name, size in [(name, 1000) for name in assets] +
+                [('checksums.txt', 100)]
+            ],
+        })
+
+
+@pytest.fixture()
+def github_api():
+    """Serve a local GitHub releases API for the duration of a test.
+
+    Pages of releases carry Link headers and ETags like the real API's.
+    """
+    github = FakeGithub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            github.requests.append(self.path)
+            url = urlparse(self.path)
+            match = re.match(r'^/repos/([^/]+/[^/]+)/releases$', url.path)
+            if match is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            query = parse_qs(url.query)
+            per_page = int(query.get('per_page', ['30'])[0])
+            page = int(query.get('page', ['1'])[0])
+            releases = github.releases.get(match.group(1), [])
+            body = json.dumps(
+                releases[(page - 1) * per_page:page * per_page]
+            ).encode()
+            etag = '"{}"'.format(hashlib.sha256(body).hexdigest())
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            last = max(1, -(-len(releases) // per_page))
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            if last > 1:
+                self.send_header('Link', (
+                    f'<{github.url}{url.path}?per_page={per_page}&page='
+                    f'{min(page + 1, last)}>; rel="next", '
+                    f'<{github.url}{url.path}?per_page={per_page}&page='
+                    f'{last}>; rel="last"'
+                ))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    github.url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    yield github
+    server.shutdown()
+    server.server_close()
+
+
 def operator_settings_file(settings: dict = {}) -> str:
     """Yield the path to a file with settings saved as YAML."""
     operator_file = tempfile.mkstemp()[1]
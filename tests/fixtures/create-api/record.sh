@@ -0,0 +1,36 @@
+#!/bin/sh
+# Record the files operator-sdk create api adds to or changes in a freshly
+# initialized Ansible operator, for test_operator_apis to compare create_apis
+# against. Run it with the operator-sdk release to record first in $PATH:
+#
+#   tests/fixtures/create-api/record.sh 1.3
+#
+# before/ holds the changed files as init left them, and after/ every file
+# that create api added or changed, as it left them.
+set -e
+version=$1
+dest="$(cd "$(dirname "$0")" && pwd)/$version"
+work="$(mktemp -d)"
+trap 'rm -rf "$work"' EXIT
+
+mkdir "$work/pytest-operator"
+cd "$work/pytest-operator"
+operator-sdk init --plugins=ansible --domain=io
+cp -a . "$work/init"
+find . -type f -exec sha256sum {} + | sort -k2 > "$work/init.sums"
+for kind in PytestResource PytestPolicy PytestBranch; do
+    operator-sdk create api --group=operators --version=v1alpha1 \
+        --kind="$kind"
+done
+find . -type f -exec sha256sum {} + | sort -k2 > "$work/api.sums"
+
+rm -rf "$dest"
+comm -13 "$work/init.sums" "$work/api.sums" | awk '{print $2}' |
+while read -r file; do
+    mkdir -p "$dest/after/$(dirname "$file")"
+    cp "$file" "$dest/after/$file"
+    if [ -f "$work/init/$file" ]; then
+        mkdir -p "$dest/before/$(dirname "$file")"
+        cp "$work/init/$file" "$dest/before/$file"
+    fi
+done
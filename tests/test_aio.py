@@ -0,0 +1,158 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager asyncio API tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that the coroutine API installs binaries and builds
+operators concurrently, reporting what it did.
+"""
+
+import asyncio
+import os
+import pytest
+import requests
+import time
+
+from osdk_manager import aio, download
+from osdk_manager.exceptions import ShellRuntimeException
+from osdk_manager.operator import BuildCache
+from osdk_manager.osdk.update import OSDK_DOWNLOADS
+
+
+@pytest.fixture()
+def published(github_api, release_mirror, new_folder):
+    """Publish releases of operator-sdk and opm, returning where to go."""
+    for version in ['1.3.1', '1.4.0']:
+        github_api.add_release('operator-framework/operator-sdk', version)
+        release_mirror.add_osdk(version)
+    for version in ['1.14.2', '1.15.0']:
+        github_api.add_release('operator-framework/operator-registry',
+                               version)
+        release_mirror.add_opm(version)
+    return {
+        'directory': os.path.join(new_folder, 'cache'),
+        'path': os.path.join(new_folder, 'bin'),
+        'mirror': release_mirror.url,
+        'api': github_api.url,
+    }
+
+
+def test_osdk_update(published):
+    """Test that the latest operator-sdk is installed, then reused."""
+    result = asyncio.run(aio.osdk_update(verify=False, **published))
+    assert result.version == '1.4.0'
+    assert result.transferred > 0
+    assert result.cache_hits == 0
+    assert sorted(os.path.basename(dst) for dst in result.paths) == \
+        sorted(OSDK_DOWNLOADS)
+    assert asyncio.run(aio.osdk_version(
+        directory=published['directory'], path=published['path']
+    )) == '1.4.0'
+
+    result = asyncio.run(aio.osdk_update(version='1.4.0', verify=False,
+                                         **published))
+    assert (result.transferred, result.cache_hits) == (0, 3)
+
+
+def test_concurrent_updates(published):
+    """Test that operator-sdk and opm are installed at the same time."""
+    async def update_both():
+        return await asyncio.gather(
+            aio.osdk_update(version='~1.3', verify=False, **published),
+            aio.opm_update(version='~1.14', **published),
+        )
+
+    osdk, opm = asyncio.run(update_both())
+    assert (osdk.version, opm.version) == ('1.3.1', '1.14.2')
+    assert opm.paths == {
+        os.path.join(published['path'], 'opm'):
+        os.path.join(published['directory'], 'linux-amd64-opm-1.14.2')
+    }
+    assert opm.transferred == os.path.getsize(list(opm.paths.values())[0])
+    assert asyncio.run(aio.opm_version(
+        directory=published['directory'], path=published['path']
+    )) == '1.14.2'
+
+
+def test_update_errors(published):
+    """Test that failed downloads raise, leaving nothing behind."""
+    with pytest.raises(requests.HTTPError):
+        asyncio.run(aio.opm_update(version='1.16.0', **published))
+    assert [filename for filename in os.listdir(published['directory'])
+            if not filename.endswith('.lock')] == []
+    assert not os.path.exists(published['path'])
+
+
+def test_update_scheduled(published, monkeypatch):
+    """Test that downloads go through the shared download code."""
+    monkeypatch.setattr(download, '_scheduler',
+                        download.Scheduler(host_connections=1))
+    bandwidth = download.Bandwidth(priority=download.BACKGROUND)
+    result = asyncio.run(aio.osdk_update(version='1.3.1', verify=False,
+                                         bandwidth=bandwidth, **published))
+    assert result.version == '1.3.1'
+    assert result.transferred == sum(
+        os.path.getsize(src) for src in result.paths.values()
+    )
+    # Every connection was taken, and given back, as a background one
+    assert download.get_scheduler().active == {download.BACKGROUND: 0}
+
+
+def test_shell():
+    """Test that commands run without blocking, and are killed on cancel."""
+    assert asyncio.run(aio.shell('echo hello')) == ['hello']
+    with pytest.raises(ShellRuntimeException):
+        asyncio.run(aio.shell('false'))
+
+    async def cancelled():
+        task = asyncio.ensure_future(aio.shell('sleep 10'))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    started = time.monotonic()
+    asyncio.run(cancelled())
+    assert time.monotonic() - started < 5
+
+
+def test_async_operator_builds(new_folder, fake_runtime, operator_settings_1,
+                               monkeypatch):
+    """Test that operators build at once, leaving the process alone."""
+    monkeypatch.chdir(new_folder)
+    monkeypatch.delenv('IMG', raising=False)
+    monkeypatch.setenv('FAKE_RUNTIME_BUILD_SECONDS', '1')
+    operators = []
+    for name in ['first', 'second']:
+        directory = os.path.join(new_folder, name)
+        os.makedirs(directory)
+        settings = dict(operator_settings_1,
+                        image=f'quay.io/example/{name}-operator')
+        op = aio.AsyncOperator(directory=directory, runtime='podman',
+                               **settings)
+        op.build_cache = BuildCache(
+            image=op.image, directory=os.path.join(new_folder, 'cache')
+        )
+        operators.append(op)
+    assert os.getcwd() == new_folder
+
+    async def build_all():
+        return await asyncio.gather(*(op.build(cache=True)
+                                      for op in operators))
+
+    started = time.monotonic()
+    results = asyncio.run(build_all())
+    assert time.monotonic() - started < 1.9
+    assert [result.image for result in results] == [
+        'quay.io/example/first-operator:0.0.1',
+        'quay.io/example/second-operator:0.0.1',
+    ]
+    assert all(result.seconds >= 1 for result in results)
+    assert os.path.isfile(os.path.join(operators[0].build_cache.path,
+                                       'image.tar'))
+    assert 'IMG' not in os.environ
+
+    result = asyncio.run(operators[0].push())
+    assert result.image == 'quay.io/example/first-operator:0.0.1'
+    assert fake_runtime.calls()[-1] == ['podman', 'push', result.image]
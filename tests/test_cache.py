@@ -0,0 +1,116 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager artifact cache tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that concurrent installers share a single download
+of each binary and never leave a partial binary in place.
+"""
+
+import hashlib
+import os
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from osdk_manager.cache import ArtifactCache
+import osdk_manager.opm.update as opm_update
+import osdk_manager.osdk.update as osdk_update
+
+
+@pytest.fixture()
+def cache_dirs(new_folder):
+    """Return the cache and bin directories to install into."""
+    return {"directory": os.path.join(new_folder, 'cache'),
+            "path": os.path.join(new_folder, 'bin')}
+
+
+def test_concurrent_ensure(cache_dirs, release_mirror):
+    """Test that concurrent installers wait for a single downloader."""
+    sha256 = release_mirror.add_opm('1.14.2')
+    url = (f'{release_mirror.url}/operator-framework/operator-registry/'
+           f'releases/download/v1.14.2/linux-amd64-opm')
+
+    def ensure(_):
+        cache = ArtifactCache(cache_dirs['directory'])
+        return cache.ensure(filename='linux-amd64-opm-1.14.2', url=url,
+                            sha256=sha256)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        downloaded = list(pool.map(ensure, range(8)))
+    assert downloaded.count(True) == 1
+    assert len(release_mirror.requests) == 1
+    assert ArtifactCache(cache_dirs['directory']).manifest == {
+        'linux-amd64-opm-1.14.2': sha256
+    }
+
+
+def test_ensure_bad_digest(cache_dirs, release_mirror):
+    """Test that a mismatched download never lands in the cache."""
+    release_mirror.add_opm('1.14.2')
+    url = (f'{release_mirror.url}/operator-framework/operator-registry/'
+           f'releases/download/v1.14.2/linux-amd64-opm')
+    cache = ArtifactCache(cache_dirs['directory'])
+
+    with pytest.raises(RuntimeError):
+        cache.ensure(filename='linux-amd64-opm-1.14.2', url=url,
+                     sha256='0' * 64)
+    assert [f for f in os.listdir(cache_dirs['directory'])
+            if not f.endswith('.lock')] == []
+
+
+def test_unrecorded_binary(cache_dirs):
+    """Test that a binary from before the manifest is verified once."""
+    os.makedirs(cache_dirs['directory'])
+    content = b'binary'
+    with open(os.path.join(cache_dirs['directory'], 'opm-old'), 'wb') as f:
+        f.write(content)
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    cache = ArtifactCache(cache_dirs['directory'])
+    assert not cache.has('opm-old', '0' * 64)
+    assert cache.has('opm-old', sha256)
+    assert ArtifactCache(cache_dirs['directory']).manifest == {
+        'opm-old': sha256
+    }
+
+
+def test_record_keeps_other_writers(cache_dirs):
+    """Test that two cache objects don't clobber each other's records."""
+    first = ArtifactCache(cache_dirs['directory'])
+    second = ArtifactCache(cache_dirs['directory'])
+    first.record('a', '1')
+    second.record('b', '2')
+    assert ArtifactCache(cache_dirs['directory']).manifest == {
+        'a': '1', 'b': '2'
+    }
+
+
+def test_concurrent_opm_update(cache_dirs, release_mirror):
+    """Test that concurrent opm updates download once and link cleanly."""
+    release_mirror.add_opm('1.14.2')
+    opm_update._called_from_test = True
+
+    def update(_):
+        return opm_update.opm_update(version='1.14.2',
+                                     mirror=release_mirror.url, **cache_dirs)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert set(pool.map(update, range(4))) == {'1.14.2'}
+    assert len(release_mirror.requests) == 1
+    assert opm_update.opm_version(**cache_dirs) == '1.14.2'
+
+
+def test_osdk_update_mirror(cache_dirs, release_mirror):
+    """Test an unverified osdk update from a mirror, twice."""
+    release_mirror.add_osdk('1.3.1')
+    osdk_update._called_from_test = True
+
+    for _ in range(2):
+        version = osdk_update.osdk_update(version='1.3.1', verify=False,
+                                          mirror=release_mirror.url,
+                                          **cache_dirs)
+        assert version == '1.3.1'
+    assert osdk_update.osdk_version(**cache_dirs) == '1.3.1'
+    downloads = [r for r in release_mirror.requests if '_linux_amd64' in r]
+    assert len(downloads) == 3
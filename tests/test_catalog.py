@@ -0,0 +1,135 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager release catalog tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that the release catalog is fetched in full once,
+refreshed incrementally after that, and resolves constraints offline.
+"""
+
+import os
+import pytest
+from click.testing import CliRunner
+
+from osdk_manager import catalog as catalog_module
+from osdk_manager.catalog import ReleaseCatalog, satisfies
+from osdk_manager.cli import cli
+from osdk_manager.osdk.update import osdk_update
+
+REPOSITORY = 'operator-framework/operator-sdk'
+
+
+@pytest.mark.parametrize(('version', 'constraint', 'expected'), [
+    ('1.3.1', '~1.3', True),
+    ('1.4.0', '~1.3', False),
+    ('1.3.0-rc.1', '~1.3', False),
+    ('1.9.0', '^1.3', True),
+    ('2.0.0', '^1.3', False),
+    ('0.4.0', '^0.3.1', False),
+    ('1.3.1', '1.3.x', True),
+    ('1.4.0', '>=1.3,<1.5', True),
+    ('1.5.0', '>=1.3,<1.5', False),
+    ('1.3.9', '>1.3', False),
+    ('1.5.2', '~1.3 || ~1.5', True),
+    ('1.3.0-rc.2', '>=1.3.0-rc.1', True),
+    ('1.3.1', 'v1.3.1', True),
+    ('1.3.4', '!=1.3', False),
+    ('1.4.0', '>=1.2,!=1.3', True),
+    ('1.2.0', '!=1', False),
+])
+def test_satisfies(version, constraint, expected):
+    """Test that version constraints are interpreted like semver ranges."""
+    assert satisfies(version, constraint) == expected
+
+
+@pytest.fixture()
+def releases(github_api, monkeypatch):
+    """Publish releases over several pages of the API."""
+    monkeypatch.setattr(catalog_module, 'PER_PAGE', 2)
+    for version in ['1.2.0', '1.3.0', '1.3.1', '1.4.0-rc.1', '1.4.0']:
+        github_api.add_release(REPOSITORY, version,
+                               prerelease='rc' in version)
+    github_api.add_release(REPOSITORY, '1.5.0', draft=True)
+    return github_api
+
+
+def test_refresh(releases, new_folder):
+    """Test that a first refresh fetches every page, and later only new."""
+    catalog = ReleaseCatalog(REPOSITORY, new_folder, releases.url)
+    assert catalog.refresh() == 5
+    assert len(releases.requests) == 3
+    assert catalog.versions() == ['1.4.0', '1.3.1', '1.3.0', '1.2.0']
+    assert catalog.releases['1.3.1']['checksums'].endswith(
+        '/v1.3.1/checksums.txt'
+    )
+
+    # Unchanged, so the first page is all that's asked for
+    del releases.requests[:]
+    assert ReleaseCatalog(REPOSITORY, new_folder, releases.url).refresh() == 0
+    assert len(releases.requests) == 1
+
+    # One new release, so paging stops at the first known one, on page two
+    # behind the draft
+    del releases.requests[:]
+    releases.add_release(REPOSITORY, '1.4.1')
+    catalog = ReleaseCatalog(REPOSITORY, new_folder, releases.url)
+    assert catalog.refresh() == 1
+    assert len(releases.requests) == 2
+    assert catalog.resolve('~1.4') == '1.4.1'
+
+
+def test_resolve_offline(releases, new_folder):
+    """Test that constraints resolve against the catalog alone."""
+    ReleaseCatalog(REPOSITORY, new_folder, releases.url).refresh()
+    del releases.requests[:]
+    catalog = ReleaseCatalog(REPOSITORY, new_folder, 'http://127.0.0.1:9')
+    assert catalog.resolve('~1.3') == '1.3.1'
+    assert catalog.resolve('>=1.4.0-rc.1,<1.4.0') == '1.4.0-rc.1'
+    with pytest.raises(RuntimeError):
+        catalog.resolve('~1.9')
+    assert releases.requests == []
+
+
+def test_versions_cli(releases, new_folder):
+    """Test that versions are listed, with their assets if asked."""
+    runner = CliRunner()
+    result = runner.invoke(cli, ['osdk', 'versions', '-d', new_folder,
+                                 '--api', releases.url, '--prereleases'])
+    assert result.exit_code == 0
+    assert result.output.split() == ['1.4.0', '1.4.0-rc.1', '1.3.1',
+                                     '1.3.0', '1.2.0']
+
+    result = runner.invoke(cli, ['osdk', 'versions', '-d', new_folder,
+                                 '-c', '~1.3', '--assets'])
+    assert result.exit_code == 0
+    assert result.output.splitlines()[:3] == [
+        '1.3.1', '  binary_linux_amd64 (1000 bytes)',
+        '  checksums.txt (100 bytes)'
+    ]
+    assert os.path.isfile(os.path.join(new_folder, 'catalog',
+                                       'operator-framework_operator-sdk.json'))
+
+
+def test_update_constraint(releases, release_mirror, new_folder):
+    """Test that osdk update installs the newest release in a constraint."""
+    directory = os.path.join(new_folder, 'cache')
+    ReleaseCatalog(REPOSITORY, directory, releases.url).refresh()
+    release_mirror.add_osdk('1.3.1')
+    assert osdk_update(directory=directory, path=os.path.join(new_folder,
+                                                              'bin'),
+                       version='~1.3', verify=False,
+                       mirror=release_mirror.url) == '1.3.1'
+
+
+@pytest.mark.parametrize('binary', ['osdk', 'opm'])
+def test_update_cli_unsatisfiable(releases, new_folder, binary):
+    """Test that update fetches the catalog from --api and fails cleanly."""
+    result = CliRunner().invoke(cli, [
+        binary, 'update', '-d', new_folder, '-p', new_folder,
+        '-V', '~9.9', '--api', releases.url
+    ])
+    assert result.exit_code == 1
+    assert 'satisfies ~9.9' in result.output
+    assert 'Traceback' not in result.output
+    assert releases.requests
@@ -87,3 +87,30 @@ def test_osdk_no_validate():
     assert result.exit_code == 0
     assert 'operator-sdk version' in result.output
     assert 'is available at /tmp/operator-sdk' in result.output
+
+
+def test_osdk_use(osdk_cache):
+    """Test switching versions with osdk-manager osdk use."""
+    runner = CliRunner()
+    args = ['osdk', 'use', '--directory', osdk_cache['directory'],
+            '--path', osdk_cache['path'], '1.4.0']
+
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0
+    assert 'operator-sdk version 1.4.0 is now linked' in result.output
+
+    args = ['osdk', 'version', '--directory', osdk_cache['directory'],
+            '--path', osdk_cache['path']]
+    result = runner.invoke(cli, args)
+    assert result.output.strip() == '1.4.0'
+
+
+def test_osdk_use_missing(osdk_cache):
+    """Test that osdk-manager osdk use fails for an uninstalled version."""
+    runner = CliRunner()
+    args = ['osdk', 'use', '--directory', osdk_cache['directory'],
+            '--path', osdk_cache['path'], '0.0.1']
+
+    result = runner.invoke(cli, args)
+    assert result.exit_code != 0
+    assert 'is not installed' in result.output
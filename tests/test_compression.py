@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager compression tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that mirrors can keep pre-compressed artifacts, and
+that downloads negotiate them and verify what they decompress to.
+"""
+
+import hashlib
+import os
+import pytest
+from click.testing import CliRunner
+
+from osdk_manager.cli import cli
+from osdk_manager.compression import (available_codecs, compress_tree,
+                                      decompress_stream)
+from osdk_manager.download import fetch
+
+
+@pytest.fixture()
+def compressible_artifact(release_mirror, new_folder):
+    """Publish an artifact that compresses well."""
+    content = b''.join(f'line {i}\n'.encode() for i in range(100000))
+    release_mirror.add('operator-registry', '1.14.2', 'linux-amd64-opm',
+                       content)
+    return {
+        'url': (f'{release_mirror.url}/operator-framework/operator-registry/'
+                f'releases/download/v1.14.2/linux-amd64-opm'),
+        'dst': os.path.join(new_folder, 'opm'),
+        'sha256': hashlib.sha256(content).hexdigest(),
+        'content': content,
+    }
+
+
+@pytest.mark.parametrize('codec', available_codecs())
+def test_compress_tree(release_mirror, compressible_artifact, codec):
+    """Test that variants are written once and decompress to the original."""
+    written = compress_tree(release_mirror.root, [codec])
+    assert [os.path.basename(path) for path in written] == [
+        'linux-amd64-opm' + {'zstd': '.zst', 'gzip': '.gz'}[codec]
+    ]
+    with open(written[0], 'rb') as f:
+        compressed = f.read()
+    assert len(compressed) < len(compressible_artifact['content']) / 3
+    chunks = [compressed[i:i + 4096] for i in range(0, len(compressed), 4096)]
+    assert b''.join(decompress_stream(chunks, codec)) == \
+        compressible_artifact['content']
+    assert compress_tree(release_mirror.root, [codec]) == []
+
+
+def test_fetch_negotiated(release_mirror, compressible_artifact):
+    """Test that a mirror's pre-compressed variant is used when offered."""
+    compress_tree(release_mirror.root)
+    assert fetch(url=compressible_artifact['url'],
+                 dst=compressible_artifact['dst'],
+                 sha256=compressible_artifact['sha256']) == \
+        compressible_artifact['sha256']
+    assert release_mirror.encodings == available_codecs()[:1]
+    with open(compressible_artifact['dst'], 'rb') as f:
+        assert f.read() == compressible_artifact['content']
+
+
+def test_fetch_variant_only(release_mirror, compressible_artifact):
+    """Test that mirrors keeping only compressed variants can be used."""
+    result = CliRunner().invoke(cli, ['mirror', 'compress', '-c', 'gzip',
+                                      '--remove', release_mirror.root])
+    assert result.exit_code == 0
+    assert 'Wrote 1 compressed variants' in result.output
+
+    # A plain static server, that can only serve the variant by name
+    release_mirror.negotiate = False
+    fetch(url=compressible_artifact['url'], dst=compressible_artifact['dst'],
+          sha256=compressible_artifact['sha256'])
+    assert release_mirror.requests[-1].endswith('/linux-amd64-opm.gz')
+    with open(compressible_artifact['dst'], 'rb') as f:
+        assert f.read() == compressible_artifact['content']
+
+
+def test_fetch_compressed_bad_digest(release_mirror, compressible_artifact):
+    """Test that the decompressed artifact is checked against its digest."""
+    compress_tree(release_mirror.root)
+    with pytest.raises(RuntimeError):
+        fetch(url=compressible_artifact['url'],
+              dst=compressible_artifact['dst'], sha256='0' * 64)
+    assert not os.path.exists(compressible_artifact['dst'])
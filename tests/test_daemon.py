@@ -0,0 +1,148 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager daemon tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that commands forwarded to the daemon behave as they
+would when run directly, and that the CLI falls back when it isn't running.
+"""
+
+import os
+import pytest
+import socket
+import sys
+import threading
+import time
+
+from osdk_manager import daemon
+
+
+@pytest.fixture()
+def running_daemon(new_folder):
+    """Run a daemon in a background thread, yielding its socket path."""
+    path = os.path.join(new_folder, 'daemon.sock')
+    thread = threading.Thread(target=daemon.serve, kwargs={'path': path},
+                              daemon=True)
+    thread.start()
+    for _ in range(100):
+        if daemon.status(path=path) is not None:
+            break
+        time.sleep(0.05)
+    yield path
+    daemon.stop(path=path)
+    thread.join(timeout=5)
+
+
+def test_forward(running_daemon, osdk_cache):
+    """Test forwarding commands that succeed and fail."""
+    args = ['--directory', osdk_cache['directory'],
+            '--path', osdk_cache['path']]
+
+    reply = daemon.forward(['osdk', 'use'] + args + ['1.4.0'],
+                           path=running_daemon)
+    assert reply['exit_code'] == 0
+    assert 'operator-sdk version 1.4.0 is now linked' in reply['output']
+
+    reply = daemon.forward(['-vvv', 'osdk', 'version'] + args,
+                           path=running_daemon)
+    assert reply['exit_code'] == 0
+    assert reply['output'].endswith('1.4.0\n')
+    assert f'directory: {osdk_cache["directory"]}' in reply['output']
+
+    # Verbosity doesn't outlast the command that asked for it
+    reply = daemon.forward(['osdk', 'version'] + args, path=running_daemon)
+    assert reply == {'output': '1.4.0\n', 'exit_code': 0}
+
+    reply = daemon.forward(['osdk', 'use'] + args + ['0.0.1'],
+                           path=running_daemon)
+    assert reply['exit_code'] == 1
+    assert 'is not installed' in reply['output']
+
+
+def test_forward_cwd(running_daemon, osdk_cache, new_folder, monkeypatch):
+    """Test that forwarded commands run in the caller's directory."""
+    monkeypatch.chdir(new_folder)
+    reply = daemon.forward(['osdk', 'use', '--directory', 'cache',
+                            '--path', 'bin', '1.3.1'], path=running_daemon)
+    assert reply['exit_code'] == 0
+    assert os.path.islink(os.path.join(osdk_cache['path'], 'operator-sdk'))
+    assert os.getcwd() == new_folder
+
+
+def test_status(running_daemon):
+    """Test the daemon reports its PID, and refuses a second instance."""
+    assert daemon.status(path=running_daemon) == os.getpid()
+    with pytest.raises(RuntimeError):
+        daemon.serve(path=running_daemon)
+
+
+def test_no_daemon(new_folder):
+    """Test that nothing is forwarded without a daemon."""
+    path = os.path.join(new_folder, 'daemon.sock')
+    assert daemon.forward(['osdk', 'version'], path=path) is None
+    assert daemon.status(path=path) is None
+    assert not daemon.stop(path=path)
+
+
+def test_socket_not_ours(new_folder, monkeypatch):
+    """Test that a socket that can't be connected to is treated as absent."""
+    def refuse(self, address):
+        raise PermissionError(13, 'Permission denied')
+
+    monkeypatch.setattr(socket.socket, 'connect', refuse)
+    path = os.path.join(new_folder, 'daemon.sock')
+    assert daemon.forward(['osdk', 'version'], path=path) is None
+    assert daemon.status(path=path) is None
+
+
+def test_local_commands(running_daemon):
+    """Test that daemon and shim commands are never forwarded."""
+    assert daemon.forward(['-v', 'daemon', 'status'],
+                          path=running_daemon) is None
+    assert daemon.forward(['shim', 'install'], path=running_daemon) is None
+    for argv in [['sync'], ['mirror', 'compress'], ['-v', 'osdk', 'update'],
+                 ['opm', 'update', '--version', '1.15.0'],
+                 ['operator', 'watch']]:
+        assert daemon.forward(argv, path=running_daemon) is None
+    for argv in [['osdk', 'version'], ['opm', 'version'],
+                 ['shim', 'which', 'opm']]:
+        assert daemon.forward(argv, path=running_daemon) is not None
+
+
+def test_forward_exception(running_daemon, monkeypatch):
+    """Test that a command that raises still gets a reply."""
+    import osdk_manager.cli
+
+    def fail(*args, **kwargs):
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(osdk_manager.cli.cli, 'main', fail)
+    reply = daemon.forward(['osdk', 'version'], path=running_daemon)
+    assert reply['exit_code'] == 1
+    assert 'OSError: No space left on device' in reply['output']
+    assert daemon.status(path=running_daemon) == os.getpid()
+
+
+def test_no_reply(new_folder, monkeypatch):
+    """Test that commands aren't run again when the daemon doesn't reply."""
+    path = os.path.join(new_folder, 'daemon.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+
+    def hang_up():
+        connection, _ = server.accept()
+        connection.recv(4096)
+        connection.close()
+
+    thread = threading.Thread(target=hang_up, daemon=True)
+    thread.start()
+    monkeypatch.setenv('OSDK_MANAGER_SOCKET', path)
+    monkeypatch.delenv('OSDK_MANAGER_NO_DAEMON', raising=False)
+    monkeypatch.setattr(sys, 'argv', ['osdk-manager', 'osdk', 'version'])
+    with pytest.raises(SystemExit) as e:
+        daemon.main()
+    assert e.value.code == 1
+    thread.join(timeout=5)
+    server.close()
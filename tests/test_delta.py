@@ -0,0 +1,89 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager delta update tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that a release is built from a patch to the previous
+release when the mirror has one, and downloaded in full otherwise.
+"""
+
+import hashlib
+import os
+import pytest
+import random
+from click.testing import CliRunner
+
+from osdk_manager.cache import ArtifactCache
+from osdk_manager.cli import cli
+from osdk_manager.delta import patch_suffix
+
+zstandard = pytest.importorskip('zstandard')
+
+SHARED = random.Random(0).getrandbits(8 << 20).to_bytes(1 << 20, 'little')
+
+
+def binary(version: str = None) -> bytes:
+    """Return the content of a fake release, mostly shared between releases."""
+    return SHARED[:1000] + f'version {version}\n'.encode() + SHARED[1000:]
+
+
+@pytest.fixture()
+def releases(release_mirror, new_folder):
+    """Publish two releases, with a patch between them, and cache the first."""
+    sums = {version: release_mirror.add('operator-sdk', version,
+                                        'operator-sdk_linux_amd64',
+                                        binary(version))
+            for version in ['1.3.1', '1.4.0']}
+    result = CliRunner().invoke(cli, ['mirror', 'delta', release_mirror.root])
+    assert result.exit_code == 0
+    assert 'Wrote 1 patches' in result.output
+
+    cache = ArtifactCache(os.path.join(new_folder, 'cache'))
+    url = (f'{release_mirror.url}/operator-framework/operator-sdk/releases/'
+           f'download/v{{}}/operator-sdk_linux_amd64')
+    tmp = cache.stage('operator-sdk_linux_amd64-1.3.1', url.format('1.3.1'),
+                      sums['1.3.1'])
+    cache.install('operator-sdk_linux_amd64-1.3.1', tmp, sums['1.3.1'])
+    del release_mirror.requests[:]
+    return {'cache': cache, 'url': url, 'sums': sums}
+
+
+def test_patch_update(releases, release_mirror):
+    """Test that the next release is built from a small patch."""
+    cache, url, sums = releases['cache'], releases['url'], releases['sums']
+    tmp = cache.stage('operator-sdk_linux_amd64-1.4.0', url.format('1.4.0'),
+                      sums['1.4.0'], version='1.4.0')
+    with open(tmp, 'rb') as f:
+        assert hashlib.sha256(f.read()).hexdigest() == sums['1.4.0']
+    assert release_mirror.requests == [
+        url.format('1.4.0').split(release_mirror.url)[1] +
+        patch_suffix('1.3.1')
+    ]
+    patch = os.path.join(release_mirror.root, release_mirror.requests[0][1:])
+    assert os.path.getsize(patch) < 4096
+
+
+def test_patch_fallback(releases, release_mirror):
+    """Test that a corrupt cached release falls back to a full download."""
+    cache, url, sums = releases['cache'], releases['url'], releases['sums']
+    with open(cache.path('operator-sdk_linux_amd64-1.3.1'), 'r+b') as f:
+        f.write(b'corrupt')
+    tmp = cache.stage('operator-sdk_linux_amd64-1.4.0', url.format('1.4.0'),
+                      sums['1.4.0'], version='1.4.0')
+    with open(tmp, 'rb') as f:
+        assert hashlib.sha256(f.read()).hexdigest() == sums['1.4.0']
+    assert len(release_mirror.requests) == 2
+
+
+def test_no_patch(releases, release_mirror):
+    """Test that releases without a patch are downloaded in full."""
+    cache, url = releases['cache'], releases['url']
+    sha256 = release_mirror.add('operator-sdk', '1.5.0',
+                                'operator-sdk_linux_amd64', binary('1.5.0'))
+    cache.stage('operator-sdk_linux_amd64-1.5.0', url.format('1.5.0'),
+                sha256, version='1.5.0')
+    assert [path.rsplit('/', 1)[1] for path in release_mirror.requests] == [
+        'operator-sdk_linux_amd64' + patch_suffix('1.3.1'),
+        'operator-sdk_linux_amd64'
+    ]
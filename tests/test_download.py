@@ -0,0 +1,206 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager download tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that large artifacts are fetched in concurrent
+segments, resumed when a segment fails, and streamed whole otherwise, and
+that downloads are scheduled within bandwidth limits, priorities and
+connection caps.
+"""
+
+import hashlib
+import os
+import pytest
+import threading
+import time
+
+from osdk_manager import download
+from osdk_manager.download import (BACKGROUND, INTERACTIVE, Bandwidth,
+                                   Scheduler, fetch, parse_rate)
+
+
+@pytest.fixture()
+def large_artifact(release_mirror, new_folder, monkeypatch):
+    """Publish an artifact big enough to be fetched in four segments."""
+    monkeypatch.setattr(download, 'MIN_SEGMENT_SIZE', 64 << 10)
+    content = os.urandom(1 << 20)
+    release_mirror.add('operator-sdk', '1.3.1', 'operator-sdk_linux_amd64',
+                       content)
+    return {
+        'url': (f'{release_mirror.url}/operator-framework/operator-sdk/'
+                f'releases/download/v1.3.1/operator-sdk_linux_amd64'),
+        'dst': os.path.join(new_folder, 'operator-sdk'),
+        'sha256': hashlib.sha256(content).hexdigest(),
+        'content': content,
+    }
+
+
+def check(artifact: dict = None) -> None:
+    """Check that an artifact was assembled correctly, leaving no parts."""
+    with open(artifact['dst'], 'rb') as f:
+        assert f.read() == artifact['content']
+    directory = os.path.dirname(artifact['dst'])
+    assert not [f for f in os.listdir(directory) if f.endswith('.part')]
+
+
+def test_fetch_segmented(large_artifact, release_mirror):
+    """Test that a large artifact is fetched in concurrent segments."""
+    assert fetch(url=large_artifact['url'], dst=large_artifact['dst'],
+                 sha256=large_artifact['sha256']) == large_artifact['sha256']
+    check(large_artifact)
+    assert len(release_mirror.requests) == 4
+
+
+def test_fetch_segment_retry(large_artifact, release_mirror):
+    """Test that failed segments are resumed where they stopped."""
+    release_mirror.range_failures = 2
+    fetch(url=large_artifact['url'], dst=large_artifact['dst'],
+          sha256=large_artifact['sha256'])
+    check(large_artifact)
+    assert len(release_mirror.requests) == 6
+
+
+def test_fetch_without_ranges(large_artifact, release_mirror):
+    """Test that servers without range support are read in one stream."""
+    release_mirror.ranges = False
+    fetch(url=large_artifact['url'], dst=large_artifact['dst'],
+          sha256=large_artifact['sha256'])
+    check(large_artifact)
+    assert len(release_mirror.requests) == 1
+
+
+def test_fetch_segmented_bad_digest(large_artifact, new_folder):
+    """Test that the assembled artifact is checked against its digest."""
+    with pytest.raises(RuntimeError):
+        fetch(url=large_artifact['url'], dst=large_artifact['dst'],
+              sha256='0' * 64)
+    assert os.listdir(new_folder) == ['mirror']
+
+
+def test_fetch_bandwidth(large_artifact, release_mirror):
+    """Test that every segment of a download shares a bandwidth limit."""
+    bandwidth = Bandwidth(4 << 20, burst=256 << 10)
+    started = time.monotonic()
+    fetch(url=large_artifact['url'], dst=large_artifact['dst'],
+          sha256=large_artifact['sha256'], bandwidth=bandwidth)
+    # The last 768K of the 1M artifact come at 4M a second
+    assert time.monotonic() - started >= 0.15
+    check(large_artifact)
+    assert len(release_mirror.requests) == 4
+
+
+@pytest.mark.parametrize(('rate', 'expected'), [
+    ('1000', 1000),
+    ('500K', 500 << 10),
+    ('1.5M', 3 << 19),
+    ('2MiB/s', 2 << 20),
+    ('1g', 1 << 30),
+])
+def test_parse_rate(rate, expected):
+    """Test that rates are parsed with binary suffixes."""
+    assert parse_rate(rate) == expected
+
+
+def test_parse_rate_invalid():
+    """Test that rates that can't be parsed are rejected."""
+    with pytest.raises(RuntimeError):
+        parse_rate('fast')
+
+
+@pytest.fixture()
+def scheduler(monkeypatch):
+    """Replace the process's download scheduler with a fresh one."""
+    def replace(**kwargs) -> Scheduler:
+        scheduler = Scheduler(**kwargs)
+        monkeypatch.setattr(download, '_scheduler', scheduler)
+        return scheduler
+    return replace
+
+
+def test_scheduler_rate(scheduler, large_artifact, release_mirror):
+    """Test that every download is held to the global rate."""
+    scheduler(rate=2 << 20)
+    started = time.monotonic()
+    fetch(url=large_artifact['url'], dst=large_artifact['dst'],
+          sha256=large_artifact['sha256'])
+    # The 512K past the first quarter second's burst come at 2M a second
+    assert time.monotonic() - started >= 0.2
+    check(large_artifact)
+
+
+def test_scheduler_host_connections(scheduler, large_artifact,
+                                    release_mirror):
+    """Test that segments are only fetched over free connections."""
+    scheduler(host_connections=2)
+    fetch(url=large_artifact['url'], dst=large_artifact['dst'],
+          sha256=large_artifact['sha256'])
+    check(large_artifact)
+    assert len(release_mirror.requests) == 2
+    assert sum(download.get_scheduler().connections.values()) == 0
+
+
+def test_scheduler_interactive_first():
+    """Test that interactive downloads get the next free connection."""
+    scheduler = Scheduler(host_connections=1)
+    url = 'https://github.com/operator-framework'
+    assert scheduler.acquire(url)
+    assert not scheduler.acquire(url, blocking=False)
+    assert scheduler.acquire('https://example.com', blocking=False)
+
+    order = []
+
+    def download(priority: str = None) -> None:
+        with scheduler.connection(url, priority):
+            order.append(priority)
+
+    threads = [threading.Thread(target=download, args=(priority,))
+               for priority in [BACKGROUND, INTERACTIVE]]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.1)
+    scheduler.release(url)
+    for thread in threads:
+        thread.join()
+    assert order == [INTERACTIVE, BACKGROUND]
+
+
+def test_scheduler_background_yields():
+    """Test that background reads wait for interactive downloads."""
+    scheduler = Scheduler()
+    url = 'https://github.com/operator-framework'
+    scheduler.acquire(url, INTERACTIVE)
+    threading.Timer(0.2, scheduler.release, (url, INTERACTIVE)).start()
+    started = time.monotonic()
+    scheduler.consume(1 << 20, BACKGROUND)
+    waited = time.monotonic() - started
+    assert 0.2 <= waited < download.BACKGROUND_WAIT
+    started = time.monotonic()
+    scheduler.consume(1 << 20, BACKGROUND)
+    assert time.monotonic() - started < 0.1
+
+
+def test_scheduler_across_processes(new_folder):
+    """Test that schedulers sharing a directory schedule together."""
+    directory = os.path.join(new_folder, 'scheduler')
+    url = 'https://github.com/operator-framework'
+    interactive = Scheduler(host_connections=1, directory=directory)
+    background = Scheduler(host_connections=1, directory=directory)
+
+    assert interactive.acquire(url)
+    assert not background.acquire(url, BACKGROUND, blocking=False)
+    threading.Timer(0.2, interactive.release, (url,)).start()
+    started = time.monotonic()
+    background.consume(1 << 20, BACKGROUND)
+    assert 0.2 <= time.monotonic() - started < download.BACKGROUND_WAIT
+    assert background.acquire(url, BACKGROUND, blocking=False)
+    background.release(url, BACKGROUND)
+
+    first = Scheduler(rate=1 << 20, directory=directory)
+    second = Scheduler(rate=1 << 20, directory=directory)
+    first.bandwidth.consume(256 << 10)
+    started = time.monotonic()
+    # The burst was spent by the other scheduler
+    second.bandwidth.consume(256 << 10)
+    assert time.monotonic() - started >= 0.2
@@ -0,0 +1,75 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager install strategy tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that cached binaries can be installed as symlinks or
+as files of their own, and that installations are recognized either way.
+"""
+
+import os
+import pytest
+
+from osdk_manager.install import (FILE, STRATEGIES, install_binaries,
+                                  installed_source, is_installed)
+from osdk_manager.osdk.update import osdk_use, osdk_version
+
+
+@pytest.fixture()
+def cached_binary(new_folder):
+    """Write a binary into a cache directory."""
+    directory = os.path.join(new_folder, 'cache')
+    os.makedirs(directory)
+    src = os.path.join(directory, 'linux-amd64-opm-1.14.2')
+    with open(src, 'w') as f:
+        f.write('#!/bin/sh\necho opm 1.14.2\n')
+    os.chmod(src, 0o755)
+    path = os.path.join(new_folder, 'bin')
+    os.makedirs(path)
+    return {'src': src, 'dst': os.path.join(path, 'opm'),
+            'directory': directory}
+
+
+@pytest.mark.parametrize('strategy', STRATEGIES + [FILE])
+def test_install_strategies(cached_binary, strategy):
+    """Test that each strategy installs a working, recognizable binary."""
+    src, dst, directory = (cached_binary['src'], cached_binary['dst'],
+                           cached_binary['directory'])
+    try:
+        install_binaries({dst: src}, strategy)
+    except OSError as e:
+        pytest.skip(f'{strategy} is unsupported here: {e}')
+
+    with open(dst) as f:
+        assert f.read() == '#!/bin/sh\necho opm 1.14.2\n'
+    assert os.access(dst, os.X_OK)
+    assert os.path.islink(dst) == (strategy == 'symlink')
+    assert installed_source(dst, directory) == src
+    assert is_installed(src, dst, directory, strategy)
+    assert not is_installed(src, dst, directory,
+                            'copy' if strategy == 'symlink' else 'symlink')
+    assert not [f for f in os.listdir(os.path.dirname(dst))
+                if f.endswith('.tmp')]
+
+
+def test_install_changed(cached_binary):
+    """Test that a copy changed since it was installed isn't recognized."""
+    src, dst, directory = (cached_binary['src'], cached_binary['dst'],
+                           cached_binary['directory'])
+    install_binaries({dst: src}, 'copy')
+    with open(dst, 'a') as f:
+        f.write('echo changed\n')
+    assert installed_source(dst, directory) is None
+
+    install_binaries({dst: src}, 'symlink')
+    assert installed_source(dst, directory) == src
+
+
+def test_osdk_use_file(new_folder, osdk_cache):
+    """Test that versions installed as files are still identified."""
+    directory, path = osdk_cache['directory'], osdk_cache['path']
+    assert osdk_use(version='1.3.1', strategy=FILE, directory=directory,
+                    path=path) == '1.3.1'
+    assert not os.path.islink(os.path.join(path, 'operator-sdk'))
+    assert osdk_version(directory=directory, path=path) == '1.3.1'
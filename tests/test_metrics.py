@@ -0,0 +1,170 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager metrics tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that metrics render in the Prometheus text format,
+add up across processes in a textfile, and are served by the daemon.
+"""
+
+import os
+import pytest
+import threading
+import time
+import urllib.request
+from click.testing import CliRunner
+from typing import Callable, List
+
+from osdk_manager import daemon, metrics
+from osdk_manager.cli import cli
+from osdk_manager.util import shell
+
+
+def sample(text: str = None, name: str = None) -> float:
+    """Return the value of the sample called name in text, or 0."""
+    for line in text.splitlines():
+        if line.startswith(name + ' '):
+            return float(line.split()[-1])
+    return 0
+
+
+def test_render():
+    """Test that counters and histograms render in the text format."""
+    registry = metrics.Registry()
+    counter = registry.register(metrics.Counter(
+        'test_total', 'Things counted.', ('kind',)
+    ))
+    histogram = registry.register(metrics.Histogram(
+        'test_seconds', 'Things timed.', buckets=(1, 5)
+    ))
+    counter.inc(kind='a')
+    counter.inc(2, kind='b "quoted"')
+    histogram.observe(0.5)
+    histogram.observe(3)
+    assert registry.render() == '\n'.join([
+        '# HELP test_seconds Things timed.',
+        '# TYPE test_seconds histogram',
+        'test_seconds_bucket{le="1"} 1',
+        'test_seconds_bucket{le="5"} 2',
+        'test_seconds_bucket{le="+Inf"} 2',
+        'test_seconds_sum 3.5',
+        'test_seconds_count 2',
+        '# HELP test_total Things counted.',
+        '# TYPE test_total counter',
+        'test_total{kind="a"} 1',
+        'test_total{kind="b \\"quoted\\""} 2',
+    ]) + '\n'
+
+    with pytest.raises(ValueError, match='takes labels kind'):
+        counter.inc()
+    with pytest.raises(ValueError, match='only be increased'):
+        counter.inc(-1, kind='a')
+
+
+def test_textfile(new_folder):
+    """Test that every process's metrics add up in a textfile."""
+    path = os.path.join(new_folder, 'textfile', 'osdk_manager.prom')
+    processes = []
+    for _ in range(2):
+        registry = metrics.Registry()
+        processes.append((registry, registry.register(metrics.Counter(
+            'test_total', 'Things counted.'
+        ))))
+
+    processes[0][1].inc(2)
+    processes[1][1].inc(3)
+    for registry, _ in processes:
+        assert registry.flush(path)
+    processes[0][1].inc()
+    processes[0][0].flush(path)
+    # Flushing without anything new adds nothing
+    processes[1][0].flush(path)
+    with open(path) as f:
+        assert sample(f.read(), 'test_total') == 6
+    assert not [f for f in os.listdir(os.path.dirname(path))
+                if f.endswith('.tmp')]
+    assert not metrics.Registry().flush()
+
+
+def test_instrumented_commands(lockfile, new_folder, monkeypatch):
+    """Test that CLI commands add what they did to the textfile."""
+    path = os.path.join(new_folder, 'osdk_manager.prom')
+    monkeypatch.setenv(metrics.TEXTFILE_ENV, path)
+    runner = CliRunner()
+    args = ['sync', '--lockfile', lockfile['lockfile'],
+            '--directory', lockfile['directory'], '--path', lockfile['path']]
+
+    def added(command: List[str] = None) -> Callable[[str], float]:
+        """Run command, returning how much a sample went up because of it."""
+        metrics.flush()
+        with open(path) as f:
+            before = f.read()
+        assert runner.invoke(cli, command).exit_code == 0
+        with open(path) as f:
+            after = f.read()
+        return lambda name: sample(after, name) - sample(before, name)
+
+    difference = added(args)
+    assert difference('osdk_manager_download_bytes_total') == sum(
+        os.path.getsize(os.path.join(lockfile['directory'], filename))
+        for filename in os.listdir(lockfile['directory'])
+        if not filename.endswith(('.json', '.lock'))
+    )
+    assert difference('osdk_manager_download_seconds_count') == 4
+    assert difference('osdk_manager_cache_lookups_total{result="miss"}') == 4
+
+    difference = added(args)
+    assert difference('osdk_manager_download_seconds_count') == 0
+    assert difference('osdk_manager_cache_lookups_total{result="hit"}') == 4
+
+
+def test_shell_commands():
+    """Test that commands are counted by program and result."""
+    name = 'osdk_manager_shell_commands_total{{command="{}",result="{}"}}'
+    before = metrics.render()
+    [line for line in shell('true')]
+    [line for line in shell('false', fail=False)]
+    after = metrics.render()
+    for result in ['success', 'failure']:
+        command = name.format(result == 'success' and 'true' or 'false',
+                              result)
+        assert sample(after, command) == sample(before, command) + 1
+
+
+def test_daemon_metrics(new_folder):
+    """Test that the daemon serves its metrics, over HTTP too."""
+    path = os.path.join(new_folder, 'daemon.sock')
+    assert daemon.metrics(path=path) is None
+    thread = threading.Thread(target=daemon.serve, kwargs={'path': path},
+                              daemon=True)
+    thread.start()
+    for _ in range(100):
+        if daemon.status(path=path) is not None:
+            break
+        time.sleep(0.05)
+    try:
+        assert '# TYPE osdk_manager_download_seconds histogram' in \
+            daemon.metrics(path=path)
+        result = CliRunner().invoke(cli, ['daemon', 'metrics',
+                                          '--socket', path])
+        assert result.exit_code == 0
+        assert '# TYPE osdk_manager_shell_commands_total counter' in \
+            result.output
+    finally:
+        daemon.stop(path=path)
+        thread.join(timeout=5)
+
+    server = daemon.serve_metrics('127.0.0.1:0')
+    try:
+        url = f'http://127.0.0.1:{server.server_port}'
+        with urllib.request.urlopen(f'{url}/metrics') as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+            assert b'osdk_manager_download_bytes_total' in response.read()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f'{url}/')
+    finally:
+        server.shutdown()
+        server.server_close()
+    with pytest.raises(RuntimeError):
+        daemon.parse_address('localhost:http')
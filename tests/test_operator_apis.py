@@ -0,0 +1,204 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager operator API scaffolding tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that scaffolding many APIs in one pass produces the
+same project as creating them one at a time, and as the operator-sdk releases
+recorded in fixtures/create-api.
+"""
+
+import filecmp
+import os
+import pytest
+import shutil
+
+from osdk_manager.operator import Operator
+from osdk_manager.operator.apis import covered, create_apis, pluralize
+from osdk_manager.util import shell
+
+PROJECT = '''domain: io
+layout: ansible.sdk.operatorframework.io/v1
+projectName: pytest-operator
+version: "3"
+'''
+
+ROLE = '''---
+apiVersion: rbac.authorization.k8s.io/v1
+kind: ClusterRole
+metadata:
+  name: manager-role
+rules:
+  # +kubebuilder:scaffold:rules
+'''
+
+WATCHES = '''---
+# Use the 'create api' subcommand to add watches to this file.
+# +kubebuilder:scaffold:watch
+'''
+
+KINDS = ['PytestResource', 'PytestPolicy', 'PytestBranch']
+
+# Projects recorded before and after operator-sdk create api, by record.sh
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'create-api')
+
+
+def initialized_project(directory: str = None) -> str:
+    """Write the files operator-sdk init leaves for create api to update."""
+    os.makedirs(os.path.join(directory, 'config', 'rbac'))
+    for path, content in [('PROJECT', PROJECT),
+                          ('config/rbac/role.yaml', ROLE),
+                          ('watches.yaml', WATCHES)]:
+        with open(os.path.join(directory, path), 'w') as f:
+            f.write(content)
+    return directory
+
+
+def assert_same_tree(left: str = None, right: str = None) -> None:
+    """Assert that two directory trees have identical files."""
+    comparison = filecmp.dircmp(left, right)
+    assert comparison.left_only == []
+    assert comparison.right_only == []
+    _, mismatch, errors = filecmp.cmpfiles(left, right,
+                                           comparison.common_files,
+                                           shallow=False)
+    assert mismatch == []
+    assert errors == []
+    for subdir in comparison.common_dirs:
+        assert_same_tree(os.path.join(left, subdir),
+                         os.path.join(right, subdir))
+
+
+def test_pluralize():
+    """Test the pluralization of kinds."""
+    assert pluralize('pytestresource') == 'pytestresources'
+    assert pluralize('pytestpolicy') == 'pytestpolicies'
+    assert pluralize('pytestgateway') == 'pytestgateways'
+    assert pluralize('pytestbranch') == 'pytestbranches'
+    assert pluralize('pytestbox') == 'pytestboxes'
+    assert pluralize('pytestclass') == 'pytestclasses'
+    assert pluralize('pytestinstallation') == 'pytestinstallations'
+    for kind in ['PytestIndex', 'PytestStatus', 'PytestLeaf', 'PytestDatum',
+                 'PytestPerson', 'PytestQuiz', 'PytestCriterion']:
+        assert not covered(kind)
+
+
+def test_batch_matches_sequential(new_folder):
+    """Test one pass over many kinds matches one pass per kind."""
+    batch = initialized_project(os.path.join(new_folder, 'batch'))
+    create_apis(directory=batch, domain='io', group='operators',
+                api_version='v1alpha1', kinds=KINDS, sdk_version='1.3.1')
+
+    sequential = initialized_project(os.path.join(new_folder, 'sequential'))
+    for kind in KINDS:
+        create_apis(directory=sequential, domain='io', group='operators',
+                    api_version='v1alpha1', kinds=[kind],
+                    sdk_version='1.3.1')
+
+    assert_same_tree(batch, sequential)
+    with open(os.path.join(batch, 'watches.yaml')) as f:
+        watches = f.read()
+    assert watches.index('kind: PytestResource') < \
+        watches.index('kind: PytestPolicy') < \
+        watches.index('kind: PytestBranch') < \
+        watches.index('# +kubebuilder:scaffold:watch')
+    assert os.path.isfile(os.path.join(
+        batch, 'config/crd/bases/operators.io_pytestpolicies.yaml'
+    ))
+
+
+@pytest.mark.parametrize('sdk_version', ['1.3', '1.4'])
+def test_batch_matches_recorded(new_folder, sdk_version):
+    """Test one pass over many kinds matches a recorded operator-sdk run."""
+    project = os.path.join(new_folder, 'project')
+    shutil.copytree(os.path.join(FIXTURES, sdk_version, 'before'), project)
+    create_apis(directory=project, domain='io', group='operators',
+                api_version='v1alpha1', kinds=KINDS,
+                sdk_version=f'{sdk_version}.0')
+    assert_same_tree(project, os.path.join(FIXTURES, sdk_version, 'after'))
+
+
+def test_existing_kind(new_folder):
+    """Test that an existing kind is refused without touching anything."""
+    project = initialized_project(new_folder + '/project')
+    create_apis(directory=project, domain='io', group='operators',
+                api_version='v1alpha1', kinds=KINDS[:1], sdk_version='1.3.1')
+    snapshot = new_folder + '/snapshot'
+    shutil.copytree(project, snapshot)
+
+    with pytest.raises(RuntimeError):
+        create_apis(directory=project, domain='io', group='operators',
+                    api_version='v1alpha1', kinds=KINDS, sdk_version='1.3.1')
+    assert_same_tree(project, snapshot)
+
+
+def test_missing_shared_file(new_folder):
+    """Test that a missing shared file is found before anything is written."""
+    project = initialized_project(new_folder + '/project')
+    os.remove(os.path.join(project, 'config/rbac/role.yaml'))
+    snapshot = new_folder + '/snapshot'
+    shutil.copytree(project, snapshot)
+
+    with pytest.raises(RuntimeError, match='role.yaml is missing'):
+        create_apis(directory=project, domain='io', group='operators',
+                    api_version='v1alpha1', kinds=KINDS, sdk_version='1.3.1')
+    assert_same_tree(project, snapshot)
+    assert not os.path.exists(os.path.join(project, 'molecule'))
+
+
+def test_unsupported_version(new_folder):
+    """Test that an unknown operator-sdk version isn't guessed at."""
+    project = initialized_project(new_folder + '/project')
+    with pytest.raises(RuntimeError, match='No API templates'):
+        create_apis(directory=project, domain='io', group='operators',
+                    api_version='v1alpha1', kinds=KINDS, sdk_version='0.19.4')
+
+
+def test_operator_batch(new_folder, fake_osdk, operator_settings_1,
+                        monkeypatch):
+    """Test that Operator runs operator-sdk only to initialize a batch."""
+    monkeypatch.chdir(new_folder)
+    settings = dict(operator_settings_1, kinds=KINDS)
+    op = Operator(directory=new_folder, runtime="fake", osdk_version="1.3.1",
+                  **settings)
+    op.initialize_ansible_operator(batch=True)
+    with open(fake_osdk) as f:
+        assert [line.split()[0] for line in f] == ['version', 'init']
+    assert os.path.isfile(os.path.join(
+        new_folder, 'config/rbac/pytestbranch_editor_role.yaml'
+    ))
+
+
+def test_operator_batch_irregular_kind(new_folder, fake_osdk,
+                                       operator_settings_1, monkeypatch):
+    """Test that kinds pluralize doesn't cover are left to operator-sdk."""
+    monkeypatch.chdir(new_folder)
+    settings = dict(operator_settings_1, kinds=KINDS[:1] + ['PytestIndex'])
+    op = Operator(directory=new_folder, runtime="fake", osdk_version="1.3.1",
+                  **settings)
+    op.initialize_ansible_operator(batch=True)
+    with open(fake_osdk) as f:
+        assert [line.split()[0] for line in f] == \
+            ['version', 'init', 'create', 'create']
+
+
+def test_operator_batch_matches_cli(new_folder, operator_settings_1,
+                                    monkeypatch):
+    """Test batch scaffolding against the real operator-sdk."""
+    if shutil.which('operator-sdk') is None:
+        pytest.skip("Unable to compare without operator-sdk in $PATH.")
+    version = ''.join(shell("operator-sdk version"))
+    if 'v1.3.' not in version and 'v1.4.' not in version:
+        pytest.skip("Templates don't cover this operator-sdk version.")
+
+    settings = dict(operator_settings_1, kinds=KINDS)
+    projects = []
+    for batch in [False, True]:
+        project = os.path.join(new_folder, str(batch), 'pytest-operator')
+        os.makedirs(project)
+        monkeypatch.chdir(project)
+        op = Operator(directory=project, runtime="fake", **settings)
+        op.initialize_ansible_operator(batch=batch)
+        projects.append(project)
+    assert_same_tree(*projects)
@@ -0,0 +1,76 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager operator build cache tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that builds read and write the per-operator layer
+cache, and that it can be exported, restored and pruned.
+"""
+
+import os
+import time
+
+from osdk_manager.operator import BuildCache, Operator
+
+
+def test_docker_build_cache(new_folder, fake_runtime, operator_settings_1,
+                            monkeypatch):
+    """Test that docker builds import the cache exported last time."""
+    monkeypatch.chdir(new_folder)
+    op = Operator(directory=new_folder, runtime="docker",
+                  **operator_settings_1)
+    op.build_cache = BuildCache(image=op.image,
+                                directory=os.path.join(new_folder, 'cache'))
+    layers = os.path.join(op.build_cache.path, 'layers')
+
+    op.build(cache=True)
+    assert os.path.isfile(os.path.join(layers, 'index.json'))
+    assert not os.path.exists(layers + '.new')
+    op.build(cache=True)
+
+    first, second = fake_runtime.calls()
+    assert first[:3] == ['docker', 'buildx', 'build']
+    assert '--cache-from' not in first
+    assert f'type=local,src={layers}' in second
+    assert f'type=local,dest={layers}.new,mode=max' in second
+
+
+def test_podman_export_restore(new_folder, fake_runtime, operator_settings_1,
+                               monkeypatch):
+    """Test that a podman cache round-trips through a single archive."""
+    monkeypatch.chdir(new_folder)
+    op = Operator(directory=new_folder, runtime="podman",
+                  **operator_settings_1)
+    op.build_cache = BuildCache(image=op.image,
+                                directory=os.path.join(new_folder, 'cache'))
+    image = op.build(cache=True)
+    build = fake_runtime.calls()[0]
+    assert build[:3] == ['podman', 'build', '--layers']
+    assert build[-3:] == ['-t', image, '.']
+
+    archive = op.build_cache.export(os.path.join(new_folder, 'cache.tar'))
+    restored = BuildCache(image=op.image,
+                          directory=os.path.join(new_folder, 'runner'))
+    restored.restore(archive, runtime="podman")
+    assert os.path.isfile(os.path.join(restored.path, 'image.tar'))
+    assert fake_runtime.calls()[-1] == [
+        'podman', 'load', '-i', os.path.join(restored.path, 'image.tar')
+    ]
+
+
+def test_prune(new_folder):
+    """Test pruning by age and then by size, oldest first."""
+    directory = os.path.join(new_folder, 'cache')
+    caches = [BuildCache(image=f'quay.io/example/operator-{i}',
+                         directory=directory) for i in range(4)]
+    now = time.time()
+    for i, cache in enumerate(caches):
+        os.makedirs(cache.path)
+        with open(os.path.join(cache.path, 'image.tar'), 'wb') as f:
+            f.write(b'0' * 100)
+        os.utime(cache.path, (now - 1000 * (4 - i), now - 1000 * (4 - i)))
+
+    assert caches[0].prune(max_age=3500) == [caches[0].path]
+    assert caches[0].prune(max_bytes=150) == [caches[1].path, caches[2].path]
+    assert os.listdir(directory) == [os.path.basename(caches[3].path)]
@@ -0,0 +1,98 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager operator local cluster tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that images are loaded into the nodes of a local
+cluster only when they've changed.
+"""
+
+import json
+import os
+import pytest
+
+from osdk_manager.operator import Operator
+
+
+def test_load_into_kind(new_folder, fake_runtime, fake_kind,
+                        operator_settings_1, monkeypatch):
+    """Test loading changed images into every kind node."""
+    monkeypatch.chdir(new_folder)
+    op = Operator(directory=new_folder, runtime="docker",
+                  **operator_settings_1)
+    image = op.build()
+
+    assert op.load_into_cluster("pytest", provider="kind") == {
+        image: fake_kind
+    }
+    saves = [call for call in fake_runtime.calls() if call[1] == 'save']
+    assert saves == [['docker', 'save', image]]
+    assert not any(name.endswith('.tar') for name in os.listdir(new_folder))
+
+    # Nothing changed, so nothing is loaded
+    assert op.load_into_cluster("pytest", provider="kind") == {image: []}
+
+    # Only the node that's out of date is loaded
+    with open(fake_runtime.state) as f:
+        state = json.load(f)
+    state['nodes']['pytest-worker'][image] = 'sha256:old'
+    with open(fake_runtime.state, 'w') as f:
+        json.dump(state, f)
+    assert op.load_into_cluster("pytest", provider="kind") == {
+        image: ['pytest-worker']
+    }
+
+    # podman reports bare IDs, which still match the nodes' prefixed ones
+    with open(fake_runtime.state) as f:
+        state = json.load(f)
+    state['nodes']['pytest-worker'][image] = \
+        state['nodes']['pytest-worker2'][image][len('sha256:'):]
+    with open(fake_runtime.state, 'w') as f:
+        json.dump(state, f)
+    assert op.load_into_cluster("pytest", provider="kind") == {image: []}
+
+
+def test_load_into_empty_cluster(new_folder, fake_runtime, fake_kind,
+                                 operator_settings_1, monkeypatch):
+    """Test that a cluster without nodes is reported."""
+    monkeypatch.chdir(new_folder)
+    with open(os.path.join(new_folder, 'fake-runtime-bin', 'kind'), 'w') as f:
+        f.write('#!/bin/sh\n')
+    op = Operator(directory=new_folder, runtime="docker",
+                  **operator_settings_1)
+    op.build()
+    with pytest.raises(RuntimeError, match='No nodes found'):
+        op.load_into_cluster("pytest", provider="kind")
+
+
+def test_load_slow_node(new_folder, fake_kind, monkeypatch):
+    """Test that a slow node doesn't hold up loading the others."""
+    from osdk_manager.operator.cluster import Cluster
+
+    save = os.path.join(new_folder, 'fake-runtime-bin', 'fake-save')
+    with open(save, 'w') as f:
+        f.write('#!/bin/sh\nhead -c 4194304 /dev/zero\n')
+    os.chmod(save, 0o755)
+    cluster = Cluster(provider='kind', profile='pytest', runtime=save)
+
+    def node_command(node, command):
+        out = os.path.join(new_folder, node)
+        if node == 'pytest-worker':
+            return ['sh', '-c', f'sleep 2; date +%s.%N > {out}.start; '
+                                f'cat > {out}']
+        if node == 'pytest-worker2':
+            return ['sh', '-c', 'exit 1']
+        return ['sh', '-c', f'cat > {out}; date +%s.%N > {out}.done']
+
+    monkeypatch.setattr(cluster, 'node_command', node_command)
+    with pytest.raises(RuntimeError, match='exit 1'):
+        cluster.load('example', fake_kind)
+
+    def read(name):
+        with open(os.path.join(new_folder, name)) as f:
+            return float(f.read())
+
+    for node in ['pytest-control-plane', 'pytest-worker']:
+        assert os.path.getsize(os.path.join(new_folder, node)) == 4194304
+    assert read('pytest-control-plane.done') < read('pytest-worker.start')
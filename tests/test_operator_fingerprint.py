@@ -0,0 +1,124 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager operator fingerprint tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that builds and pushes are skipped when the registry
+already has an image built from the same source.
+"""
+
+import os
+
+from osdk_manager.operator import Operator
+from osdk_manager.operator.fingerprint import (FINGERPRINT_LABEL, ignored,
+                                               source_fingerprint)
+
+
+def write(directory: str = None, path: str = None, content: str = '') -> None:
+    """Write a file under directory."""
+    filename = os.path.join(directory, path)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'w') as f:
+        f.write(content)
+
+
+def test_ignored():
+    """Test .dockerignore pattern matching."""
+    patterns = ['bin', '*.log', '!keep.log', 'docs/**/*.md']
+    assert ignored('bin/manager', patterns)
+    assert ignored('debug.log', patterns)
+    assert not ignored('keep.log', patterns)
+    assert ignored('docs/a/b.md', patterns)
+    assert not ignored('roles/main.yml', patterns)
+
+
+def test_source_fingerprint(new_folder):
+    """Test that only files in the build context change the fingerprint."""
+    context = os.path.join(new_folder, 'context')
+    write(context, 'Dockerfile', 'FROM scratch\n')
+    write(context, 'roles/main.yml', '---\n')
+    write(context, '.dockerignore', 'bin\n')
+    first = source_fingerprint(context)
+
+    write(context, 'bin/manager', 'binary')
+    write(context, '.git/FETCH_HEAD', 'abc')
+    assert source_fingerprint(context) == first
+
+    write(context, 'roles/main.yml', '--- # changed\n')
+    assert source_fingerprint(context) != first
+
+
+def test_skip_published(new_folder, fake_runtime, fake_registry,
+                        operator_settings_1, monkeypatch):
+    """Test that builds and pushes of a published image are skipped."""
+    monkeypatch.chdir(new_folder)
+    context = os.path.join(new_folder, 'context')
+    write(context, 'Dockerfile', 'FROM scratch\n')
+    settings = dict(operator_settings_1,
+                    image=f'{fake_registry.host}/example/pytest-operator')
+    op = Operator(directory=context, runtime="docker", **settings)
+    op.login(fake_registry.username, fake_registry.password)
+    fingerprint = source_fingerprint(context)
+
+    # Nothing is published yet, so it's built with the fingerprint label
+    image = op.build(skip_published=True)
+    assert fake_runtime.images()[image]['labels'] == {
+        FINGERPRINT_LABEL: fingerprint
+    }
+    op.push(skip_published=True)
+    assert len(fake_runtime.calls()) == 3
+
+    # Published from other source, so it's still rebuilt
+    fake_registry.add_image('example/pytest-operator', op.tag,
+                            labels={FINGERPRINT_LABEL: 'other'})
+    op.build(skip_published=True)
+    assert len(fake_runtime.calls()) == 4
+
+    # Published from this source, so neither runs
+    fake_registry.add_image('example/pytest-operator', op.tag,
+                            labels={FINGERPRINT_LABEL: fingerprint})
+    assert op.build(skip_published=True) == image
+    lookups = len(fake_registry.requests)
+    assert op.push(skip_published=True) == image
+    assert len(fake_runtime.calls()) == 4
+    assert len(fake_registry.requests) == lookups
+    tokens = [path for _, path in fake_registry.requests
+              if path.startswith('/token')]
+    assert len(tokens) == 1
+
+
+def test_published_unauthenticated(new_folder, fake_registry,
+                                   operator_settings_1, monkeypatch):
+    """Test that a registry that can't be authenticated to isn't fatal."""
+    from osdk_manager.registry import Registry
+
+    monkeypatch.chdir(new_folder)
+    context = os.path.join(new_folder, 'context')
+    write(context, 'Dockerfile', 'FROM scratch\n')
+    settings = dict(operator_settings_1,
+                    image=f'{fake_registry.host}/example/pytest-operator')
+    op = Operator(directory=context, runtime="docker", **settings)
+    for error in [RuntimeError('Unable to authenticate'), KeyError('realm')]:
+        def fail(*args, **kwargs):
+            raise error
+
+        monkeypatch.setattr(Registry, 'manifest_digest', fail)
+        assert not op.published()
+
+
+def test_build_without_fingerprint(new_folder, fake_runtime,
+                                   operator_settings_1, monkeypatch):
+    """Test that plain builds don't read the context to fingerprint it."""
+    import osdk_manager.operator.operator as operator_module
+
+    def fail(*args, **kwargs):
+        raise AssertionError('The context was fingerprinted.')
+
+    monkeypatch.chdir(new_folder)
+    monkeypatch.setattr(operator_module, 'source_fingerprint', fail)
+    context = os.path.join(new_folder, 'context')
+    write(context, 'Dockerfile', 'FROM scratch\n')
+    op = Operator(directory=context, runtime="docker", **operator_settings_1)
+    image = op.build()
+    assert fake_runtime.images()[image]['labels'] == {}
@@ -0,0 +1,84 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager operator multi-platform tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that operators are built for each platform at once
+and pushed as a manifest list.
+"""
+
+import json
+import os
+import pytest
+
+from osdk_manager.operator import BuildCache, Operator
+from osdk_manager.operator.fingerprint import FINGERPRINT_LABEL
+from osdk_manager.registry import INDEX_TYPES
+
+PLATFORMS = ['linux/amd64', 'linux/arm64', 'linux/ppc64le']
+
+
+@pytest.fixture()
+def multiarch_operator(new_folder, fake_runtime, fake_registry,
+                       operator_settings_1, monkeypatch):
+    """Return an operator built for several platforms."""
+    monkeypatch.chdir(new_folder)
+    settings = dict(operator_settings_1, platforms=PLATFORMS,
+                    image=f'{fake_registry.host}/example/pytest-operator')
+    op = Operator(directory=new_folder, runtime="docker", **settings)
+    op.credentials = (fake_registry.username, fake_registry.password)
+    op.build_cache = BuildCache(image=op.image,
+                                directory=os.path.join(new_folder, 'cache'))
+    return op
+
+
+def test_build_platforms(multiarch_operator, fake_runtime):
+    """Test that each platform is built with its own tag and cache."""
+    op = multiarch_operator
+    op.build(cache=True, builders={'linux/arm64': 'arm-builder'})
+
+    builds = {call[call.index('--platform') + 1]: call
+              for call in fake_runtime.calls()}
+    assert sorted(builds) == sorted(PLATFORMS)
+    assert sorted(op.build_times) == sorted(PLATFORMS)
+    arm = builds['linux/arm64']
+    assert arm[arm.index('--builder') + 1] == 'arm-builder'
+    assert '--builder' not in builds['linux/amd64']
+    for platform, call in builds.items():
+        assert call[-2] == op.platform_image(platform)
+        assert '_'.join(platform.split('/')) in call[call.index(
+            '--cache-to'
+        ) + 1]
+        assert FINGERPRINT_LABEL in fake_runtime.images()[call[-2]]['labels']
+
+    op.runtime = "podman"
+    with pytest.raises(RuntimeError):
+        op.build(builders={'linux/arm64': 'arm-builder'})
+
+
+def test_push_manifest_list(multiarch_operator, fake_runtime, fake_registry):
+    """Test that the platform images are pushed under one manifest list."""
+    op = multiarch_operator
+    digests = {}
+    for platform in PLATFORMS:
+        # Stand in for the runtime pushing each platform's image
+        tag = op.platform_image(platform).rsplit(':', 1)[1]
+        digests[platform] = fake_registry.add_image('example/pytest-operator',
+                                                    tag, layers=[
+                                                        platform.encode()
+                                                    ])
+    op.push()
+
+    pushed = [call[-1] for call in fake_runtime.calls()]
+    assert sorted(pushed) == sorted(op.platform_image(p) for p in PLATFORMS)
+    digest = fake_registry.tags['example/pytest-operator'][op.tag]
+    media_type, content = fake_registry.manifests[
+        'example/pytest-operator'
+    ][digest]
+    assert media_type == INDEX_TYPES[0]
+    index = json.loads(content)
+    assert [(m['platform']['architecture'], m['digest'])
+            for m in index['manifests']] == [
+        (platform.split('/')[1], digests[platform]) for platform in PLATFORMS
+    ]
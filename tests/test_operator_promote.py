@@ -0,0 +1,51 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager operator promotion tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that operator and bundle images can be promoted from
+one registry to another without the container runtime.
+"""
+
+import os
+import pytest
+
+from osdk_manager.operator import Operator
+
+
+def test_promote(new_folder, fake_registry, other_registry,
+                 operator_settings_1, monkeypatch):
+    """Test promoting the operator and bundle images."""
+    monkeypatch.chdir(new_folder)
+    settings = dict(operator_settings_1,
+                    image=f'{fake_registry.host}/staging/pytest-operator')
+    op = Operator(directory=new_folder, runtime="fake", **settings)
+    op.credentials = (fake_registry.username, fake_registry.password)
+    with pytest.raises(RuntimeError):
+        op.promote(f'{other_registry.host}/prod',
+                   username=other_registry.username,
+                   password=other_registry.password)
+
+    image = fake_registry.add_image('staging/pytest-operator', op.tag,
+                                    layers=[b'base', b'playbooks'])
+    promoted = op.promote(f'{other_registry.host}/prod', tags=['stable'],
+                          username=other_registry.username,
+                          password=other_registry.password)
+    # The bundle isn't there yet, so only the operator image is promoted
+    assert promoted == [f'{other_registry.host}/prod/pytest-operator:stable']
+    assert other_registry.tags['prod/pytest-operator'] == {'stable': image}
+
+    bundle = fake_registry.add_image('staging/pytest-operator-operator',
+                                     op.tag, layers=[b'manifests'])
+    promoted = op.promote(other_registry.host,
+                          username=other_registry.username,
+                          password=other_registry.password)
+    assert promoted == [
+        f'{other_registry.host}/staging/pytest-operator:{op.tag}',
+        f'{other_registry.host}/staging/pytest-operator-operator:{op.tag}',
+    ]
+    assert other_registry.tags['staging/pytest-operator-operator'] == {
+        op.tag: bundle
+    }
+    assert os.getcwd() == new_folder
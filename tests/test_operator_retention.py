@@ -0,0 +1,68 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager operator image retention tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that pruning removes old releases while keeping
+current and referenced images.
+"""
+
+import os
+
+from osdk_manager.operator import Operator
+from osdk_manager.operator.retention import select_removals, version_key
+
+IMAGE = 'quay.io/example/pytest-operator'
+
+
+def test_version_key():
+    """Test that versions sort semantically, with prereleases first."""
+    tags = ['0.10.0', 'v0.2.0', '0.2.0-rc.10', '0.2.0-rc.2', '1.0.0']
+    assert sorted(tags, key=version_key) == [
+        '0.2.0-rc.2', '0.2.0-rc.10', 'v0.2.0', '0.10.0', '1.0.0'
+    ]
+    assert version_key('latest') is None
+
+
+def test_select_removals():
+    """Test that releases are kept or removed with their related images."""
+    images = [f'{IMAGE}{suffix}:{tag}'
+              for suffix in ['', '-operator']
+              for tag in ['0.0.1', '0.0.2', '0.0.3', '0.0.4', 'latest']]
+    images.append(f'{IMAGE}:0.0.1-linux-arm64')
+    assert sorted(select_removals(images, keep_releases=2)) == sorted([
+        f'{IMAGE}:0.0.1', f'{IMAGE}:0.0.1-linux-arm64',
+        f'{IMAGE}-operator:0.0.1', f'{IMAGE}:0.0.2',
+        f'{IMAGE}-operator:0.0.2',
+    ])
+    assert select_removals(images, keep_releases=2,
+                           keep=[f'{IMAGE}:0.0.1', '0.0.2']) == [
+        f'{IMAGE}-operator:0.0.1'
+    ]
+
+
+def test_prune_images(new_folder, fake_runtime, operator_settings_1,
+                      monkeypatch):
+    """Test pruning an operator's images in one batch."""
+    monkeypatch.chdir(new_folder)
+    op = Operator(directory=new_folder, runtime="docker",
+                  **dict(operator_settings_1, image=IMAGE, version='0.0.1'))
+    fake_runtime.add_images(*[f'{IMAGE}:0.0.{i}' for i in range(1, 8)])
+    fake_runtime.add_images('quay.io/example/other:0.0.1')
+    os.makedirs(os.path.join(new_folder, 'bundle', 'manifests'))
+    with open(os.path.join(new_folder, 'bundle', 'manifests',
+                           'pytest-operator.clusterserviceversion.yaml'),
+              'w') as f:
+        f.write(f'spec:\n  containerImage: {IMAGE}:0.0.3\n')
+
+    assert op.prune_images(keep_releases=2, dry_run=True) == [
+        f'{IMAGE}:0.0.{i}' for i in [2, 4, 5]
+    ]
+    assert fake_runtime.images() != {}
+    op.prune_images(keep_releases=2)
+    assert sorted(fake_runtime.images()) == sorted([
+        f'{IMAGE}:0.0.{i}' for i in [1, 3, 6, 7]
+    ] + ['quay.io/example/other:0.0.1'])
+    rmi = [call for call in fake_runtime.calls() if call[1] == 'rmi']
+    assert len(rmi) == 1
@@ -0,0 +1,159 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager operator scaffold cache tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that cached scaffolding is generated once per set of
+settings and reproduces what the operator-sdk generated, for any project name.
+"""
+
+import os
+import pytest
+
+from osdk_manager.operator import Operator, ScaffoldCache, scaffold
+
+
+@pytest.fixture()
+def scaffold_cache(new_folder):
+    """Return an empty scaffold cache."""
+    return ScaffoldCache(directory=os.path.join(new_folder, 'scaffolds'))
+
+
+def project_dir(new_folder: str = None, name: str = None) -> str:
+    """Create an empty project directory."""
+    directory = os.path.join(new_folder, name)
+    os.makedirs(directory)
+    return directory
+
+
+def invocations(log: str = None) -> int:
+    """Count the operator-sdk invocations logged."""
+    with open(log) as f:
+        return len(f.readlines())
+
+
+def test_scaffold_cache(new_folder, fake_osdk, scaffold_cache,
+                        operator_settings_1, monkeypatch):
+    """Test that a second project is scaffolded without operator-sdk."""
+    monkeypatch.chdir(new_folder)
+    first = project_dir(new_folder, 'first-operator')
+    op = Operator(directory=first, runtime="fake", **operator_settings_1)
+    op.initialize_ansible_operator(cache=scaffold_cache)
+    assert op.initialized
+    assert invocations(fake_osdk) == 3
+
+    second = project_dir(new_folder, 'second-operator')
+    op = Operator(directory=second, runtime="fake", **operator_settings_1)
+    op.initialize_ansible_operator(cache=scaffold_cache)
+    assert invocations(fake_osdk) == 4
+
+    with open(os.path.join(second, 'config/default/kustomization.yaml')) as f:
+        assert f.read() == ('namespace: second-operator-system\n'
+                            'namePrefix: second-operator-\n')
+    with open(os.path.join(second, 'watches.yaml')) as f:
+        assert '- kind: PytestResource' in f.read()
+    assert os.access(os.path.join(second, 'roles/pytestresource/tasks'),
+                     os.X_OK)
+
+    reference = project_dir(new_folder, 'reference-operator')
+    op = Operator(directory=reference, runtime="fake", **operator_settings_1)
+    op.initialize_ansible_operator()
+    for root, _, files in os.walk(reference):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), reference)
+            with open(os.path.join(reference, rel)) as f:
+                expected = f.read().replace('reference-operator',
+                                            'second-operator')
+            with open(os.path.join(second, rel)) as f:
+                assert f.read() == expected
+
+
+def test_scaffold_cache_key(new_folder, fake_osdk, scaffold_cache,
+                            operator_settings_1, monkeypatch):
+    """Test that different settings don't share cached scaffolding."""
+    monkeypatch.chdir(new_folder)
+    first = project_dir(new_folder, 'first-operator')
+    # The fake reports 1.3.1, which is what the entry must be kept under
+    op = Operator(directory=first, runtime="fake", osdk_version="1.4.0",
+                  **operator_settings_1)
+    op.initialize_ansible_operator(cache=scaffold_cache)
+    assert invocations(fake_osdk) == 3
+    assert scaffold_cache.has(ScaffoldCache.key(
+        sdk_version='1.3.1', plugin='ansible',
+        domain=operator_settings_1['domain'],
+        group=operator_settings_1['group'],
+        api_version=operator_settings_1['api_version'],
+        kinds=operator_settings_1['kinds']
+    ))
+
+    settings = dict(operator_settings_1, kinds=["OtherResource"])
+    second = project_dir(new_folder, 'second-operator')
+    op = Operator(directory=second, runtime="fake", osdk_version="1.3.1",
+                  **settings)
+    op.initialize_ansible_operator(cache=scaffold_cache)
+    assert invocations(fake_osdk) == 6
+    assert os.path.isdir(os.path.join(second, 'roles/otherresource'))
+    assert not os.path.isdir(os.path.join(second, 'roles/pytestresource'))
+
+
+def test_scaffold_hardlink(new_folder, fake_osdk, scaffold_cache,
+                           operator_settings_1, monkeypatch):
+    """Test hardlinked scaffolding and refusing to overwrite a project."""
+    monkeypatch.chdir(new_folder)
+    for name in ['first-operator', 'second-operator']:
+        directory = project_dir(new_folder, name)
+        op = Operator(directory=directory, runtime="fake",
+                      **operator_settings_1)
+        op.initialize_ansible_operator(cache=scaffold_cache, hardlink=True)
+    dockerfile = os.path.join(new_folder, 'second-operator', 'Dockerfile')
+    assert os.stat(dockerfile).st_nlink == 3
+    project = os.path.join(new_folder, 'second-operator', 'PROJECT')
+    assert os.stat(project).st_nlink == 1
+
+    op.initialized = False
+    with pytest.raises(RuntimeError):
+        op.initialize_ansible_operator(cache=scaffold_cache)
+
+
+def test_scaffold_workspace(new_folder, scaffold_cache):
+    """Test that entries are generated inside the project they're for."""
+    target = project_dir(new_folder, 'pytest-operator')
+    workspaces = []
+
+    def generate(directory: str = None) -> None:
+        workspaces.append(directory)
+        with open(os.path.join(directory, 'Dockerfile'), 'w') as f:
+            f.write('FROM scratch\n')
+
+    assert not scaffold_cache.scaffold('pytest', target, generate)
+    assert os.path.commonpath([target, workspaces[0]]) == target
+    assert os.listdir(target) == ['Dockerfile']
+
+
+def test_scaffold_reflink(new_folder, fake_osdk, scaffold_cache,
+                          operator_settings_1, monkeypatch):
+    """Test that untemplated files are reflinked, or copied without them."""
+    monkeypatch.chdir(new_folder)
+    reflinked = []
+
+    def reflink(src: str = None, dst: str = None) -> None:
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            d.write(s.read())
+        reflinked.append(os.path.basename(dst))
+
+    def unsupported(src: str = None, dst: str = None) -> None:
+        open(dst, 'wb').close()
+        raise OSError('Operation not supported')
+
+    for name, fake in [('first-operator', reflink),
+                       ('second-operator', unsupported)]:
+        monkeypatch.setattr(scaffold, '_reflink', fake)
+        directory = project_dir(new_folder, name)
+        op = Operator(directory=directory, runtime="fake",
+                      **operator_settings_1)
+        op.initialize_ansible_operator(cache=scaffold_cache)
+        with open(os.path.join(directory, 'Dockerfile')) as f:
+            assert f.read().startswith('FROM ')
+    assert 'Dockerfile' in reflinked
+    assert 'PROJECT' not in reflinked
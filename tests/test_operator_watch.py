@@ -0,0 +1,106 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager operator watch tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that changes to an operator project are noticed and
+rebuilt, cancelling builds that newer changes supersede.
+"""
+
+import os
+import pytest
+import threading
+import time
+
+from osdk_manager.operator import BuildCache, Operator
+from osdk_manager.operator.watch import (InotifyWatcher, PollingWatcher,
+                                         watch)
+
+
+def write(directory: str = None, path: str = None, content: str = '') -> None:
+    """Write a file under directory."""
+    filename = os.path.join(directory, path)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'w') as f:
+        f.write(content)
+
+
+@pytest.mark.parametrize('watcher_class', [InotifyWatcher, PollingWatcher])
+def test_watcher(new_folder, watcher_class):
+    """Test that changes in the build context are noticed."""
+    write(new_folder, '.dockerignore', 'bin\n')
+    write(new_folder, 'roles/example/tasks/main.yml', '---\n')
+    os.makedirs(os.path.join(new_folder, 'bin'))
+    watcher = watcher_class(new_folder)
+    try:
+        assert watcher.wait(0.1) == set()
+        write(new_folder, 'bin/manager', 'binary')
+        write(new_folder, '.git/index', 'index')
+        assert watcher.wait(0.6) == set()
+
+        write(new_folder, 'roles/example/tasks/main.yml', '--- # changed\n')
+        assert 'roles/example/tasks/main.yml' in watcher.wait(1)
+        write(new_folder, 'roles/new/tasks/main.yml', '---\n')
+        changes = watcher.wait(1) | watcher.wait(0.6)
+        assert 'roles/new/tasks/main.yml' in changes or \
+            'roles/new' in changes
+        write(new_folder, 'roles/new/tasks/main.yml', '--- # changed\n')
+        assert 'roles/new/tasks/main.yml' in watcher.wait(1)
+    finally:
+        watcher.close()
+
+
+@pytest.mark.parametrize('watcher_class', [InotifyWatcher, PollingWatcher])
+def test_watcher_dockerignore_changes(new_folder, watcher_class):
+    """Test that edits to .dockerignore change what's watched."""
+    write(new_folder, '.dockerignore', 'bin\n')
+    write(new_folder, 'bin/manager', 'binary')
+    watcher = watcher_class(new_folder)
+    try:
+        write(new_folder, '.dockerignore', '*.log\n')
+        assert '.dockerignore' in watcher.wait(1)
+        write(new_folder, 'bin/manager', 'rebuilt')
+        write(new_folder, 'debug.log', 'noise')
+        changes = watcher.wait(1) | watcher.wait(0.6)
+        assert 'bin/manager' in changes
+        assert 'debug.log' not in changes
+    finally:
+        watcher.close()
+
+
+def test_watch_cancels_superseded_builds(new_folder, fake_runtime,
+                                         operator_settings_1, monkeypatch):
+    """Test that an edit during a build cancels it and builds again."""
+    monkeypatch.chdir(new_folder)
+    monkeypatch.setenv('FAKE_RUNTIME_BUILD_SECONDS', '1')
+    context = os.path.join(new_folder, 'context')
+    write(context, 'roles/example/tasks/main.yml', '---\n')
+    op = Operator(directory=context, runtime="podman", **operator_settings_1)
+    op.build_cache = BuildCache(image=op.image,
+                                directory=os.path.join(new_folder, 'cache'))
+
+    results = []
+    stop = threading.Event()
+    thread = threading.Thread(target=watch, kwargs={
+        'operator': op, 'debounce': 0.2, 'stop': stop,
+        'on_build': results.append,
+    })
+    thread.start()
+    try:
+        time.sleep(0.3)
+        write(context, 'roles/example/tasks/main.yml', '--- # first\n')
+        # Wait for the first build to start, then supersede it
+        deadline = time.monotonic() + 5
+        while not fake_runtime.calls() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        write(context, 'roles/example/tasks/main.yml', '--- # second\n')
+        while not results and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert results == [True]
+    builds = [call for call in fake_runtime.calls() if call[1] == 'build']
+    assert len(builds) == 2
@@ -10,6 +10,8 @@ version.
 """
 
 import os
+import pytest
+import time
 
 from osdk_manager.util import get_logger
 import osdk_manager.osdk.update as osdk_update
@@ -28,3 +30,77 @@ def test_update(tmp_path):
                 os.remove(file_data.downloads[filename]['dst'])
             except Exception:
                 pass
+
+
+class SlowGpgTrust(object):
+    """A stand-in for GpgTrust that verifies once the binaries are requested.
+
+    Verification only passes if downloads began without waiting for it.
+    """
+
+    def __init__(self, mirror: object = None, valid: bool = True) -> None:
+        """Watch the requests made to mirror."""
+        self.mirror = mirror
+        self.valid = valid
+
+    def trust(self, key_id: str = None) -> bool:
+        """Pretend to import a key."""
+        return True
+
+    def verify(self, target: str = None, signature: bytes = None) -> bool:
+        """Wait for the binaries to be requested, then give the verdict."""
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if len([path for path in self.mirror.requests
+                    if path.endswith('_linux_amd64')]) == 3:
+                break
+            time.sleep(0.05)
+        else:
+            raise RuntimeError('Downloads waited for verification.')
+        if not self.valid:
+            raise RuntimeError(f'{target} failed verification.')
+        return True
+
+
+@pytest.mark.parametrize('valid', [True, False])
+def test_update_pipelined(new_folder, release_mirror, monkeypatch, valid):
+    """Test that binaries download during verification, installed after."""
+    release_mirror.add_osdk('1.3.1')
+    release_mirror.add('operator-sdk', '1.3.1', 'checksums.txt.asc',
+                       b'signature')
+    monkeypatch.setattr(osdk_update, 'get_gpg_trust',
+                        lambda: SlowGpgTrust(release_mirror, valid))
+    paths = {'directory': os.path.join(new_folder, 'cache'),
+             'path': os.path.join(new_folder, 'bin')}
+
+    if valid:
+        assert osdk_update.osdk_update(version='1.3.1',
+                                       mirror=release_mirror.url,
+                                       **paths) == '1.3.1'
+        assert osdk_update.osdk_version(**paths) == '1.3.1'
+    else:
+        with pytest.raises(RuntimeError, match='failed verification'):
+            osdk_update.osdk_update(version='1.3.1',
+                                    mirror=release_mirror.url, **paths)
+        assert [f for f in os.listdir(paths['directory'])
+                if not f.endswith('.lock')] == []
+
+
+def test_update_current(new_folder, release_mirror, monkeypatch):
+    """Test that an up-to-date update looks checksums up in the manifest."""
+    release_mirror.add_osdk('1.3.1')
+    paths = {'directory': os.path.join(new_folder, 'cache'),
+             'path': os.path.join(new_folder, 'bin')}
+    osdk_update.osdk_update(version='1.3.1', verify=False,
+                            mirror=release_mirror.url, **paths)
+    requests = len(release_mirror.requests)
+
+    def rehash(*args, **kwargs):
+        raise AssertionError('A cached binary was hashed again')
+
+    monkeypatch.setattr('hashlib.sha256', rehash)
+    assert osdk_update.osdk_update(version='1.3.1', verify=False,
+                                   mirror=release_mirror.url,
+                                   **paths) == '1.3.1'
+    # Only the checksums were fetched again
+    assert len(release_mirror.requests) == requests + 1
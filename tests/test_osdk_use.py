@@ -0,0 +1,64 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager osdk use tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that installed operator-sdk versions can be switched
+between without downloading them again.
+"""
+
+import os
+import pytest
+
+from osdk_manager.osdk.update import osdk_use, osdk_version
+
+
+def test_use(osdk_cache):
+    """Test switching between two cached versions."""
+    directory, path = osdk_cache['directory'], osdk_cache['path']
+    assert osdk_version(directory=directory, path=path) == ''
+
+    for version in osdk_cache['versions']:
+        assert osdk_use(version=version, directory=directory,
+                        path=path) == version
+        assert osdk_version(directory=directory, path=path) == version
+        for download in ['operator-sdk', 'ansible-operator', 'helm-operator']:
+            link_path = os.path.join(path, download)
+            assert os.path.islink(link_path)
+            assert os.readlink(link_path) == os.path.join(
+                directory, f'{download}_linux_amd64-{version}'
+            )
+    assert not [f for f in os.listdir(path) if f.endswith('.tmp')]
+
+
+def test_use_replaces_binary(osdk_cache):
+    """Test that a previously unversioned install is replaced by links."""
+    directory, path = osdk_cache['directory'], osdk_cache['path']
+    os.makedirs(path)
+    with open(os.path.join(path, 'operator-sdk'), 'w') as f:
+        f.write('old')
+
+    osdk_use(version='1.3.1', directory=directory, path=path)
+    assert osdk_version(directory=directory, path=path) == '1.3.1'
+
+
+def test_use_missing_version(osdk_cache):
+    """Test that switching to an uninstalled version changes nothing."""
+    directory, path = osdk_cache['directory'], osdk_cache['path']
+    osdk_use(version='1.3.1', directory=directory, path=path)
+
+    with pytest.raises(RuntimeError):
+        osdk_use(version='0.0.1', directory=directory, path=path)
+    assert osdk_version(directory=directory, path=path) == '1.3.1'
+
+
+def test_version_mismatched_links(osdk_cache):
+    """Test that partially switched links aren't reported as a version."""
+    directory, path = osdk_cache['directory'], osdk_cache['path']
+    osdk_use(version='1.3.1', directory=directory, path=path)
+    os.remove(os.path.join(path, 'helm-operator'))
+    os.symlink(os.path.join(directory, 'helm-operator_linux_amd64-1.4.0'),
+               os.path.join(path, 'helm-operator'))
+
+    assert osdk_version(directory=directory, path=path) == ''
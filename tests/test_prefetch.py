@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager prefetch tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that the newest releases are downloaded into the cache
+ahead of time, so that updating to them later downloads no binaries.
+"""
+
+import os
+import pytest
+from click.testing import CliRunner
+
+from osdk_manager.cli import cli
+from osdk_manager.opm.update import opm_update
+from osdk_manager.osdk.update import OSDK_DOWNLOADS, osdk_update
+from osdk_manager.prefetch import prefetch
+
+OSDK_ASSETS = [f'{download}_linux_amd64' for download in OSDK_DOWNLOADS]
+
+
+@pytest.fixture()
+def published(github_api, release_mirror):
+    """Publish two releases of operator-sdk and one of opm."""
+    for version in ['1.3.1', '1.4.0']:
+        github_api.add_release('operator-framework/operator-sdk', version,
+                               assets=OSDK_ASSETS)
+        release_mirror.add_osdk(version)
+    github_api.add_release('operator-framework/operator-registry', '1.14.2',
+                           assets=['linux-amd64-opm'])
+    release_mirror.add_opm('1.14.2')
+    return github_api
+
+
+def test_prefetch(published, release_mirror, new_folder):
+    """Test that the newest releases are cached without being installed."""
+    directory = os.path.join(new_folder, 'cache')
+    path = os.path.join(new_folder, 'bin')
+    fetched = prefetch(directory=directory, mirror=release_mirror.url,
+                       api=published.url)
+    assert sorted(fetched) == sorted(
+        [f'{asset}-1.4.0' for asset in OSDK_ASSETS] +
+        ['linux-amd64-opm-1.14.2']
+    )
+    assert not os.path.exists(path)
+
+    # Updating to them only fetches the small checksums file
+    release_mirror.requests.clear()
+    assert osdk_update(directory=directory, path=path, version='1.4.0',
+                       verify=False, mirror=release_mirror.url) == '1.4.0'
+    assert opm_update(directory=directory, path=path, version='1.14.2',
+                      mirror=release_mirror.url) == '1.14.2'
+    assert [r for r in release_mirror.requests
+            if not r.endswith('checksums.txt')] == []
+
+    # Nothing is fetched again
+    assert prefetch(directory=directory, mirror=release_mirror.url,
+                    api=published.url) == []
+
+
+def test_prefetch_arches(published, release_mirror, new_folder):
+    """Test that arches a release has no binaries for are skipped."""
+    directory = os.path.join(new_folder, 'cache')
+    fetched = prefetch(directory=directory, versions=2,
+                       arches=['linux_amd64', 'linux_arm64'], names=['osdk'],
+                       mirror=release_mirror.url, api=published.url)
+    assert len(fetched) == 6
+    assert not [f for f in os.listdir(directory) if 'arm64' in f]
+
+
+def test_prefetch_cli(published, release_mirror, new_folder):
+    """Test that the prefetch command downloads within a bandwidth limit."""
+    directory = os.path.join(new_folder, 'cache')
+    runner = CliRunner()
+    result = runner.invoke(cli, ['prefetch', '-d', directory, '-b', 'opm',
+                                 '--limit', '1M', '--nice', '0',
+                                 '--mirror', release_mirror.url,
+                                 '--api', published.url])
+    assert result.exit_code == 0, result.output
+    assert result.output == \
+        f'linux-amd64-opm-1.14.2 is cached in {directory}\n'
+
+    result = runner.invoke(cli, ['prefetch', '-d', directory, '--limit',
+                                 'fast'])
+    assert result.exit_code == 2
+    assert 'Unable to parse rate fast.' in result.output
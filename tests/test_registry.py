@@ -0,0 +1,157 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager registry client tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that images can be looked up in a registry without a
+container runtime.
+"""
+
+import base64
+import json
+import os
+import pytest
+import requests
+
+import osdk_manager.registry as registry_module
+from osdk_manager.registry import (Registry, copy_image, split_image,
+                                   stored_credentials)
+
+
+def test_split_image():
+    """Test splitting image references into their parts."""
+    assert split_image('quay.io/example/operator:0.0.1') == \
+        ('quay.io', 'example/operator', '0.0.1')
+    assert split_image('localhost:5000/operator') == \
+        ('localhost:5000', 'operator', 'latest')
+    assert split_image('quay.io/example/operator@sha256:abc') == \
+        ('quay.io', 'example/operator', 'sha256:abc')
+    assert split_image('docker.io/busybox:1') == \
+        ('registry-1.docker.io', 'library/busybox', '1')
+
+
+def test_stored_credentials(new_folder, monkeypatch):
+    """Test reading credentials saved by a runtime login."""
+    auth_file = os.path.join(new_folder, 'auth.json')
+    with open(auth_file, 'w') as f:
+        json.dump({'auths': {'https://quay.io/v1/': {
+            'auth': base64.b64encode(b'user:pa:ss').decode()
+        }}}, f)
+    monkeypatch.setattr(registry_module, 'AUTH_FILES', [
+        os.path.join(new_folder, 'missing.json'), auth_file
+    ])
+    assert stored_credentials('quay.io') == ('user', 'pa:ss')
+    assert stored_credentials('ghcr.io') is None
+
+
+def test_token_authentication(fake_registry):
+    """Test looking up an image behind bearer token authentication."""
+    digest = fake_registry.add_image('example/operator', '0.0.1',
+                                     labels={'a': 'b'})
+    client = Registry(fake_registry.host, fake_registry.username,
+                      fake_registry.password)
+    assert client.manifest_digest('example/operator', '0.0.1') == digest
+    assert client.manifest_digest('example/operator', '0.0.2') is None
+    assert client.labels('example/operator', digest) == {'a': 'b'}
+    # The token is only requested once per repository
+    tokens = [path for _, path in fake_registry.requests
+              if path.startswith('/token')]
+    assert len(tokens) == 1
+
+    anonymous = Registry(fake_registry.host, session=requests.Session())
+    anonymous.credentials = None
+    with pytest.raises(requests.HTTPError):
+        anonymous.manifest_digest('example/operator', '0.0.1')
+
+
+def test_streamed_upload_not_resent(fake_registry):
+    """Test that a streamed blob refused for its token isn't sent again."""
+    client = Registry(fake_registry.host, fake_registry.username,
+                      fake_registry.password)
+    location = client.mount_blob('example/operator', 'sha256:missing',
+                                 'example/missing')
+    client.authorizations['example/operator'] = 'Bearer expired'
+    with pytest.raises(requests.HTTPError):
+        client.upload_blob('example/operator', 'sha256:layer',
+                           iter([b'layer']), 5, location)
+    assert [command for command, _ in fake_registry.requests].count(
+        'PUT'
+    ) == 1
+
+
+def test_index_labels(fake_registry):
+    """Test that labels are read from the linux/amd64 image of an index."""
+    arm = fake_registry.add_image('example/operator', None,
+                                  labels={'arch': 'arm64'})
+    amd = fake_registry.add_image('example/operator', None,
+                                  labels={'arch': 'amd64'})
+    fake_registry.add_manifest('example/operator', 'multi', {
+        'schemaVersion': 2,
+        'mediaType': 'application/vnd.oci.image.index.v1+json',
+        'manifests': [
+            {'digest': arm, 'platform': {'os': 'linux',
+                                         'architecture': 'arm64'}},
+            {'digest': amd, 'platform': {'os': 'linux',
+                                         'architecture': 'amd64'}},
+        ],
+    })
+    client = Registry(fake_registry.host, fake_registry.username,
+                      fake_registry.password)
+    assert client.labels('example/operator', 'multi') == {'arch': 'amd64'}
+
+
+def test_copy_image(fake_registry, other_registry):
+    """Test that only missing blobs are copied between registries."""
+    fake_registry.add_image('example/operator', '0.0.1',
+                            layers=[b'base' * 1000, b'app'])
+    # The destination already has the base layer and config from another
+    # image
+    other_registry.add_image('prod/base', 'latest', layers=[b'base' * 1000])
+    other_registry.blobs['prod/operator'] = dict(
+        other_registry.blobs['prod/base']
+    )
+    source = Registry(fake_registry.host, fake_registry.username,
+                      fake_registry.password)
+    destination = Registry(other_registry.host, other_registry.username,
+                           other_registry.password)
+
+    stats = copy_image(source, 'example/operator', '0.0.1', destination,
+                       'prod/operator', ['0.0.1', 'stable'])
+    assert stats == {'existing': 2, 'mounted': 0, 'copied': 1,
+                     'bytes': other_registry.uploaded}
+    assert other_registry.uploaded < 1000
+    assert destination.manifest_digest('prod/operator', 'stable') == \
+        source.manifest_digest('example/operator', '0.0.1')
+
+    # Copying again transfers nothing
+    stats = copy_image(source, 'example/operator', '0.0.1', destination,
+                       'prod/operator', ['0.0.1', 'stable'])
+    assert stats['existing'] + stats['copied'] == 0
+
+
+def test_copy_index_with_mounts(fake_registry):
+    """Test copying an image index within a registry by mounting blobs."""
+    arm = fake_registry.add_image('staging/operator', None,
+                                  layers=[b'arm'])
+    amd = fake_registry.add_image('staging/operator', None,
+                                  layers=[b'amd'])
+    index = fake_registry.add_manifest('staging/operator', '0.0.1', {
+        'schemaVersion': 2,
+        'mediaType': 'application/vnd.oci.image.index.v1+json',
+        'manifests': [
+            {'digest': arm, 'platform': {'os': 'linux',
+                                         'architecture': 'arm64'}},
+            {'digest': amd, 'platform': {'os': 'linux',
+                                         'architecture': 'amd64'}},
+        ],
+    })
+    client = Registry(fake_registry.host, fake_registry.username,
+                      fake_registry.password)
+    stats = copy_image(client, 'staging/operator', '0.0.1', client,
+                       'prod/operator', ['0.0.1'])
+    # Both images share the config blob
+    assert stats['mounted'] == 3
+    assert fake_registry.uploaded == 0
+    assert client.manifest_digest('prod/operator', '0.0.1') == index
+    assert client.manifest_digest('prod/operator', arm) == arm
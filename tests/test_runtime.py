@@ -0,0 +1,65 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager container runtime client tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that images are managed through the runtime's API
+socket when it's available, and through its CLI when it isn't.
+"""
+
+import os
+import pytest
+
+import osdk_manager.runtime as runtime_module
+from osdk_manager.operator import Operator
+from osdk_manager.runtime import RuntimeClient
+
+IMAGE = 'quay.io/example/pytest-operator'
+
+
+@pytest.fixture(params=['api', 'cli'])
+def client(request, fake_runtime, new_folder, monkeypatch):
+    """Return a runtime client using either the API or the CLI."""
+    if request.param == 'api':
+        request.getfixturevalue('runtime_api')
+    else:
+        monkeypatch.setattr(runtime_module, 'socket_paths', lambda runtime: [
+            os.path.join(new_folder, 'missing.sock')
+        ])
+    fake_runtime.add_images(f'{IMAGE}:0.0.1', f'{IMAGE}-operator:0.0.1',
+                            'quay.io/example/other:0.0.1')
+    return RuntimeClient('docker')
+
+
+def test_images(client):
+    """Test listing, inspecting, tagging and removing images."""
+    assert sorted(client.images(IMAGE)) == [f'{IMAGE}-operator:0.0.1',
+                                            f'{IMAGE}:0.0.1']
+    assert client.inspect(f'{IMAGE}:0.0.1')['RepoTags'] == [f'{IMAGE}:0.0.1']
+    assert client.inspect(f'{IMAGE}:0.0.2') is None
+
+    client.tag(f'{IMAGE}:0.0.1', f'{IMAGE}:latest')
+    assert f'{IMAGE}:latest' in client.images(IMAGE)
+    client.remove(f'{IMAGE}:latest', force=True)
+    client.remove(f'{IMAGE}:latest', force=True)
+    assert f'{IMAGE}:latest' not in client.images(IMAGE)
+
+
+def test_api_queries(runtime_api, fake_runtime, new_folder,
+                     operator_settings_1, monkeypatch):
+    """Test that operator image queries are API requests, not commands."""
+    monkeypatch.chdir(new_folder)
+    op = Operator(directory=new_folder, runtime="docker",
+                  **dict(operator_settings_1, image=IMAGE))
+    fake_runtime.add_images(*[f'{IMAGE}:0.0.{i}' for i in range(100)])
+    fake_runtime.add_images('quay.io/example/other:0.0.1')
+
+    assert len(op.get_images()) == 100
+    assert len([r for r in runtime_api if r[1].startswith('/images/json')]) \
+        == 1
+    op.remove_images()
+    assert fake_runtime.images() == {'quay.io/example/other:0.0.1': {
+        'labels': {}
+    }}
+    assert fake_runtime.calls() == []
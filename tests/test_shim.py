@@ -0,0 +1,159 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager shim tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that the shims resolve the versions pinned in the
+nearest operate.yml and execute the matching cached binary.
+"""
+
+import os
+import pytest
+import subprocess
+import yaml
+from click.testing import CliRunner
+
+from osdk_manager.cli import cli
+from osdk_manager.operator import Operator
+from osdk_manager.osdk.update import osdk_use
+from osdk_manager.shim import main, read_pins, resolve, write_shims
+
+
+@pytest.fixture()
+def pinned_project(osdk_cache, operator_settings_1):
+    """Create a nested project pinning operator-sdk 1.3.1 and opm 1.14.2."""
+    project = os.path.join(os.path.dirname(osdk_cache['directory']),
+                           'project')
+    subdir = os.path.join(project, 'roles', 'pytestresource')
+    os.makedirs(subdir)
+    settings = {k.replace('_', '-'): v for k, v in operator_settings_1.items()}
+    settings.update({'osdk-version': '1.3.1', 'opm-version': '1.14.2'})
+    with open(os.path.join(project, 'operate.yml'), 'w') as f:
+        yaml.safe_dump(settings, f)
+    opm = os.path.join(osdk_cache['directory'], 'linux-amd64-opm-1.14.2')
+    with open(opm, 'w') as f:
+        f.write('#!/bin/sh\necho opm 1.14.2 "$@"\n')
+    os.chmod(opm, 0o755)
+    osdk_use(version='1.4.0', directory=osdk_cache['directory'],
+             path=osdk_cache['path'])
+    return dict(osdk_cache, project=project, subdir=subdir)
+
+
+def test_read_pins(pinned_project):
+    """Test that pins are read without a YAML parser."""
+    pins = read_pins(os.path.join(pinned_project['project'], 'operate.yml'))
+    assert pins == {'osdk-version': '1.3.1', 'opm-version': '1.14.2'}
+
+
+def test_resolve(pinned_project):
+    """Test resolution from a nested directory and without any pin."""
+    directory = pinned_project['directory']
+    kwargs = {'directory': directory, 'path': pinned_project['path']}
+
+    binary = resolve('operator-sdk', cwd=pinned_project['subdir'], **kwargs)
+    assert binary == os.path.join(directory,
+                                  'operator-sdk_linux_amd64-1.3.1')
+    binary = resolve('opm', cwd=pinned_project['subdir'], **kwargs)
+    assert binary == os.path.join(directory, 'linux-amd64-opm-1.14.2')
+    assert os.path.isfile(os.path.join(directory, '.shim-cache'))
+
+    binary = resolve('operator-sdk', cwd=directory, **kwargs)
+    assert binary == os.path.join(pinned_project['path'], 'operator-sdk')
+
+
+def test_resolve_changed_pin(pinned_project):
+    """Test that the cached lookup notices an edited pin."""
+    kwargs = {'directory': pinned_project['directory'],
+              'path': pinned_project['path']}
+    pin_file = os.path.join(pinned_project['project'], 'operate.yml')
+    resolve('operator-sdk', cwd=pinned_project['project'], **kwargs)
+
+    with open(pin_file, 'a') as f:
+        f.write('osdk-version: 1.4.0\n')
+    os.utime(pin_file, ns=(0, 0))
+    binary = resolve('operator-sdk', cwd=pinned_project['project'], **kwargs)
+    assert binary.endswith('operator-sdk_linux_amd64-1.4.0')
+
+
+def test_resolve_missing(pinned_project):
+    """Test that a pin to an uninstalled version is reported."""
+    pin_file = os.path.join(pinned_project['project'], 'operate.yml')
+    with open(pin_file, 'a') as f:
+        f.write('osdk-version: 0.0.1\n')
+
+    with pytest.raises(FileNotFoundError):
+        resolve('helm-operator', cwd=pinned_project['project'],
+                directory=pinned_project['directory'],
+                path=pinned_project['path'])
+
+
+def test_shim_not_installed(new_folder, monkeypatch, capsys):
+    """Test that an unpinned binary missing from the path is reported."""
+    monkeypatch.chdir(new_folder)
+    assert main('opm', [], directory=os.path.join(new_folder, 'cache'),
+                path=os.path.join(new_folder, 'bin')) == 127
+    assert 'opm is not pinned' in capsys.readouterr().err
+
+
+def test_shim_not_executable(pinned_project, monkeypatch, capsys):
+    """Test that a pinned binary that can't be executed is reported."""
+    monkeypatch.chdir(pinned_project['subdir'])
+    opm = os.path.join(pinned_project['directory'], 'linux-amd64-opm-1.14.2')
+    os.chmod(opm, 0o644)
+    assert main('opm', [], directory=pinned_project['directory'],
+                path=pinned_project['path']) == 126
+    assert f'Unable to execute {opm}' in capsys.readouterr().err
+
+
+def test_shim_exec(pinned_project):
+    """Test that a written shim executes the pinned binary."""
+    shim_dir = os.path.join(pinned_project['project'], '..', 'shims')
+    write_shims(shim_dir=shim_dir, directory=pinned_project['directory'],
+                path=pinned_project['path'])
+
+    shim = os.path.join(shim_dir, 'operator-sdk')
+    output = subprocess.check_output([shim, 'version'],
+                                     cwd=pinned_project['subdir'])
+    assert output.decode().strip() == 'operator-sdk 1.3.1 version'
+    output = subprocess.check_output([shim, 'version'], cwd='/')
+    assert output.decode().strip() == 'operator-sdk 1.4.0 version'
+
+    with pytest.raises(RuntimeError):
+        write_shims(shim_dir=pinned_project['path'],
+                    directory=pinned_project['directory'],
+                    path=pinned_project['path'])
+
+
+def test_cli_shim_which(pinned_project, monkeypatch):
+    """Test the shim which command from a pinned project."""
+    runner = CliRunner()
+    args = ['shim', 'which', '--directory', pinned_project['directory'],
+            '--path', pinned_project['path'], 'opm']
+    monkeypatch.chdir(pinned_project['subdir'])
+
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0
+    assert result.output.strip().endswith('linux-amd64-opm-1.14.2')
+
+
+def test_operator_load_pins(pinned_project, monkeypatch):
+    """Test that Operator.load picks up the version pins."""
+    monkeypatch.chdir(pinned_project['project'])
+    op = Operator.load(directory=pinned_project['project'], runtime='fake')
+    assert op.osdk_version == '1.3.1'
+    assert op.opm_version == '1.14.2'
+    assert 'osdk_version=1.3.1' in str(op)
+
+
+def test_operator_load_float_pins(pinned_project, monkeypatch):
+    """Test that pins YAML would read as floats keep every digit."""
+    pin_file = os.path.join(pinned_project['project'], 'operate.yml')
+    with open(pin_file, 'a') as f:
+        f.write('osdk-version: 1.10\nopm-version: 1.20 # pinned\n')
+    monkeypatch.chdir(pinned_project['project'])
+    op = Operator.load(directory=pinned_project['project'], runtime='fake')
+    assert op.osdk_version == '1.10'
+    assert op.opm_version == '1.20'
+    assert read_pins(pin_file) == {'osdk-version': '1.10',
+                                   'opm-version': '1.20'}
@@ -0,0 +1,99 @@
+# SPDX-License-Identifier: BSD-2-Clause
+"""osdk-manager lockfile sync tests.
+
+Manage osdk and opm binary installation, and help to scaffold, release, and
+version Operator SDK-based Kubernetes operators.
+
+This test set validates that a lockfile provisions every binary at once,
+downloads only what's missing, and changes nothing when a digest is wrong.
+"""
+
+import os
+import pytest
+import yaml
+from click.testing import CliRunner
+
+from osdk_manager.cli import cli
+from osdk_manager.opm.update import opm_version
+from osdk_manager.osdk.update import osdk_version
+from osdk_manager.sync import sync
+
+
+def test_sync(lockfile, release_mirror):
+    """Test that a sync installs and links everything in the lockfile."""
+    artifacts = sync(**lockfile)
+    assert all(artifact.fetched for artifact in artifacts)
+    assert len(release_mirror.requests) == 4
+
+    directory, path = lockfile['directory'], lockfile['path']
+    assert osdk_version(directory=directory, path=path) == '1.3.1'
+    assert opm_version(directory=directory, path=path) == '1.14.2'
+    assert not [f for f in os.listdir(directory) if f.endswith('.part')]
+
+
+def test_sync_delta(lockfile, release_mirror):
+    """Test that a second sync downloads only what's gone missing."""
+    sync(**lockfile)
+    os.remove(os.path.join(lockfile['directory'],
+                           'helm-operator_linux_amd64-1.3.1'))
+    del release_mirror.requests[:]
+
+    artifacts = sync(**lockfile)
+    assert [a.name for a in artifacts if a.fetched] == ['helm-operator']
+    assert len(release_mirror.requests) == 1
+
+
+def test_sync_bad_digest(lockfile, release_mirror):
+    """Test that a digest mismatch leaves the installation untouched."""
+    with open(lockfile['lockfile']) as f:
+        settings = yaml.safe_load(f)
+    settings['artifacts']['opm']['sha256'] = '0' * 64
+    with open(lockfile['lockfile'], 'w') as f:
+        yaml.safe_dump(settings, f)
+
+    with pytest.raises(RuntimeError):
+        sync(**lockfile)
+    assert [f for f in os.listdir(lockfile['directory'])
+            if not f.endswith('.lock')] == []
+    assert not os.path.exists(lockfile['path']) or \
+        os.listdir(lockfile['path']) == []
+
+
+def test_sync_incomplete_pin(lockfile):
+    """Test that a lockfile entry without a digest is rejected."""
+    with open(lockfile['lockfile'], 'w') as f:
+        yaml.safe_dump({'artifacts': {'opm': {'version': '1.14.2'}}}, f)
+
+    with pytest.raises(RuntimeError):
+        sync(**lockfile)
+
+
+def test_cli_sync(lockfile):
+    """Test the sync command output."""
+    runner = CliRunner()
+    args = ['sync', '--lockfile', lockfile['lockfile'],
+            '--directory', lockfile['directory'], '--path', lockfile['path']]
+
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0
+    assert 'opm version 1.14.2 (downloaded)' in result.output
+
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0
+    assert 'opm version 1.14.2 (already cached)' in result.output
+
+
+def test_cli_sync_background(lockfile):
+    """Test that the sync command can download in the background."""
+    runner = CliRunner()
+    args = ['sync', '--lockfile', lockfile['lockfile'],
+            '--directory', lockfile['directory'], '--path', lockfile['path'],
+            '--limit', '1M', '--background']
+
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0
+    assert 'opm version 1.14.2 (downloaded)' in result.output
+
+    result = runner.invoke(cli, args[:-3] + ['--limit', 'fast'])
+    assert result.exit_code == 2
+    assert 'Unable to parse rate fast.' in result.output